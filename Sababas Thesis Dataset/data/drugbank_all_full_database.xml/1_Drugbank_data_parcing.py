@@ -1,171 +1,395 @@
-import xml.etree.ElementTree as ET
+import argparse
 import csv
+import hashlib
+import io
+import json
 import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
 
-def extract_drug_data(xml_file, output_folder):
-    tree = ET.parse(xml_file)
-    root = tree.getroot()
-    
-    # Create output folder if it doesn't exist
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
-    
-    # Prepare data for main database CSV
-    main_data = []
-    
-    # Prepare data for drug interactions CSV
-    drug_interactions_data = []
-    
-    # Prepare data for drug categories CSV
-    drug_categories_data = []
-    
-    # Prepare data for experimental properties CSV
-    experimental_properties_data = []
-    
-    # Prepare data for pathways CSV
-    pathway_data = []
-    
-    # Iterate over each drug element
-    for drug in root.findall('.//{http://www.drugbank.ca}drug'):
-        drug_info = {}
-        
-        # Extract basic drug information
-        drug_info['type'] = drug.attrib.get('type')
-        drug_info['created'] = drug.attrib.get('created')
-        drug_info['primary_drugbank_id'] = drug.find('{http://www.drugbank.ca}drugbank-id[@primary="true"]').text if drug.find('{http://www.drugbank.ca}drugbank-id[@primary="true"]') is not None else None
-        drug_info['name'] = drug.find('{http://www.drugbank.ca}name').text if drug.find('{http://www.drugbank.ca}name') is not None else None
-        drug_info['description'] = drug.find('{http://www.drugbank.ca}description').text if drug.find('{http://www.drugbank.ca}description') is not None else None
-        drug_info['cas_number'] = drug.find('{http://www.drugbank.ca}cas-number').text if drug.find('{http://www.drugbank.ca}cas-number') is not None else None
-        drug_info['unii'] = drug.find('{http://www.drugbank.ca}unii').text if drug.find('{http://www.drugbank.ca}unii') is not None else None
-        drug_info['state'] = drug.find('{http://www.drugbank.ca}state').text if drug.find('{http://www.drugbank.ca}state') is not None else None
-        
-        # Extract groups information
-        groups = [group.text for group in drug.findall('.//{http://www.drugbank.ca}group')]
-        drug_info['groups'] = ','.join(groups)
-        
-        # Extract other tags information
-        tags_to_extract = [
-            'synthesis-reference', 'indication', 'pharmacodynamics', 'mechanism-of-action', 'toxicity',
-            'metabolism', 'absorption', 'half-life', 'protein-binding', 'route-of-elimination',
-            'volume-of-distribution', 'clearance'
-        ]
-        
-        for tag in tags_to_extract:
-            element = drug.find(f'.//{{http://www.drugbank.ca}}{tag}')
-            drug_info[tag] = element.text if element is not None else None
-        
-        # Extract classification information
-        classification_tags_to_extract = [
-            'description', 'direct-parent', 'kingdom', 'superclass', 'class', 'subclass'
-        ]
-        
-        for tag in classification_tags_to_extract:
-            classification_tag = f'classification_{tag}'
-            element = drug.find(f'.//{{http://www.drugbank.ca}}{tag}')
-            drug_info[classification_tag] = element.text if element is not None else None
-        
-        # Extract affected organisms information
-        affected_organisms = [org.text for org in drug.findall('.//{http://www.drugbank.ca}affected-organism')]
-        drug_info['affected_organisms'] = ','.join(affected_organisms)
-        
-        # Extract food interactions information
-        food_interactions = [food.text for food in drug.findall('.//{http://www.drugbank.ca}food-interaction')]
-        drug_info['food_interactions'] = ','.join(food_interactions)
-        
-        # Extract sequence information (updated)
-        sequences_element = drug.find('.//{http://www.drugbank.ca}sequence')
-        if sequences_element is not None:
-            sequence_text = sequences_element.text.strip()
-            sequence_format = sequences_element.attrib.get('format')
-            sequence_value = f"{sequence_format}: {sequence_text}" if sequence_format else sequence_text
-            drug_info['sequence'] = sequence_value
-        else:
-            drug_info['sequence'] = None
-                
-        # Extract molecular weight information (excluding targets)
-        molecular_weights = [mw.text for mw in drug.findall('.//{http://www.drugbank.ca}molecular-weight')]
-        
-        if len(molecular_weights) == 1:
-            drug_info['molecular_weight'] = molecular_weights[0]
-        else:
-            drug_info['molecular_weight'] = ''
-        
-        # Add extracted data to main database list
-        main_data.append(drug_info)
-        
-        # Extract and add data to experimental properties list
-        for prop in drug.findall('.//{http://www.drugbank.ca}property'):
-            experimental_properties_data.append({
+from drugbank_profiling import add_section, start_stage
+from drugbank_storage import STORAGE_FORMAT, TableWriter, concat_tables, table_path
+from drugbank_xml import CHANGES_FILE, hash_drug_records, iter_drug_range, iter_drugs, plan_shards, read_root_tag, scan_drug_offsets
+
+# Column layout of the five output tables
+MAIN_FIELDNAMES = [
+    'type', 'created', 'primary_drugbank_id', 'name', 'description', 'cas_number', 'unii', 'state', 'groups',
+    'synthesis-reference', 'indication', 'pharmacodynamics', 'mechanism-of-action', 'toxicity',
+    'metabolism', 'absorption', 'half-life', 'protein-binding', 'route-of-elimination',
+    'volume-of-distribution', 'clearance',
+    'classification_description', 'classification_direct-parent', 'classification_kingdom',
+    'classification_superclass', 'classification_class', 'classification_subclass',
+    'affected_organisms', 'food_interactions', 'sequence', 'molecular_weight'
+]
+EXPERIMENTAL_PROPERTIES_FIELDNAMES = ['primary_drugbank_id', 'kind', 'value', 'source']
+PATHWAYS_FIELDNAMES = ['primary_drugbank_id', 'pathway_smpdb_id', 'pathway_name', 'pathway_category', 'pathway_enzymes']
+CATEGORIES_FIELDNAMES = ['primary_drugbank_id', 'category', 'mesh_id']
+DRUG_INTERACTIONS_FIELDNAMES = ['primary_drugbank_id', 'drugbank_id', 'name', 'description']
+
+# Children of <drug> that hold <property> records
+PROPERTY_LIST_TAGS = ['{http://www.drugbank.ca}calculated-properties', '{http://www.drugbank.ca}experimental-properties']
+
+# Output table name and columns of every table, in the order they are written
+OUTPUT_TABLES = {
+    'main': ('main_database', MAIN_FIELDNAMES),
+    'experimental_properties': ('experimental_properties', EXPERIMENTAL_PROPERTIES_FIELDNAMES),
+    'pathways': ('pathways', PATHWAYS_FIELDNAMES),
+    'categories': ('drug_categories', CATEGORIES_FIELDNAMES),
+    'drug_interactions': ('drug_interactions', DRUG_INTERACTIONS_FIELDNAMES),
+}
+
+# Incremental mode bookkeeping: per-drug content hash plus the byte range of the
+# drug's rows in every output table; the drugs touched by the last run are
+# listed in CHANGES_FILE (see drugbank_xml), read by stage 6 --incremental
+MANIFEST_FILE = 'drug_manifest.json'
+# Version of the extracted rows; bump it whenever extract_drug_record or the
+# table columns change, so rows copied from an older manifest are never reused
+EXTRACTOR_VERSION = 1
+HASH_BLOCK_SIZE = 1 << 20
+
+
+# Extract the rows of all five tables for a single drug element
+def extract_drug_record(drug):
+    drug_info = {}
+
+    # Extract basic drug information
+    drug_info['type'] = drug.attrib.get('type')
+    drug_info['created'] = drug.attrib.get('created')
+    drug_info['primary_drugbank_id'] = drug.find('{http://www.drugbank.ca}drugbank-id[@primary="true"]').text if drug.find('{http://www.drugbank.ca}drugbank-id[@primary="true"]') is not None else None
+    drug_info['name'] = drug.find('{http://www.drugbank.ca}name').text if drug.find('{http://www.drugbank.ca}name') is not None else None
+    drug_info['description'] = drug.find('{http://www.drugbank.ca}description').text if drug.find('{http://www.drugbank.ca}description') is not None else None
+    drug_info['cas_number'] = drug.find('{http://www.drugbank.ca}cas-number').text if drug.find('{http://www.drugbank.ca}cas-number') is not None else None
+    drug_info['unii'] = drug.find('{http://www.drugbank.ca}unii').text if drug.find('{http://www.drugbank.ca}unii') is not None else None
+    drug_info['state'] = drug.find('{http://www.drugbank.ca}state').text if drug.find('{http://www.drugbank.ca}state') is not None else None
+
+    # Extract groups information
+    groups = [group.text for group in drug.findall('{http://www.drugbank.ca}groups/{http://www.drugbank.ca}group')]
+    drug_info['groups'] = ','.join(groups)
+
+    # Extract other tags information
+    tags_to_extract = [
+        'synthesis-reference', 'indication', 'pharmacodynamics', 'mechanism-of-action', 'toxicity',
+        'metabolism', 'absorption', 'half-life', 'protein-binding', 'route-of-elimination',
+        'volume-of-distribution', 'clearance'
+    ]
+
+    for tag in tags_to_extract:
+        element = drug.find(f'{{http://www.drugbank.ca}}{tag}')
+        drug_info[tag] = element.text if element is not None else None
+
+    # Extract classification information
+    classification_tags_to_extract = [
+        'description', 'direct-parent', 'kingdom', 'superclass', 'class', 'subclass'
+    ]
+
+    for tag in classification_tags_to_extract:
+        classification_tag = f'classification_{tag}'
+        element = drug.find(f'{{http://www.drugbank.ca}}classification/{{http://www.drugbank.ca}}{tag}')
+        drug_info[classification_tag] = element.text if element is not None else None
+
+    # Extract affected organisms information
+    affected_organisms = [org.text for org in drug.findall('{http://www.drugbank.ca}affected-organisms/{http://www.drugbank.ca}affected-organism')]
+    drug_info['affected_organisms'] = ','.join(affected_organisms)
+
+    # Extract food interactions information
+    food_interactions = [food.text for food in drug.findall('{http://www.drugbank.ca}food-interactions/{http://www.drugbank.ca}food-interaction')]
+    drug_info['food_interactions'] = ','.join(food_interactions)
+
+    # Extract sequence information (updated)
+    sequences_element = drug.find('{http://www.drugbank.ca}sequences/{http://www.drugbank.ca}sequence')
+    if sequences_element is not None:
+        sequence_text = sequences_element.text.strip()
+        sequence_format = sequences_element.attrib.get('format')
+        sequence_value = f"{sequence_format}: {sequence_text}" if sequence_format else sequence_text
+        drug_info['sequence'] = sequence_value
+    else:
+        drug_info['sequence'] = None
+
+    # Extract molecular weight information (excluding targets)
+    molecular_weights = [mw.text for mw in drug.findall('{http://www.drugbank.ca}molecular-weight')]
+
+    if len(molecular_weights) == 1:
+        drug_info['molecular_weight'] = molecular_weights[0]
+    else:
+        drug_info['molecular_weight'] = ''
+
+    # Extract experimental and calculated properties, in document order
+    experimental_properties = []
+    property_lists = [child for child in drug if child.tag in PROPERTY_LIST_TAGS]
+    for properties in property_lists:
+        for prop in properties.findall('{http://www.drugbank.ca}property'):
+            experimental_properties.append({
                 'primary_drugbank_id': drug_info['primary_drugbank_id'],
                 'kind': prop.find('{http://www.drugbank.ca}kind').text if prop.find('{http://www.drugbank.ca}kind') is not None else None,
                 'value': prop.find('{http://www.drugbank.ca}value').text if prop.find('{http://www.drugbank.ca}value') is not None else None,
                 'source': prop.find('{http://www.drugbank.ca}source').text if prop.find('{http://www.drugbank.ca}source') is not None else None
             })
-        
-        # Extract and add data to pathways list (excluding drugs)
-        for pathway in drug.findall('.//{http://www.drugbank.ca}pathway'):
-            pathway_data.append({
-                'primary_drugbank_id': drug_info['primary_drugbank_id'],
-                'pathway_smpdb_id': pathway.find('{http://www.drugbank.ca}smpdb-id').text if pathway.find('{http://www.drugbank.ca}smpdb-id') is not None else None,
-                'pathway_name': pathway.find('{http://www.drugbank.ca}name').text if pathway.find('{http://www.drugbank.ca}name') is not None else None,
-                'pathway_category': pathway.find('{http://www.drugbank.ca}category').text if pathway.find('{http://www.drugbank.ca}category') is not None else None,
-                'pathway_enzymes': pathway.find('{http://www.drugbank.ca}enzymes').text if pathway.find('{http://www.drugbank.ca}enzymes') is not None else None
-            })
-        
-        # Extract and add data to categories list (including primary_drugbank_id)
-        for category in drug.findall('.//{http://www.drugbank.ca}category'):
-            drug_categories_data.append({
-                'primary_drugbank_id': drug_info['primary_drugbank_id'],
-                'category': category.find('{http://www.drugbank.ca}category').text if category.find('{http://www.drugbank.ca}category') is not None else None,
-                'mesh_id': category.find('{http://www.drugbank.ca}mesh-id').text if category.find('{http://www.drugbank.ca}mesh-id') is not None else None
-            })
-        
-        # Extract and add data to drug interactions list
-        for interaction in drug.findall('.//{http://www.drugbank.ca}drug-interaction'):
-            drug_interactions_data.append({
-                'primary_drugbank_id': drug_info['primary_drugbank_id'],
-                'drugbank_id': interaction.find('{http://www.drugbank.ca}drugbank-id').text if interaction.find('{http://www.drugbank.ca}drugbank-id') is not None else None,
-                'name': interaction.find('{http://www.drugbank.ca}name').text if interaction.find('{http://www.drugbank.ca}name') is not None else None,
-                'description': interaction.find('{http://www.drugbank.ca}description').text if interaction.find('{http://www.drugbank.ca}description') is not None else None
-            })
-        
-    # Write main database CSV file
-    main_csv_file = os.path.join(output_folder, 'main_database.csv')
-    with open(main_csv_file, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=main_data[0].keys())
-        writer.writeheader()
-        writer.writerows(main_data)
-    
-    # Write experimental properties CSV file
-    experimental_properties_csv_file = os.path.join(output_folder, 'experimental_properties.csv')
-    with open(experimental_properties_csv_file, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=experimental_properties_data[0].keys())
-        writer.writeheader()
-        writer.writerows(experimental_properties_data)
-    
-    # Write pathways CSV file
-    pathways_csv_file = os.path.join(output_folder, 'pathways.csv')
-    with open(pathways_csv_file, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=pathway_data[0].keys())
-        writer.writeheader()
-        writer.writerows(pathway_data)
-    
-    # Write categories CSV file
-    categories_csv_file = os.path.join(output_folder, 'drug_categories.csv')
-    with open(categories_csv_file, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=drug_categories_data[0].keys())
-        writer.writeheader()
-        writer.writerows(drug_categories_data)
-    
-    # Write drug interactions CSV file
-    drug_interactions_csv_file = os.path.join(output_folder, 'drug_interactions.csv')
-    with open(drug_interactions_csv_file, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=drug_interactions_data[0].keys())
+
+    # Extract pathways (excluding drugs)
+    pathways = []
+    for pathway in drug.findall('{http://www.drugbank.ca}pathways/{http://www.drugbank.ca}pathway'):
+        pathways.append({
+            'primary_drugbank_id': drug_info['primary_drugbank_id'],
+            'pathway_smpdb_id': pathway.find('{http://www.drugbank.ca}smpdb-id').text if pathway.find('{http://www.drugbank.ca}smpdb-id') is not None else None,
+            'pathway_name': pathway.find('{http://www.drugbank.ca}name').text if pathway.find('{http://www.drugbank.ca}name') is not None else None,
+            'pathway_category': pathway.find('{http://www.drugbank.ca}category').text if pathway.find('{http://www.drugbank.ca}category') is not None else None,
+            'pathway_enzymes': ','.join(enzyme.text for enzyme in pathway.findall('{http://www.drugbank.ca}enzymes/{http://www.drugbank.ca}uniprot-id'))
+        })
+
+    # Extract categories (including primary_drugbank_id)
+    categories = []
+    for category in drug.findall('{http://www.drugbank.ca}categories/{http://www.drugbank.ca}category'):
+        categories.append({
+            'primary_drugbank_id': drug_info['primary_drugbank_id'],
+            'category': category.find('{http://www.drugbank.ca}category').text if category.find('{http://www.drugbank.ca}category') is not None else None,
+            'mesh_id': category.find('{http://www.drugbank.ca}mesh-id').text if category.find('{http://www.drugbank.ca}mesh-id') is not None else None
+        })
+
+    # Extract drug interactions
+    drug_interactions = []
+    for interaction in drug.findall('{http://www.drugbank.ca}drug-interactions/{http://www.drugbank.ca}drug-interaction'):
+        drug_interactions.append({
+            'primary_drugbank_id': drug_info['primary_drugbank_id'],
+            'drugbank_id': interaction.find('{http://www.drugbank.ca}drugbank-id').text if interaction.find('{http://www.drugbank.ca}drugbank-id') is not None else None,
+            'name': interaction.find('{http://www.drugbank.ca}name').text if interaction.find('{http://www.drugbank.ca}name') is not None else None,
+            'description': interaction.find('{http://www.drugbank.ca}description').text if interaction.find('{http://www.drugbank.ca}description') is not None else None
+        })
+
+    return {
+        'main': [drug_info],
+        'experimental_properties': experimental_properties,
+        'pathways': pathways,
+        'categories': categories,
+        'drug_interactions': drug_interactions,
+    }
+
+
+# Write the rows of every drug into the five tables of `output_folder`.
+# Rows are written as soon as a drug is parsed, nothing is kept in memory.
+# Returns the number of drugs written.
+def write_drug_tables(drugs, output_folder, write_header=True):
+    writers = {}
+    n_drugs = 0
+    try:
+        for table, (table_name, fieldnames) in OUTPUT_TABLES.items():
+            writers[table] = TableWriter(table_name, output_folder, fieldnames, write_header=write_header)
+
+        for drug in drugs:
+            for table, rows in extract_drug_record(drug).items():
+                writers[table].writerows(rows)
+            n_drugs += 1
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return n_drugs
+
+
+# Worker of the parallel mode: extract one byte range of the dump into partial tables (headerless for CSV)
+def extract_drug_shard(xml_file, offset, length, root_tag, shard_folder):
+    os.makedirs(shard_folder, exist_ok=True)
+    n_drugs = write_drug_tables(iter_drug_range(xml_file, offset, length, root_tag), shard_folder, write_header=False)
+    return shard_folder, n_drugs
+
+
+# Split the dump into byte ranges of whole top-level drugs, extract them in a process
+# pool and concatenate the partial tables in the original drug order
+def extract_drug_data_parallel(xml_file, output_folder, workers):
+    offsets = scan_drug_offsets(xml_file)
+    root_tag = read_root_tag(xml_file)
+    # A few shards per worker keeps the pool busy when drug sizes are uneven
+    shards = plan_shards(offsets, workers * 4)
+
+    parts_folder = tempfile.mkdtemp(prefix='shards_', dir=output_folder)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(extract_drug_shard, xml_file, offset, length, root_tag,
+                            os.path.join(parts_folder, f'shard_{i:05d}'))
+                for i, (offset, length) in enumerate(shards)
+            ]
+            results = [future.result() for future in futures]
+        shard_folders = [shard_folder for shard_folder, _ in results]
+
+        # Merge step: every shard's rows in shard order
+        for table_name, fieldnames in OUTPUT_TABLES.values():
+            concat_tables(shard_folders, table_name, output_folder, fieldnames)
+    finally:
+        shutil.rmtree(parts_folder, ignore_errors=True)
+    return sum(n_drugs for _, n_drugs in results)
+
+
+# Render the rows of one drug for every table as UTF-8 encoded CSV lines
+def render_drug_tables(drug):
+    rendered = {}
+    for table, rows in extract_drug_record(drug).items():
+        buffer = io.StringIO()
+        csv.DictWriter(buffer, fieldnames=OUTPUT_TABLES[table][1]).writerows(rows)
+        rendered[table] = buffer.getvalue().encode('utf-8')
+    return rendered
+
+
+# Size and SHA-256 of a file
+def file_fingerprint(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return {'size': os.path.getsize(path), 'sha256': digest.hexdigest()}
+
+
+# Load the manifest of the previous incremental run, or None if it is missing
+# or unusable: written by another extractor version, or its tables were
+# rewritten since (e.g. by a full run), so its byte ranges no longer hold
+def load_manifest(output_folder):
+    manifest_path = os.path.join(output_folder, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('extractor_version') != EXTRACTOR_VERSION:
+        return None
+    for table_name, _ in OUTPUT_TABLES.values():
+        path = table_path(table_name, output_folder, 'csv')
+        if not os.path.exists(path) or file_fingerprint(path) != manifest['tables'].get(table_name):
+            return None
+    return manifest
+
+
+# Remove the incremental bookkeeping of a previous run; called by full runs,
+# which rewrite the tables the manifest points into
+def remove_manifest(output_folder):
+    for file_name in (MANIFEST_FILE, CHANGES_FILE):
+        path = os.path.join(output_folder, file_name)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+# Re-extract only the drugs whose <drug> subtree changed since the previous run.
+# Rows of unchanged drugs are copied byte for byte from the previous tables, the
+# tables are then replaced in place and the added/changed/removed drugs are
+# listed in drug_changes.csv for the downstream stages. Without a usable
+# manifest every drug is extracted.
+def extract_drug_data_incremental(xml_file, output_folder):
+    manifest_data = load_manifest(output_folder)
+    source = file_fingerprint(xml_file)
+    if manifest_data is None:
+        print(f'No usable {MANIFEST_FILE}, extracting every drug')
+        manifest_data = {'drugs': []}
+    elif manifest_data['source'] == source:
+        # Same dump as the previous run and its tables are intact: nothing to do
+        with open(os.path.join(output_folder, CHANGES_FILE), 'w', newline='', encoding='utf-8') as f:
+            csv.DictWriter(f, fieldnames=['primary_drugbank_id', 'change']).writeheader()
+        return [], len(manifest_data['drugs'])
+    previous = {entry['primary_drugbank_id']: entry for entry in manifest_data['drugs']}
+    root_tag = read_root_tag(xml_file)
+
+    old_files = {}
+    new_files = {}
+    digests = {}
+    positions = {}
+    manifest = []
+    changes = []
+    try:
+        for table, (table_name, fieldnames) in OUTPUT_TABLES.items():
+            path = table_path(table_name, output_folder, 'csv')
+            if previous:
+                old_files[table] = open(path, 'rb')
+            new_files[table] = open(path + '.tmp', 'wb')
+            header = io.StringIO()
+            csv.DictWriter(header, fieldnames=fieldnames).writeheader()
+            header = header.getvalue().encode('utf-8')
+            digests[table] = hashlib.sha256(header)
+            positions[table] = new_files[table].write(header)
+
+        seen = set()
+        for drug_id, digest, offset, length in hash_drug_records(xml_file):
+            seen.add(drug_id)
+            old = previous.get(drug_id)
+            if old is not None and old['sha256'] == digest:
+                rendered = {}
+                for table in OUTPUT_TABLES:
+                    old_files[table].seek(int(old[f'{table}_offset']))
+                    rendered[table] = old_files[table].read(int(old[f'{table}_length']))
+            else:
+                drug = next(iter_drug_range(xml_file, offset, length, root_tag))
+                rendered = render_drug_tables(drug)
+                changes.append({'primary_drugbank_id': drug_id, 'change': 'changed' if old is not None else 'added'})
+
+            entry = {'primary_drugbank_id': drug_id, 'sha256': digest}
+            for table, data in rendered.items():
+                new_files[table].write(data)
+                digests[table].update(data)
+                entry[f'{table}_offset'] = positions[table]
+                entry[f'{table}_length'] = len(data)
+                positions[table] += len(data)
+            manifest.append(entry)
+
+        changes.extend({'primary_drugbank_id': drug_id, 'change': 'removed'} for drug_id in previous if drug_id not in seen)
+    finally:
+        for f in list(old_files.values()) + list(new_files.values()):
+            f.close()
+
+    # Patch the tables in place only once every drug has been written
+    for table_name, _ in OUTPUT_TABLES.values():
+        path = table_path(table_name, output_folder, 'csv')
+        os.replace(path + '.tmp', path)
+
+    # The tables are fingerprinted so a later run can tell whether they were rewritten
+    tables = {
+        table_name: {'size': positions[table], 'sha256': digests[table].hexdigest()}
+        for table, (table_name, _) in OUTPUT_TABLES.items()
+    }
+    with open(os.path.join(output_folder, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump({'extractor_version': EXTRACTOR_VERSION, 'source': source, 'tables': tables, 'drugs': manifest}, f)
+
+    with open(os.path.join(output_folder, CHANGES_FILE), 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=['primary_drugbank_id', 'change'])
         writer.writeheader()
-        writer.writerows(drug_interactions_data)
+        writer.writerows(changes)
+
+    return changes, len(manifest)
+
+
+def extract_drug_data(xml_file, output_folder, workers=1, incremental=False):
+    # Create output folder if it doesn't exist
+    if not os.path.exists(output_folder):
+        os.makedirs(output_folder)
+
+    start = time.perf_counter()
+    if incremental:
+        # The manifest records byte ranges of CSV rows, so this mode is CSV only
+        if STORAGE_FORMAT != 'csv':
+            raise ValueError('Incremental extraction requires DRUGBANK_STORAGE_FORMAT=csv')
+        changes, n_drugs = extract_drug_data_incremental(xml_file, output_folder)
+        print(f'{len(changes)} drugs added, changed or removed since the previous run')
+    elif workers > 1:
+        remove_manifest(output_folder)
+        n_drugs = extract_drug_data_parallel(xml_file, output_folder, workers)
+    else:
+        remove_manifest(output_folder)
+        # Stream the top-level drugs only; the nested <drug> references under
+        # pathways are not drug records and are never visited
+        n_drugs = write_drug_tables(iter_drugs(xml_file), output_folder)
+
+    # Throughput of the extraction loop: drugs and XML bytes per second
+    seconds = time.perf_counter() - start
+    add_section('extract_drug_data', seconds, rows=n_drugs, nbytes=os.path.getsize(xml_file))
+    return n_drugs
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Extract the DrugBank XML dump into CSV tables.')
+    parser.add_argument('--xml-file', default='full database.xml')
+    parser.add_argument('--output-folder', default='drug_data')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of extraction processes (default: 1, single streaming pass)')
+    parser.add_argument('--incremental', action='store_true',
+                        help=f'only re-extract drugs whose content hash differs from {MANIFEST_FILE}')
+    args = parser.parse_args()
 
-# Example usage
-xml_file = 'full database.xml'
-output_folder = 'drug_data'
-extract_drug_data(xml_file, output_folder)
-print(f'Data has been extracted to the folder: {output_folder}')
\ No newline at end of file
+    # Example usage
+    start_stage('extract')
+    extract_drug_data(args.xml_file, args.output_folder, workers=args.workers, incremental=args.incremental)
+    print(f'Data has been extracted to the folder: {args.output_folder}')
@@ -1,66 +1,37 @@
-import pandas as pd
+import os
 
-#-----------------------------
-####### Cleaning The main.database.csv file and removing unncecssary empty rows
-
-# Load CSV file
-file_path = "drug_data/main_database.csv"
-df = pd.read_csv(file_path)
-
-# Drop rows where the first three columns are empty
-df_cleaned = df.dropna(subset=df.columns[:3], how="all")
-
-# Save the cleaned data back to CSV
-output_path = "drug_data_cleaned/main_database.csv"
-df_cleaned.to_csv(output_path, index=False)
+from drugbank_profiling import section, start_stage
+from drugbank_storage import copy_table, read_table, table_path, write_table
 
-print(f"Cleaned (main_database.csv) saved as '{output_path}'")
-#-----------------------------
+start_stage("clean")
 
 #-----------------------------
-####### Cleaning The drug_categories.csv file and removing unncecssary empty rows all fo the rows where mis ID is mpty
-
-# Load CSV file
-file_path = "drug_data/drug_categories.csv"
-df = pd.read_csv(file_path)
-
-# Drop rows where the first three columns are empty
-df_cleaned = df.dropna(subset=df.columns[2], how="all")
-
-# Save the cleaned data back to CSV
-output_path = "drug_data_cleaned/drug_categories.csv"
-df_cleaned.to_csv(output_path, index=False)
-
-print(f"Cleaned (drug_categories.csv) saved as '{output_path}'")
+####### The extraction step only emits top-level drug records, so the tables no
+####### longer contain the empty rows of nested <drug> elements. They are carried
+####### over to the cleaned folder as they are, without parsing them again.
+
+os.makedirs("drug_data_cleaned", exist_ok=True)
+
+tables_to_copy = [
+    "main_database",
+    "drug_interactions",
+    "experimental_properties",
+    "pathways"
+]
+
+for table_name in tables_to_copy:
+    with section("copy_table", nbytes=os.path.getsize(table_path(table_name, "drug_data"))):
+        output_path = copy_table(table_name, "drug_data", "drug_data_cleaned")
+    print(f"Copied ({table_name}) to '{output_path}'")
 #-----------------------------
 
 #-----------------------------
-####### Bring the remaining datafiles to the new folder
-
-# Load CSV file - drug_interactions
-file_path = "drug_data/drug_interactions.csv"
-df = pd.read_csv(file_path)
-
-# Save data back to CSV
-output_path = "drug_data_cleaned/drug_interactions.csv"
-df.to_csv(output_path, index=False)
-
-#-----------------------------------------
+####### Cleaning the drug_categories table: removing all of the rows where the mesh ID is empty
 
-# Load CSV file - experimental_properties
-file_path = "drug_data/experimental_properties.csv"
-df = pd.read_csv(file_path)
+with section("clean_drug_categories", nbytes=os.path.getsize(table_path("drug_categories", "drug_data"))):
+    df = read_table("drug_categories", "drug_data")
+    df_cleaned = df.dropna(subset=["mesh_id"])
+    output_path = write_table(df_cleaned, "drug_categories", "drug_data_cleaned")
 
-# Save data back to CSV
-output_path = "drug_data_cleaned/experimental_properties.csv"
-df.to_csv(output_path, index=False)
-
-#-----------------------------------------
-
-# Load CSV file - pathways.csv
-file_path = "drug_data/pathways.csv"
-df = pd.read_csv(file_path)
-
-# Save data back to CSV
-output_path = "drug_data_cleaned/pathways.csv"
-df.to_csv(output_path, index=False)
\ No newline at end of file
+print(f"Cleaned (drug_categories) saved as '{output_path}'")
+#-----------------------------
@@ -1,43 +1,40 @@
-import pandas as pd
+from drugbank_profiling import section, start_stage
+from drugbank_properties import PROPERTY_TABLE, pivot_properties
+from drugbank_storage import read_table, write_table
 
-# Load both CSV files
-exp_props = pd.read_csv("drug_data_cleaned/experimental_properties.csv")
-main_db = pd.read_csv("drug_data_cleaned/main_database.csv")
+start_stage("properties")
 
-# Drop source column
-exp_props = exp_props.drop(columns=['source'])
+# Load the property table (the source column is not needed)
+exp_props = read_table("experimental_properties", "drug_data_cleaned", columns=["primary_drugbank_id", "kind", "value"])
 
-# Drop molecular_weight column
-if 'molecular_weight' in main_db.columns:
-    main_db = main_db.drop(columns=['molecular_weight'])
-
-# Pivot the experimental_properties table
-pivoted_props = exp_props.pivot_table(
-    index='primary_drugbank_id',
-    columns='kind',
-    values='value',
-    aggfunc='first'  # If multiple values exist, pick the first
-).reset_index()
-
-# Merge with main_database on primary_drugbank_id
-merged = pd.merge(main_db, pivoted_props, on="primary_drugbank_id", how="left")
+# Pivot the experimental_properties table into one typed column per kind.
+# The result is stored as its own table keyed on primary_drugbank_id instead of
+# being merged into a copy of the wide main table; stage 6 joins it back.
+with section("pivot_properties", rows=len(exp_props)):
+    pivoted_props = pivot_properties(exp_props).reset_index()
 
-# Save to a new CSV
-merged.to_csv("drug_data_cleaned/main_database_with_properties.csv", index=False)
+# Save to a new table
+output_path = write_table(pivoted_props, PROPERTY_TABLE, "drug_data_cleaned")
 
-print("✅ Merged successfully! Output file: main_database_with_properties.csv")
+print(f"✅ Pivoted successfully! Output file: {output_path}")
 
 #--------------
 # counting how many drugs have complete data.
 
 
-# Load the merged dataset
-df = pd.read_csv("drug_data_cleaned/main_database_with_properties.csv")
+# Load the main table
+main_db = read_table("main_database", "drug_data_cleaned")
+
+# Drop molecular_weight column
+if 'molecular_weight' in main_db.columns:
+    main_db = main_db.drop(columns=['molecular_weight'])
 
-# Count complete rows (no NaN values at all)
-complete_rows = df.dropna().shape[0]
-total_rows = df.shape[0]
+# Count complete rows (no NaN values at all in the main columns or in any property kind)
+complete_props = pivoted_props.set_index("primary_drugbank_id").notna().all(axis=1)
+has_complete_props = main_db["primary_drugbank_id"].astype(str).map(complete_props).fillna(False).astype(bool)
+complete_rows = int((main_db.notna().all(axis=1) & has_complete_props).sum())
+total_rows = main_db.shape[0]
 
 print(f"✅ Complete rows (no missing values): {complete_rows}")
 print(f"🧮 Total rows: {total_rows}")
-print(f"📉 Percentage of complete rows: {100 * complete_rows / total_rows:.2f}%")
\ No newline at end of file
+print(f"📉 Percentage of complete rows: {100 * complete_rows / total_rows:.2f}%")
@@ -1,37 +1,114 @@
+import argparse
+import os
+
+import numpy as np
 import pandas as pd
-import re
 
-# Load the interaction file
-df = pd.read_csv("drug_data_cleaned/drug_interactions.csv", dtype=str)
-df = df.fillna("")
+from drugbank_graph import GRAPH_FOLDER, build_graph, save_graph
+from drugbank_interactions import (
+    INTERACTION_STORE_FILE, TemplateVocabulary, build_drug_index, load_interaction_store, normalize_descriptions,
+    write_interaction_edges, write_interaction_store
+)
+from drugbank_lookup import DrugLookup
+from drugbank_profiling import section, start_stage
+from drugbank_storage import TableAppender, iter_table_chunks, read_table, write_table
+
+
+# Add interaction_template and interaction_type to (a chunk of) the interaction table
+def encode_interactions(df, lookup, vocabulary):
+    df = df.fillna("")
+
+    # Replace the names of both drugs with DRUG_A/DRUG_B placeholders to get the interaction template
+    drug_a_names = lookup.names_of(df["primary_drugbank_id"], default="")
+    with section("normalize_descriptions", rows=len(df)):
+        df["interaction_template"] = normalize_descriptions(df["description"], drug_a_names, df["name"])
+
+    # Encode to integer labels with the persistent vocabulary: templates seen in an
+    # earlier release keep their ID, new ones are appended
+    with section("encode_templates", rows=len(df)):
+        df["interaction_type"] = vocabulary.encode(df["interaction_template"])
+        df["interaction_template"] = vocabulary.decode(df["interaction_type"])
+    return df
+
+
+# Drug indexes of a column of IDs; IDs not in `index` yet are appended to it
+def _drug_indexes(drug_ids, index):
+    for drug_id in pd.unique(drug_ids):
+        index.setdefault(drug_id, len(index))
+    return drug_ids.map(index).to_numpy(dtype=np.int32)
+
+
+start_stage("interactions")
+parser = argparse.ArgumentParser(description="Normalize and encode the drug interaction table.")
+parser.add_argument("--chunk-size", type=int, default=None,
+                    help="process the interaction table in chunks of this many rows, keeping memory bounded "
+                         "(default: load the whole table)")
+args = parser.parse_args()
+
+# Actual names of DRUG_A from main_database
+main = read_table("main_database", "drug_data_cleaned", columns=["primary_drugbank_id", "name"])
+lookup = DrugLookup(main["primary_drugbank_id"], main["name"])
+primary_ids = build_drug_index(main["primary_drugbank_id"].astype(str))
+vocabulary = TemplateVocabulary.load()
+store_file = os.path.join("drug_data_cleaned", INTERACTION_STORE_FILE)
 
-# Merge in the actual names of DRUG_A from main_database if needed
-main = pd.read_csv("drug_data_cleaned/main_database_with_properties.csv", usecols=["primary_drugbank_id", "name"])
-id2name = dict(zip(main["primary_drugbank_id"], main["name"]))
+if args.chunk_size is None:
+    # Load the interaction table
+    df = read_table("drug_interactions", "drug_data_cleaned", dtype=str)
+    df = encode_interactions(df, lookup, vocabulary)
+    rows = len(df)
+    preview = df
 
-# Function to clean description using DRUG_A and DRUG_B placeholders
-def normalize_description(row):
-    desc = row["description"]
-    drug_a_id = row["primary_drugbank_id"]
-    drug_b_name = row["name"]
+    # Save updated version
+    write_table(df, "drug_interactions_encoded", "drug_data_cleaned")
 
-    # Try to get the actual name of the primary drug
-    drug_a_name = id2name.get(drug_a_id, "")
+    # Compact edge list: int32 drug indexes, one edge per drug pair, template text stored once
+    drug_ids = build_drug_index(primary_ids, set(df["primary_drugbank_id"]) | set(df["drugbank_id"]))
+    with section("write_interaction_store", rows=rows):
+        store_path = write_interaction_store(
+            store_file, drug_ids, df["primary_drugbank_id"], df["drugbank_id"], df["interaction_type"], vocabulary.templates
+        )
+else:
+    # Out of core: every chunk is encoded and appended to the output as soon as
+    # it is read, only the int32 edge columns of the compact store are kept.
+    # On a fresh vocabulary, templates are numbered chunk by chunk (sorted
+    # within a chunk) instead of over the whole table.
+    index = {drug_id: i for i, drug_id in enumerate(primary_ids)}
+    sources, targets, types = [], [], []
+    rows = 0
+    preview = None
+    with TableAppender("drug_interactions_encoded", "drug_data_cleaned") as output:
+        for chunk in iter_table_chunks("drug_interactions", "drug_data_cleaned", args.chunk_size, dtype=str):
+            chunk = encode_interactions(chunk, lookup, vocabulary)
+            # int32 whatever the vocabulary size, so every chunk has the same column type
+            chunk["interaction_type"] = chunk["interaction_type"].astype(np.int32)
+            output.append(chunk)
 
-    # Remove both names from the description
-    desc = re.sub(re.escape(drug_a_name), "DRUG_A", desc, flags=re.IGNORECASE)
-    desc = re.sub(re.escape(drug_b_name), "DRUG_B", desc, flags=re.IGNORECASE)
-    
-    return desc.strip()
+            sources.append(_drug_indexes(chunk["primary_drugbank_id"], index))
+            targets.append(_drug_indexes(chunk["drugbank_id"], index))
+            types.append(chunk["interaction_type"].to_numpy())
+            rows += len(chunk)
+            if preview is None:
+                preview = chunk.head(10)
 
-# Apply function to get interaction template
-df["interaction_template"] = df.apply(normalize_description, axis=1)
+    # Partners without a drug record are sorted like in build_drug_index
+    drug_ids = build_drug_index(primary_ids, list(index)[len(primary_ids):])
+    final_index = {drug_id: i for i, drug_id in enumerate(drug_ids)}
+    remap = np.fromiter((final_index[drug_id] for drug_id in index), dtype=np.int32, count=len(index))
+    with section("write_interaction_store", rows=rows):
+        store_path = write_interaction_edges(
+            store_file, drug_ids, remap[np.concatenate(sources)], remap[np.concatenate(targets)], np.concatenate(types),
+            vocabulary.templates
+        )
 
-# Encode to integer labels
-df["interaction_type"] = df["interaction_template"].astype("category").cat.codes
+vocabulary_path = vocabulary.save()
 
-# Save updated version
-df.to_csv("drug_data_cleaned/drug_interactions_encoded.csv", index=False)
+# CSR adjacency of the interaction graph, saved as memory-mappable .npy arrays
+with section("build_graph", rows=rows):
+    graph_folder = save_graph(build_graph(load_interaction_store(store_path)), os.path.join("drug_data_cleaned", GRAPH_FOLDER))
 
 print("✅ Template normalization complete.")
-print(df[["primary_drugbank_id", "drugbank_id", "interaction_template", "interaction_type"]].head(10))
+print(f"✅ Template vocabulary saved: {vocabulary_path} ({len(vocabulary)} templates)")
+print(f"✅ Compact interaction store saved: {store_path}")
+print(f"✅ Interaction graph saved: {graph_folder}")
+print(preview[["primary_drugbank_id", "drugbank_id", "interaction_template", "interaction_type"]].head(10))
@@ -1,38 +1,55 @@
-import pandas as pd
-
-# Load your main database and pathways data
-main_df = pd.read_csv("drug_data_cleaned/main_database_with_properties.csv",low_memory=False)
-pathways_df = pd.read_csv("drug_data_cleaned/pathways.csv")
-
-# Fill NA with empty strings to avoid join/agg errors
-pathways_df.fillna("", inplace=True)
-
-# Group pathway info by primary_drugbank_id
-pathway_summary = pathways_df.groupby("primary_drugbank_id").agg({
-    "pathway_smpdb_id": "count",
-    "pathway_category": lambda x: ",".join(set([i.strip() for i in x if i])),
-    "pathway_enzymes": lambda x: len(set(",".join(x).replace(" ", "").split(","))) if x.any() else 0
-}).reset_index()
-
-# Rename columns for clarity
-pathway_summary.rename(columns={
-    "pathway_smpdb_id": "pathway_count",
-    "pathway_category": "unique_pathway_categories",
-    "pathway_enzymes": "unique_enzyme_count"
-}, inplace=True)
-
-# Add flag column
-pathway_summary["has_pathway_info"] = 1
-
-# Merge into main dataframe
-merged_df = main_df.merge(pathway_summary, how="left", on="primary_drugbank_id")
-
-# Fill missing values for drugs that had no pathway entry
-merged_df["pathway_count"] = merged_df["pathway_count"].fillna(0).astype(int)
-merged_df["unique_enzyme_count"] = merged_df["unique_enzyme_count"].fillna(0).astype(int)
-merged_df["has_pathway_info"] = merged_df["has_pathway_info"].fillna(0).astype(int)
-merged_df["unique_pathway_categories"] = merged_df["unique_pathway_categories"].fillna("")
-
-# Save the merged file
-merged_df.to_csv("drug_data_cleaned/main_database_with_properties_and_pathways.csv", index=False)
-print("✅ Merged pathway data into 'drug_data_cleaned/main_database_with_properties_and_pathways.csv'")
+import argparse
+import os
+
+from drugbank_multihot import MULTI_HOT_FOLDER, save_multi_hot
+from drugbank_pathways import PATHWAY_SUMMARY_TABLE, pathway_multi_hot, summarize_pathways
+from drugbank_profiling import section, start_stage
+from drugbank_storage import read_table, write_table
+
+
+def merge_pathways(multi_hot=False):
+    # Load the drug IDs of the main database and the pathways data
+    main_df = read_table("main_database", "drug_data_cleaned", columns=["primary_drugbank_id"])
+    pathways_df = read_table("pathways", "drug_data_cleaned", dtype=str)
+
+    # Fill NA with empty strings to avoid join/agg errors
+    pathways_df.fillna("", inplace=True)
+
+    # Group pathway info by primary_drugbank_id (pathway_count, unique_pathway_categories,
+    # unique_enzyme_count, has_pathway_info)
+    with section("summarize_pathways", rows=len(pathways_df)):
+        pathway_summary = summarize_pathways(pathways_df)
+
+    # One summary row per drug of the main database, in its order; stage 6 joins
+    # the summary back on primary_drugbank_id
+    merged_df = main_df.merge(pathway_summary, how="left", on="primary_drugbank_id")
+
+    # Fill missing values for drugs that had no pathway entry
+    merged_df["pathway_count"] = merged_df["pathway_count"].fillna(0).astype(int)
+    merged_df["unique_enzyme_count"] = merged_df["unique_enzyme_count"].fillna(0).astype(int)
+    merged_df["has_pathway_info"] = merged_df["has_pathway_info"].fillna(0).astype(int)
+    merged_df["unique_pathway_categories"] = merged_df["unique_pathway_categories"].fillna("")
+
+    # Save the keyed summary table
+    output_path = write_table(merged_df, PATHWAY_SUMMARY_TABLE, "drug_data_cleaned")
+    print(f"✅ Pathway summary saved to '{output_path}'")
+
+    # Sparse drug x pathway / drug x enzyme matrices, rows in the order of the main table
+    if multi_hot:
+        drug_ids = merged_df["primary_drugbank_id"].astype(str).tolist()
+        folder = os.path.join("drug_data_cleaned", MULTI_HOT_FOLDER)
+        with section("pathway_multi_hot", rows=len(pathways_df)):
+            matrices = pathway_multi_hot(pathways_df, drug_ids)
+        for name, (matrix, columns) in matrices.items():
+            path = save_multi_hot(name, matrix, drug_ids, columns, folder)
+            print(f"✅ Saved {matrix.shape[0]} x {matrix.shape[1]} multi-hot matrix: {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize the pathway table per drug.")
+    parser.add_argument("--multi-hot", action="store_true",
+                        help=f"also write sparse pathway and enzyme multi-hot matrices to drug_data_cleaned/{MULTI_HOT_FOLDER}")
+    args = parser.parse_args()
+
+    start_stage("pathways")
+    merge_pathways(multi_hot=args.multi_hot)
@@ -1,254 +1,200 @@
-import pandas as pd
-import numpy as np
-import re
-import hashlib
+import argparse
+import json
 import os
-from collections import defaultdict
 import shutil
-from typing import List, Dict, Tuple, Union
-
-# Extracting Float
-def extract_float(text):
-    if pd.isna(text): return None
-    text = str(text)
-    match = re.findall(r"[-+]?\d*\.\d+|\d+", text.replace("Â", "").replace("â", ""))
-    try:
-        return sum(float(x) for x in match) / len(match) if match else None
-    except ValueError:
-        return None
-
-# Boiling Point
-def extract_boiling_point(value):
-    if pd.isna(value):
-        return None
-    value = str(value)
-    # Find numbers with optional decimal
-    matches = re.findall(r"[-+]?\d*\.\d+|\d+", value)
-    try:
-        # Convert to float if numbers exist and are valid
-        valid = [float(m) for m in matches if m.strip() not in [".", ""]]
-        if valid:
-            return sum(valid) / len(valid)  # return average if range or multiple
-    except ValueError:
-        pass
-    return None
-
-# Isoelectric Point
-def extract_isoelectric_point(value):
-    if pd.isna(value):
-        return None
-    value = str(value).lower()
-    if "no distinct" in value or "does not" in value:
-        return None
-    matches = re.findall(r"[-+]?\d*\.\d+|\d+", value)
-    try:
-        nums = [float(x) for x in matches if x.strip() not in [".", ""]]
-        return np.mean(nums) if nums else None
-    except:
-        return None
-
-# Melting Point
-def extract_melting_point(value):
-    if pd.isna(value):
-        return None
-    value = str(value).lower()
-    if "decompose" in value:
-        return None
-    matches = re.findall(r"[-+]?\d*\.\d+|\d+", value)
-    try:
-        nums = [float(x) for x in matches if x.strip() not in [".", ""]]
-        return np.mean(nums) if nums else None
-    except:
-        return None
-
-# Water Solubility
-def extract_water_solubility(value):
-    if pd.isna(value):
-        return None
-    value = str(value).lower()
-    if "insoluble" in value or "practically insoluble" in value:
-        return 0.0
-    matches = re.findall(r"[-+]?\d*\.\d+|\d+", value)
-    try:
-        nums = [float(x) for x in matches if x.strip() not in [".", ""]]
-        if "mg/ml" in value:
-            return nums[0] * 1.0 if nums else None
-        elif "mg/l" in value:
-            return nums[0] / 1000.0 if nums else None
-        elif "g/l" in value:
-            return nums[0]
-        else:
-            return np.mean(nums)  # fallback
-    except:
-        return None
-
-# pKa
-def extract_pka(value):
-    if pd.isna(value):
-        return None
-    value = str(value).lower()
-    if "strongest acidic" in value or "strongest basic" in value or "not available" in value:
-        return None
-    matches = re.findall(r"[-+]?\d*\.\d+|\d+", value)
-    try:
-        nums = [float(x) for x in matches if x.strip() not in [".", ""]]
-        return np.mean(nums) if nums else None
-    except:
-        return None
-
-# SMILES (Encode to fixed-length hash/embedding)
-def encode_smiles(smile):
-    if pd.isna(smile): return None
-    return int(hashlib.sha256(smile.encode()).hexdigest(), 16) % (10**8)  # 8-digit hash
-
-# SMILE
-def extract_smiles_features(smiles):
-    if pd.isna(smiles) or not isinstance(smiles, str):
-        return pd.Series({
-            "smiles_length": 0,
-            "smiles_num_branches": 0,
-            "smiles_num_rings": 0,
-            "smiles_num_aromatic": 0,
-        })
-    return pd.Series({
-        "smiles_length": len(smiles),
-        "smiles_num_branches": smiles.count("("),
-        "smiles_num_rings": sum(smiles.count(x) for x in "123456789"),
-        "smiles_num_aromatic": sum(smiles.count(x) for x in "cnops"),
-    })
-
-# Main feature extraction function for toxicity text
-def extract_toxicity_features(text: str) -> Dict[str, Union[bool, str, float, List, Dict]]:
-    if pd.isna(text) or not isinstance(text, str):
-        return {
-            "tox_tested_animals": [],
-            "tox_dose_by_route": {},
-            "observed_effects": [],
-            "tox_threshold_by_species": {},
-            "mutagenic_or_carcinogenic": None,
-            "ld50_values": [],
-            "human_toxicity_notes": [],
-            "overdose_treatment": False,
-            "adverse_effect_frequency": None,
-            "special_population_caution": [],
-            "tox_ref_ids": []
-        }
-
-    animals = re.findall(r"\b(mouse|mice|rat|rats|monkey|monkeys|dog|dogs|rabbit|rabbits|hamster|hamsters)\b", text, re.I)
-    tox_tested_animals = list(set([a.lower().rstrip('s') for a in animals]))
-
-    routes = ['intravenous', 'subcutaneous', 'oral', 'topical', 'intramuscular']
-    tox_dose_by_route = {}
-    for route in routes:
-        pattern = rf"{route}.*?\b(?:in|of)?\s?(mice|rats|monkeys|dogs|rabbits|hamsters)[^\.]*?\((?:[><]\s*)?(\d+\.?\d*)(?:\s*-\s*(\d+\.?\d*))?\s*mg/kg(?:\s*[><])?\)"
-        matches = re.findall(pattern, text, re.I)
-        for animal, low, high in matches:
-            animal = animal.lower().rstrip('s')
-            if high:
-                tox_dose_by_route.setdefault(route, []).append((animal, float(low), float(high)))
-            else:
-                tox_dose_by_route.setdefault(route, []).append((animal, float(low), "unspecified"))
-
-    observed_effects = re.findall(r"(hemorrhage|hematoma|nodule|fever|rash|dyspnea|chest pain|urticaria|conjunctivitis|voice alteration|pharyngitis|laryngitis|rhinitis)", text, re.I)
-    observed_effects = list(set([e.lower() for e in observed_effects]))
-
-    threshold_matches = re.findall(r"(\d+\.?\d*)\s*mg/kg.*?(mouse|mice|rat|rats|monkey|monkeys)", text, re.I)
-    tox_threshold_by_species = {}
-    for dose, species in threshold_matches:
-        species = species.lower().rstrip('s')
-        dose = float(dose)
-        tox_threshold_by_species[species] = min(dose, tox_threshold_by_species.get(species, float("inf")))
-
-    mutagenicity = None
-    if re.search(r"not.*mutagenic", text, re.I):
-        mutagenicity = "non-mutagenic"
-    elif re.search(r"mutagenic", text, re.I):
-        mutagenicity = "mutagenic"
-    if re.search(r"not.*carcinogenic", text, re.I):
-        mutagenicity = mutagenicity or "non-carcinogenic"
-    elif re.search(r"carcinogenic", text, re.I):
-        mutagenicity = mutagenicity or "carcinogenic"
-
-    ld50_matches = re.findall(r"(mouse|mice|rat|rats|monkey|monkeys).*?LD<sub>50</sub>.*?([><=])\s*(\d+\.?\d*)\s*mg/kg", text, re.I)
-    ld50_values = [(sp.lower().rstrip('s'), "unspecified", float(val), comp) for sp, comp, val in ld50_matches]
-
-    overdose_phrases = re.findall(r"(stop.*?lepirudin|transfusion|shock|aPTT|hemodialysis|hemofiltration)", text, re.I)
-    overdose_treatment = bool(overdose_phrases)
-
-    human_toxicity = []
-    for sentence in re.split(r"(?<=[.])\s+", text):
-        if any(word in sentence.lower() for word in ["renal impairment", "antidote", "bleeding", "transfusion", "aPTT"]):
-            human_toxicity.append(sentence.strip())
-
-    adverse_effect_freq = None
-    freq_match = re.search(r"frequency.*?(<\s*1/\d+|\d+\s*%)", text, re.I)
-    if freq_match:
-        adverse_effect_freq = freq_match.group(1)
-
-    special_population = []
-    for pop in ["pregnant women", "nursing women", "children", "elderly"]:
-        if pop in text.lower():
-            special_population.append(pop)
-
-    ref_ids = list(set(re.findall(r"\[L\d+\]", text)))
-
-    return {
-        "tox_tested_animals": tox_tested_animals,
-        "tox_dose_by_route": tox_dose_by_route,
-        "observed_effects": observed_effects,
-        "tox_threshold_by_species": tox_threshold_by_species,
-        "mutagenic_or_carcinogenic": mutagenicity,
-        "ld50_values": ld50_values,
-        "human_toxicity_notes": human_toxicity,
-        "overdose_treatment": overdose_treatment,
-        "adverse_effect_frequency": adverse_effect_freq,
-        "special_population_caution": special_population,
-        "tox_ref_ids": ref_ids
-    }
 
-# Implementation
-df = pd.read_csv("drug_data_cleaned/main_database_with_properties_and_pathways.csv",low_memory=False)
-
-# Apply feature cleaners
-df["Boiling Point"] = df["Boiling Point"].apply(extract_boiling_point)
-df["Melting Point"] = df["Melting Point"].apply(extract_melting_point)
-df["Isoelectric Point"] = df["Isoelectric Point"].apply(extract_isoelectric_point)
-df["Water Solubility (g/L)"] = df["Water Solubility"].apply(lambda x: extract_float(x) if "mg" in str(x) or "g" in str(x) else None)
-df["pKa"] = df["pKa"].apply(extract_pka)
-tox_features_df = df['toxicity'].apply(extract_toxicity_features).apply(pd.Series)
-df = pd.concat([df, tox_features_df], axis=1)
-
-# SMILES encoding and structural feature extraction
-df["SMILES_hash"] = df["SMILES"].apply(encode_smiles)
-smiles_features = df["SMILES"].apply(extract_smiles_features)
-df = pd.concat([df, smiles_features], axis=1)
-
-# (Optional) Drop the original messy columns
-df.drop(columns=[col for col in ["Water Solubility"] if col in df.columns], inplace=True)
-
-df.to_csv("drug_data_cleaned/main_database_cleaned_and_encoded.csv", index=False)
-print("✅ Cleaned and saved: main_database_cleaned_and_encoded.csv")
-
-# Source and destination folders
-source_folder = "drug_data_cleaned"
-destination_folder = "Drugbank_final_database"
-
-# Create the destination folder if it doesn't exist
-os.makedirs(destination_folder, exist_ok=True)
-
-# Files you want to move
-files_to_move = [
-    "main_database_cleaned_and_encoded.csv",
-    "drug_interactions_encoded.csv"
-]
-
-# Move files one by one
-for file_name in files_to_move:
-    src_path = os.path.join(source_folder, file_name)
-    dst_path = os.path.join(destination_folder, file_name)
-
-    if os.path.exists(src_path):
-        shutil.move(src_path, dst_path)
-        print(f"✅ Moved '{file_name}' to '{destination_folder}'")
-    else:
-        print(f"❌ File not found: {src_path}")
\ No newline at end of file
+import numpy as np
+
+from drugbank_feature_cache import FEATURE_CACHE_FILE, FEATURE_CACHE_MAX_BYTES, open_feature_cache
+from drugbank_features import (
+    FEATURIZE_CHUNK_SIZE, FEATURIZER_VERSIONS, feature_input_digests, featurize_frame_parallel,
+    featurizer_version, previous_feature_results
+)
+from drugbank_graph import GRAPH_FOLDER
+from drugbank_interactions import INTERACTION_STORE_FILE
+from drugbank_profiling import section, start_stage
+from drugbank_properties import read_merged_drug_table
+from drugbank_smiles import (
+    FINGERPRINT_BITS, FINGERPRINT_NGRAMS, SMILES_FINGERPRINT_FILE, load_fingerprints, save_fingerprints,
+    smiles_fingerprints
+)
+from drugbank_storage import STORAGE_FORMAT, read_table, table_exists, table_path, write_table
+from drugbank_xml import CHANGES_FILE, read_drug_changes
+
+FINAL_FOLDER = "Drugbank_final_database"
+
+# Featurizer inputs and versions of the last run (next to its outputs in the
+# final folder), checked by --incremental before reusing any of its features
+FEATURE_INPUTS_FILE = "feature_inputs.json"
+
+# Versions of everything a run's features depend on: the cached featurizers
+# and the SMILES fingerprints
+FEATURE_VERSIONS = dict(
+    FEATURIZER_VERSIONS,
+    smiles_fingerprints=featurizer_version(smiles_fingerprints, FINGERPRINT_BITS, FINGERPRINT_NGRAMS)
+)
+
+
+# The previous run's record (FEATURE_INPUTS_FILE) and the drugs whose features
+# can be taken from it: those not added or changed by the last incremental
+# extraction (CHANGES_FILE) whose featurizer inputs are the same as in that
+# run. Returns (record, set of drug ids); (None, empty set) when everything
+# has to be featurized.
+def previous_run(digests):
+    changes = read_drug_changes("drug_data")
+    if changes is None:
+        print(f"No {CHANGES_FILE} (the last extraction was a full one), featurizing every drug")
+        return None, set()
+    record_path = os.path.join(FINAL_FOLDER, FEATURE_INPUTS_FILE)
+    if not os.path.exists(record_path) or not table_exists("main_database_cleaned_and_encoded", FINAL_FOLDER):
+        print("No previous stage 6 output, featurizing every drug")
+        return None, set()
+    with open(record_path, encoding="utf-8") as f:
+        record = json.load(f)
+    if record["storage_format"] != STORAGE_FORMAT:
+        print(f"Previous stage 6 output is {record['storage_format']}, featurizing every drug")
+        return None, set()
+
+    reuse = {
+        drug_id for drug_id, digest in digests.items()
+        if changes.get(drug_id) not in ("added", "changed") and record["drugs"].get(drug_id) == digest
+    }
+    removed = sum(change == "removed" for change in changes.values())
+    print(f"Incremental: {len(reuse)} drugs reused, {len(digests) - len(reuse)} to featurize, {removed} removed")
+    return record, reuse
+
+
+# Fingerprints of the SMILES column, rows in table order. Drugs in `reuse` keep
+# their rows of the previous run's store when it was built by the same code.
+def encode_fingerprints(df, record=None, reuse=()):
+    if not reuse or record["versions"].get("smiles_fingerprints") != FEATURE_VERSIONS["smiles_fingerprints"] \
+            or not os.path.exists(os.path.join(FINAL_FOLDER, SMILES_FINGERPRINT_FILE)):
+        with section("smiles_fingerprints", rows=len(df)):
+            return smiles_fingerprints(df["SMILES"])
+
+    previous, previous_ids = load_fingerprints(FINAL_FOLDER)
+    positions = dict(zip(previous_ids, range(len(previous_ids))))
+    rows = np.array([positions.get(drug_id, -1) if drug_id in reuse else -1 for drug_id in df["primary_drugbank_id"]],
+                    dtype=np.intp)
+    missing = rows < 0
+    with section("smiles_fingerprints", rows=int(missing.sum())):
+        computed = smiles_fingerprints(df["SMILES"][missing])
+    fingerprints = np.empty((len(df), computed.shape[1]), dtype=np.uint8)
+    fingerprints[missing] = computed
+    fingerprints[~missing] = previous[rows[~missing]]
+    return fingerprints
+
+
+def clean_and_encode(workers=1, chunk_size=FEATURIZE_CHUNK_SIZE, cache_path=None,
+                     cache_max_bytes=FEATURE_CACHE_MAX_BYTES, incremental=False):
+    # Main table joined with the keyed property (stage 3) and pathway summary (stage 5) tables
+    df = read_merged_drug_table("drug_data_cleaned")
+    digests = feature_input_digests(df)
+
+    # With --incremental the featurizer results of unchanged drugs are read
+    # back from the previous output; removed drugs are simply no longer in the
+    # merged table
+    record, reuse, known = None, set(), None
+    if incremental:
+        record, reuse = previous_run(digests)
+        if reuse:
+            previous = read_table("main_database_cleaned_and_encoded", FINAL_FOLDER, dtype=str)
+            reuse &= set(previous["primary_drugbank_id"])
+            known = previous_feature_results(df, previous, reuse, record["versions"])
+    # The outputs the record describes are about to be replaced
+    record_path = os.path.join(FINAL_FOLDER, FEATURE_INPUTS_FILE)
+    if os.path.exists(record_path):
+        os.remove(record_path)
+
+    # Feature cleaners, toxicity text features and SMILES encoding, in row blocks.
+    # With a feature cache, text featurizer results of earlier runs are reused.
+    df = featurize_frame_parallel(df, workers=workers, chunk_size=chunk_size, cache_path=cache_path, known=known)
+
+    # Entries of old featurizer versions are dead, then trim to the size bound
+    cache = open_feature_cache(cache_path)
+    if cache is not None:
+        with cache:
+            cache.prune(FEATURIZER_VERSIONS)
+            evicted = cache.evict(cache_max_bytes)
+        print(f"✅ Feature cache: {cache_path} ({evicted} entries evicted)")
+
+    # (Optional) Drop the original messy columns
+    df.drop(columns=[col for col in ["Water Solubility"] if col in df.columns], inplace=True)
+
+    output_path = write_table(df, "main_database_cleaned_and_encoded", "drug_data_cleaned")
+    print(f"✅ Cleaned and saved: {output_path}")
+
+    # Hashed SMILES n-gram fingerprints of all drugs, bit-packed, rows in table order
+    fingerprints = encode_fingerprints(df, record, reuse)
+    fingerprint_path = save_fingerprints(fingerprints, df["primary_drugbank_id"], "drug_data_cleaned")
+    print(f"✅ SMILES fingerprints saved: {fingerprint_path}")
+
+    # Inputs of this run's features, for the next --incremental run
+    with open(os.path.join("drug_data_cleaned", FEATURE_INPUTS_FILE), "w", encoding="utf-8") as f:
+        json.dump({"storage_format": STORAGE_FORMAT, "versions": FEATURE_VERSIONS, "drugs": digests}, f)
+
+
+def move_to_final():
+    # Source and destination folders
+    source_folder = "drug_data_cleaned"
+    destination_folder = FINAL_FOLDER
+
+    # Create the destination folder if it doesn't exist
+    os.makedirs(destination_folder, exist_ok=True)
+
+    # Tables you want to move
+    tables_to_move = [
+        "main_database_cleaned_and_encoded",
+        "drug_interactions_encoded"
+    ]
+
+    # Move files one by one
+    for table_name in tables_to_move:
+        src_path = table_path(table_name, source_folder)
+        dst_path = table_path(table_name, destination_folder)
+
+        if os.path.exists(src_path):
+            shutil.move(src_path, dst_path)
+            print(f"✅ Moved '{os.path.basename(src_path)}' to '{destination_folder}'")
+        else:
+            print(f"❌ File not found: {src_path}")
+
+    # Array stores are moved as they are
+    for file_name in [INTERACTION_STORE_FILE, GRAPH_FOLDER, SMILES_FINGERPRINT_FILE, FEATURE_INPUTS_FILE]:
+        src_path = os.path.join(source_folder, file_name)
+        dst_path = os.path.join(destination_folder, file_name)
+        if os.path.exists(src_path):
+            # A folder would otherwise be moved inside the one left by a previous run
+            if os.path.isdir(dst_path):
+                shutil.rmtree(dst_path)
+            shutil.move(src_path, dst_path)
+            print(f"✅ Moved '{file_name}' to '{destination_folder}'")
+        else:
+            print(f"❌ File not found: {src_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Clean and encode the merged drug table and move the results to the final folder.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of featurization processes (default: 1, no pool)")
+    parser.add_argument("--chunk-size", type=int, default=FEATURIZE_CHUNK_SIZE,
+                        help=f"rows per block handed to a worker (default: {FEATURIZE_CHUNK_SIZE})")
+    parser.add_argument("--feature-cache", metavar="PATH",
+                        help=f"SQLite file caching text featurizer results across runs, e.g. {FEATURE_CACHE_FILE} "
+                             "(default: no cache, every feature is recomputed)")
+    parser.add_argument("--feature-cache-mb", type=int, default=FEATURE_CACHE_MAX_BYTES // (1024 * 1024),
+                        help="size the feature cache is trimmed to after the run, in MB (default: %(default)s)")
+    parser.add_argument("--incremental", action="store_true",
+                        help=f"only featurize the drugs added or changed by the last stage 1 --incremental run "
+                             f"(drug_data/{CHANGES_FILE}); the others keep their features from the previous output")
+    args = parser.parse_args()
+
+    # Implementation
+    start_stage("final")
+    clean_and_encode(
+        workers=args.workers, chunk_size=args.chunk_size,
+        cache_path=args.feature_cache,
+        cache_max_bytes=args.feature_cache_mb * 1024 * 1024,
+        incremental=args.incremental
+    )
+    move_to_final()
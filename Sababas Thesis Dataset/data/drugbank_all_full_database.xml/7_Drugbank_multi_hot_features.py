@@ -0,0 +1,44 @@
+import os
+
+from drugbank_multihot import MULTI_HOT_FOLDER, multi_hot, save_multi_hot, split_labels
+from drugbank_pathways import PATHWAY_SUMMARY_TABLE
+from drugbank_profiling import section, start_stage
+from drugbank_storage import read_table
+
+# Food interactions are full sentences that may contain commas themselves
+# ("... e.g. garlic, ginger, bilberry."), so they are only split where one
+# sentence ends and the next begins
+FOOD_INTERACTION_SEPARATOR = r"(?<=\.),"
+
+# (matrix name, table, value column, separator of joined values or None for
+# one value per row) of every multi-valued field turned into a multi-hot matrix
+MULTI_HOT_FIELDS = [
+    ("category_multihot", "drug_categories", "category", None),
+    ("mesh_multihot", "drug_categories", "mesh_id", None),
+    ("group_multihot", "main_database", "groups", ","),
+    ("organism_multihot", "main_database", "affected_organisms", ","),
+    ("food_interaction_multihot", "main_database", "food_interactions", FOOD_INTERACTION_SEPARATOR),
+    ("pathway_category_multihot", PATHWAY_SUMMARY_TABLE, "unique_pathway_categories", ","),
+]
+
+
+def build_multi_hot_features(source_folder="drug_data_cleaned", destination_folder="Drugbank_final_database"):
+    # Rows of every matrix follow the order of the main table (= the final feature table)
+    drug_ids = read_table("main_database", source_folder, columns=["primary_drugbank_id"])["primary_drugbank_id"].astype(str).tolist()
+    folder = os.path.join(destination_folder, MULTI_HOT_FOLDER)
+
+    for name, table, column, separator in MULTI_HOT_FIELDS:
+        df = read_table(table, source_folder, columns=["primary_drugbank_id", column], dtype=str)
+        with section(name, rows=len(df)):
+            if separator is None:
+                keys, labels = df["primary_drugbank_id"], df[column]
+            else:
+                keys, labels = split_labels(df["primary_drugbank_id"], df[column], separator)
+            matrix, columns = multi_hot(keys, labels, drug_ids)
+        path = save_multi_hot(name, matrix, drug_ids, columns, folder)
+        print(f"✅ Saved {matrix.shape[0]} x {matrix.shape[1]} {column} multi-hot matrix: {path}")
+
+
+if __name__ == "__main__":
+    start_stage("multi_hot")
+    build_multi_hot_features()
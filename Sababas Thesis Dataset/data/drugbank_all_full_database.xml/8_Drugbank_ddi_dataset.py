@@ -0,0 +1,33 @@
+import os
+
+from drugbank_dataset import DDI_DATASET_FOLDER, build_pairs, pack_features, save_dataset
+from drugbank_interactions import INTERACTION_STORE_FILE, load_interaction_store
+from drugbank_profiling import section, start_stage
+from drugbank_storage import read_table
+
+
+# Pack the final feature table and the compact interaction store into the
+# arrays of the DDI training dataset (see drugbank_dataset.DDIDataset)
+def build_ddi_dataset(folder="Drugbank_final_database"):
+    store = load_interaction_store(os.path.join(folder, INTERACTION_STORE_FILE))
+    drug_ids = store["drug_ids"].tolist()
+    table = read_table("main_database_cleaned_and_encoded", folder)
+
+    # One float32 row per drug of the store's drug index
+    with section("pack_features", rows=len(table)):
+        features, columns, has_features = pack_features(table, drug_ids)
+
+    # Pair examples are drug index pairs labelled with their interaction_type
+    with section("build_pairs", rows=len(store["source"])):
+        pairs, labels, edge_keys = build_pairs(store)
+
+    output_folder = save_dataset(
+        os.path.join(folder, DDI_DATASET_FOLDER), drug_ids, columns,
+        features=features, pairs=pairs, labels=labels, has_features=has_features, edge_keys=edge_keys
+    )
+    print(f"✅ {features.shape[0]} x {features.shape[1]} float32 feature matrix and {len(pairs)} pairs saved to '{output_folder}'")
+
+
+if __name__ == "__main__":
+    start_stage("ddi_dataset")
+    build_ddi_dataset()
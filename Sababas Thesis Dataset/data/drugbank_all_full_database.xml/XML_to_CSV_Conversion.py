@@ -1,20 +1,14 @@
-import xml.etree.ElementTree as ET
 import csv
+import os
 
-def extract_drugbank_ids_and_names(xml_file, csv_file):
-    tree = ET.parse(xml_file)
-    root = tree.getroot()
-    
-    # Prepare data for CSV
-    data = []
-    
-    # Iterate over each drug element
-    for drug in root.findall('.//{http://www.drugbank.ca}drug'):
-        drugbank_ids = [id_elem.text for id_elem in drug.findall('{http://www.drugbank.ca}drugbank-id[@primary="true"]')]
-        name = drug.find('{http://www.drugbank.ca}name').text
-        
-        for drugbank_id in drugbank_ids:
-            data.append([drugbank_id, name])
+from drugbank_profiling import section, start_stage
+from drugbank_xml import build_drug_index, iter_drug_synonyms
+
+def extract_drugbank_ids_and_names(xml_file, csv_file, synonyms_file=None):
+    # IDs and names come from the byte-offset index of the top-level drugs, which
+    # is (re)written next to the dump for per-drug lookups (drugbank_xml.DrugRecords)
+    index_rows = [row for row in build_drug_index(xml_file) if row['primary_drugbank_id']]
+    data = [[row['primary_drugbank_id'], row['name']] for row in index_rows]
     
     # Write data to CSV with UTF-8 encoding
     with open(csv_file, 'w', newline='', encoding='utf-8') as f:
@@ -22,8 +16,19 @@ def extract_drugbank_ids_and_names(xml_file, csv_file):
         writer.writerow(['DrugBank ID', 'Name'])
         writer.writerows(data)
 
+    # Synonyms of every drug, one row each (used by drugbank_lookup)
+    if synonyms_file:
+        with open(synonyms_file, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['DrugBank ID', 'Synonym'])
+            writer.writerows(iter_drug_synonyms(xml_file, index_rows))
+
 # Example usage
 xml_file = 'full database.xml'
 csv_file = 'drugbank_ids_and_names.csv'
-extract_drugbank_ids_and_names(xml_file, csv_file)
-print(f'DrugBank IDs and names have been extracted to {csv_file}')
\ No newline at end of file
+synonyms_file = 'drugbank_synonyms.csv'
+start_stage('ids_and_names')
+with section('extract_drugbank_ids_and_names', nbytes=os.path.getsize(xml_file)):
+    extract_drugbank_ids_and_names(xml_file, csv_file, synonyms_file)
+print(f'DrugBank IDs and names have been extracted to {csv_file}')
+print(f'Synonyms have been extracted to {synonyms_file}')
@@ -0,0 +1,161 @@
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from drugbank_features import (
+    clean_boiling_point, clean_float, clean_isoelectric_point, clean_melting_point, clean_pka,
+    clean_water_solubility, clean_water_solubility_g_per_l
+)
+from drugbank_properties import read_merged_drug_table
+
+# Compares the per-value property cleaners of stage 6 with their vectorized
+# versions on every drug of the merged table: wall time and exact agreement.
+# Run from the drugbank folder after stage 5:
+#   python benchmarks/property_parsers.py
+
+# Original per-value cleaners of stage 6, the reference for the vectorized ones
+
+# Extracting Float
+def extract_float(text):
+    if pd.isna(text): return None
+    text = str(text)
+    match = re.findall(r"[-+]?\d*\.\d+|\d+", text.replace("Â", "").replace("â", ""))
+    try:
+        return sum(float(x) for x in match) / len(match) if match else None
+    except ValueError:
+        return None
+
+# Boiling Point
+def extract_boiling_point(value):
+    if pd.isna(value):
+        return None
+    value = str(value)
+    # Find numbers with optional decimal
+    matches = re.findall(r"[-+]?\d*\.\d+|\d+", value)
+    try:
+        # Convert to float if numbers exist and are valid
+        valid = [float(m) for m in matches if m.strip() not in [".", ""]]
+        if valid:
+            return sum(valid) / len(valid)  # return average if range or multiple
+    except ValueError:
+        pass
+    return None
+
+# Isoelectric Point
+def extract_isoelectric_point(value):
+    if pd.isna(value):
+        return None
+    value = str(value).lower()
+    if "no distinct" in value or "does not" in value:
+        return None
+    matches = re.findall(r"[-+]?\d*\.\d+|\d+", value)
+    try:
+        nums = [float(x) for x in matches if x.strip() not in [".", ""]]
+        return np.mean(nums) if nums else None
+    except:
+        return None
+
+# Melting Point
+def extract_melting_point(value):
+    if pd.isna(value):
+        return None
+    value = str(value).lower()
+    if "decompose" in value:
+        return None
+    matches = re.findall(r"[-+]?\d*\.\d+|\d+", value)
+    try:
+        nums = [float(x) for x in matches if x.strip() not in [".", ""]]
+        return np.mean(nums) if nums else None
+    except:
+        return None
+
+# Water Solubility
+def extract_water_solubility(value):
+    if pd.isna(value):
+        return None
+    value = str(value).lower()
+    if "insoluble" in value or "practically insoluble" in value:
+        return 0.0
+    matches = re.findall(r"[-+]?\d*\.\d+|\d+", value)
+    try:
+        nums = [float(x) for x in matches if x.strip() not in [".", ""]]
+        if "mg/ml" in value:
+            return nums[0] * 1.0 if nums else None
+        elif "mg/l" in value:
+            return nums[0] / 1000.0 if nums else None
+        elif "g/l" in value:
+            return nums[0]
+        else:
+            return np.mean(nums)  # fallback
+    except:
+        return None
+
+# pKa
+def extract_pka(value):
+    if pd.isna(value):
+        return None
+    value = str(value).lower()
+    if "strongest acidic" in value or "strongest basic" in value or "not available" in value:
+        return None
+    matches = re.findall(r"[-+]?\d*\.\d+|\d+", value)
+    try:
+        nums = [float(x) for x in matches if x.strip() not in [".", ""]]
+        return np.mean(nums) if nums else None
+    except:
+        return None
+
+
+# (source column, per-value function, vectorized function)
+CASES = [
+    ("Boiling Point", extract_boiling_point, clean_boiling_point),
+    ("Melting Point", extract_melting_point, clean_melting_point),
+    ("Isoelectric Point", extract_isoelectric_point, clean_isoelectric_point),
+    ("pKa", extract_pka, clean_pka),
+    ("Water Solubility", extract_water_solubility, clean_water_solubility),
+    ("Water Solubility", extract_float, clean_float),
+    ("Water Solubility", lambda x: extract_float(x) if "mg" in str(x) or "g" in str(x) else None, clean_water_solubility_g_per_l),
+]
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+# Number of rows where the two results differ (NaN == NaN)
+def count_mismatches(expected, actual):
+    expected = pd.to_numeric(expected, errors="coerce").to_numpy(dtype=float)
+    actual = actual.to_numpy(dtype=float)
+    same = (expected == actual) | (np.isnan(expected) & np.isnan(actual))
+    return int((~same).sum())
+
+
+def main(repeat=3):
+    df = read_merged_drug_table("drug_data_cleaned")
+    print(f"{len(df)} drugs")
+    print(f"{'column':<20} {'function':<40} {'per-value s':>12} {'vectorized s':>13} {'speedup':>8} {'mismatches':>10}")
+
+    for column, per_value, vectorized in CASES:
+        if column not in df.columns:
+            continue
+        values = df[column]
+        legacy_times, vector_times = [], []
+        for _ in range(repeat):
+            expected, seconds = timed(values.apply, per_value)
+            legacy_times.append(seconds)
+            actual, seconds = timed(vectorized, values)
+            vector_times.append(seconds)
+        legacy, vector = min(legacy_times), min(vector_times)
+        print(f"{column:<20} {vectorized.__name__:<40} {legacy:>12.4f} {vector:>13.4f} "
+              f"{legacy / vector:>7.1f}x {count_mismatches(expected, actual):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import argparse
+import csv
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from run_pipeline import STAGES, XML_FILE
+from synthetic_drugbank import generate
+
+# Scaling benchmark: runs the whole pipeline on synthetic DrugBank dumps of
+# growing size and reports time and peak memory per stage and per timed section
+# (extract_drug_data, the stage 3 pivot, stage 4 template normalization,
+# stage 5 aggregation, stage 6 featurizers, ...) against the number of drugs.
+# Each size gets its own work folder with the generated XML; the stages run
+# there one after the other with their JSON profiling reports switched on.
+#   python benchmarks/scaling.py --sizes 1000 5000 20000 --output bench
+# Results go to <output>/scaling.csv (one row per size and stage/section); the
+# slope column is the log-log growth between the smallest and largest size
+# (1 = linear, 2 = quadratic).
+
+CODE_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SIZES = [1000, 5000, 20000]
+
+
+# Generate the dump of one size and run every stage on it; returns the reports
+def run_size(n_drugs, folder, workers=1, seed=0, interactions_per_drug=30):
+    os.makedirs(folder, exist_ok=True)
+    xml_path = os.path.join(folder, XML_FILE)
+    if not os.path.exists(xml_path):
+        generate(n_drugs, xml_path, interactions_per_drug, seed)
+
+    profile_folder = os.path.abspath(os.path.join(folder, 'profile'))
+    env = dict(os.environ, DRUGBANK_PROFILE_DIR=profile_folder)
+    reports = {}
+    for name, stage in STAGES.items():
+        args = ['--workers', str(workers)] if workers > 1 and name in ('extract', 'final') else []
+        start = time.perf_counter()
+        with open(os.path.join(folder, f'{name}.log'), 'w', encoding='utf-8') as log:
+            subprocess.run([sys.executable, os.path.join(CODE_FOLDER, stage['script'])] + args,
+                           cwd=folder, env=env, stdout=log, stderr=subprocess.STDOUT, check=True)
+        with open(os.path.join(profile_folder, f'{name}.json'), encoding='utf-8') as f:
+            reports[name] = json.load(f)
+        print(f'   {name}: {time.perf_counter() - start:.1f} s, peak RSS {reports[name]["peak_rss_mb"]} MB')
+    return reports
+
+
+# One row per stage (wall time and peak RSS) and per timed section of the stage
+def result_rows(n_drugs, reports):
+    rows = []
+    for name, report in reports.items():
+        peak = max(report['peak_rss_mb'] or 0, report['peak_rss_children_mb'] or 0)
+        rows.append({'drugs': n_drugs, 'stage': name, 'section': '', 'seconds': report['wall_seconds'],
+                     'rows': '', 'rows_per_second': '', 'peak_rss_mb': peak})
+        for section_name, entry in report['sections'].items():
+            rows.append({'drugs': n_drugs, 'stage': name, 'section': section_name, 'seconds': entry['seconds'],
+                         'rows': entry['rows'] or '', 'rows_per_second': entry.get('rows_per_second', ''), 'peak_rss_mb': ''})
+    return rows
+
+
+# Log-log slope of seconds against drug count per (stage, section)
+def add_slopes(rows):
+    series = {}
+    for row in rows:
+        series.setdefault((row['stage'], row['section']), []).append(row)
+    for points in series.values():
+        first, last = min(points, key=lambda row: row['drugs']), max(points, key=lambda row: row['drugs'])
+        slope = ''
+        if last['drugs'] > first['drugs'] and first['seconds'] > 0 and last['seconds'] > 0:
+            slope = round(math.log(last['seconds'] / first['seconds']) / math.log(last['drugs'] / first['drugs']), 2)
+        for row in points:
+            row['slope'] = slope
+
+
+def plot(rows, path):
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print('matplotlib is not installed, skipping the plot')
+        return
+    figure, (time_axis, memory_axis) = plt.subplots(1, 2, figsize=(12, 5))
+    for stage in STAGES:
+        points = sorted((row for row in rows if row['stage'] == stage and not row['section']), key=lambda row: row['drugs'])
+        drugs = [row['drugs'] for row in points]
+        time_axis.loglog(drugs, [row['seconds'] for row in points], marker='o', label=stage)
+        memory_axis.semilogx(drugs, [row['peak_rss_mb'] for row in points], marker='o', label=stage)
+    time_axis.set(xlabel='drugs', ylabel='seconds', title='Stage time')
+    memory_axis.set(xlabel='drugs', ylabel='MB', title='Stage peak RSS')
+    time_axis.legend()
+    figure.tight_layout()
+    figure.savefig(path)
+    print(f'✅ Plot saved to {path}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time every pipeline stage on synthetic dumps of growing size.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='drug counts (e.g. 1000 10000 100000)')
+    parser.add_argument('--output', default='bench', help='work folder; one sub folder per size')
+    parser.add_argument('--workers', type=int, default=1, help='--workers passed to the extract and final stages')
+    parser.add_argument('--interactions-per-drug', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rows = []
+    for n_drugs in sorted(args.sizes):
+        print(f'▶️  {n_drugs} drugs')
+        reports = run_size(n_drugs, os.path.join(args.output, str(n_drugs)), args.workers, args.seed, args.interactions_per_drug)
+        rows.extend(result_rows(n_drugs, reports))
+    add_slopes(rows)
+
+    results_path = os.path.join(args.output, 'scaling.csv')
+    with open(results_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=['drugs', 'stage', 'section', 'seconds', 'rows', 'rows_per_second', 'peak_rss_mb', 'slope'])
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f'✅ Results saved to {results_path}')
+
+    print(f'\n{"stage":<15}{"section":<40}' + ''.join(f'{n:>10}' for n in sorted(args.sizes)) + f'{"slope":>8}')
+    for key in dict.fromkeys((row['stage'], row['section']) for row in rows):
+        points = {row['drugs']: row for row in rows if (row['stage'], row['section']) == key}
+        print(f'{key[0]:<15}{key[1] or "(stage)":<40}'
+              + ''.join(f'{points[n]["seconds"]:>10.3f}' if n in points else f'{"":>10}' for n in sorted(args.sizes))
+              + f'{points[max(points)]["slope"]:>8}')
+    plot(rows, os.path.join(args.output, 'scaling.png'))
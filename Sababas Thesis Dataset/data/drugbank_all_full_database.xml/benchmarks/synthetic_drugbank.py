@@ -0,0 +1,326 @@
+import argparse
+import math
+import os
+import random
+from xml.sax.saxutils import escape
+
+# Generates a synthetic `full database.xml` that follows the DrugBank schema the
+# pipeline reads, so the stages can be benchmarked without the licensed dump.
+# Drug records have the same elements and nesting as the real ones: groups,
+# classification, categories, drug interactions (listed from both sides like
+# DrugBank does), calculated/experimental properties, pathways with nested
+# <drug> references and enzymes, sequences for biotech drugs and long toxicity
+# texts. All random choices come from --seed, so a given size is reproducible.
+#   python benchmarks/synthetic_drugbank.py --drugs 10000 --output "bench/10000/full database.xml"
+
+ROOT_TAG = ('<drugbank xmlns="http://www.drugbank.ca" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+            'xsi:schemaLocation="http://www.drugbank.ca http://www.drugbank.ca/docs/drugbank.xsd" '
+            'version="5.1" exported-on="2024-01-03">')
+
+SYLLABLES = ['ace', 'bu', 'ca', 'da', 'fen', 'glu', 'hy', 'lo', 'mi', 'na', 'pro', 'qui', 'ra', 'sul', 'te', 'va',
+             'xi', 'zo', 'cor', 'dex', 'flu', 'lin', 'met', 'pan', 'rox', 'tri']
+SUFFIXES = ['mab', 'pril', 'sartan', 'olol', 'statin', 'cillin', 'mycin', 'azole', 'tinib', 'vir', 'parin', 'done', 'ine']
+SALTS = ['sodium', 'hydrochloride', 'acetate', 'calcium', 'mesylate']
+
+# (description listed under drug A, description listed under drug B) of one
+# interaction; {self} is the drug whose record lists it, {other} the partner
+INTERACTION_TEMPLATES = [
+    ('{other} may increase the anticoagulant activities of {self}.', '{self} may increase the anticoagulant activities of {other}.'),
+    ('The risk or severity of adverse effects can be increased when {self} is combined with {other}.',) * 2,
+    ('The metabolism of {self} can be decreased when combined with {other}.', '{self} can cause a decrease in the absorption of {other}.'),
+    ('{other} may decrease the excretion rate of {self} which could result in a higher serum level.',
+     '{self} may increase the excretion rate of {other}.'),
+    ('The serum concentration of {self} can be increased when it is combined with {other}.',
+     'The serum concentration of {other} can be increased when it is combined with {self}.'),
+    ('The therapeutic efficacy of {self} can be decreased when used in combination with {other}.',) * 2,
+    ('{other} may increase the hypotensive activities of {self}.', '{self} may increase the hypotensive activities of {other}.'),
+    ('The risk or severity of QTc prolongation can be increased when {self} is combined with {other}.',) * 2,
+    ('{other} may increase the nephrotoxic activities of {self}.', '{self} may increase the nephrotoxic activities of {other}.'),
+    ('The bioavailability of {self} can be decreased when combined with {other}.',
+     'The bioavailability of {other} can be decreased when combined with {self}.'),
+]
+
+TOXICITY_SENTENCES = [
+    'The acute toxicity of {route} {name} was evaluated in {animal} ({low}-{high} mg/kg).',
+    'Oral LD<sub>50</sub> in {animal} = {dose} mg/kg.',
+    'Symptoms of overdose include {effect} and {effect2}.',
+    '{name} was not mutagenic in the Ames test.',
+    'No evidence of carcinogenic potential was seen in {animal} given up to {dose} mg/kg.',
+    'Bleeding is the most common adverse reaction; discontinue {name} and consider transfusion.',
+    'In case of overdose, hemodialysis may be useful and the aPTT should be monitored [L{ref}].',
+    'Adverse reactions with a frequency of {percent} % included {effect}.',
+    'Use with caution in elderly patients, children and pregnant women.',
+    'There is no specific antidote; renal impairment increases exposure.',
+    'Doses of {dose} mg/kg in {animal} caused {effect}, which resolved after {hours} hours.',
+    'Safety has not been established in nursing women [L{ref}].',
+]
+ROUTES = ['intravenous', 'subcutaneous', 'oral', 'topical', 'intramuscular']
+ANIMALS = ['mice', 'rats', 'monkeys', 'dogs', 'rabbits', 'hamsters']
+EFFECTS = ['hemorrhage', 'hematoma', 'fever', 'rash', 'dyspnea', 'chest pain', 'urticaria', 'rhinitis', 'nausea', 'dizziness']
+
+GROUPS = ['approved', 'investigational', 'experimental', 'withdrawn', 'nutraceutical', 'illicit', 'vet_approved']
+CATEGORIES = ['Anticoagulants', 'Antihypertensive Agents', 'Enzyme Inhibitors', 'Cytochrome P-450 CYP3A Substrates',
+              'Antineoplastic Agents', 'Anti-Bacterial Agents', 'Peptides', 'Amino Acids', 'Hypoglycemic Agents',
+              'Central Nervous System Depressants', 'QTc Prolonging Agents', 'Nephrotoxic agents']
+ORGANISMS = ['Humans and other mammals', 'Bacteria', 'Fungi', 'Viruses', 'Enteric bacteria and other eubacteria']
+FOOD = ['Take with food.', 'Avoid alcohol.', 'Avoid grapefruit products.', 'Take on an empty stomach.',
+        'Avoid herbs and supplements with anticoagulant/antiplatelet activity, e.g. garlic, ginger, bilberry.']
+CLASSES = [('Organic compounds', 'Organic acids and derivatives', 'Carboxylic acids and derivatives', 'Amino acids, peptides, and analogues'),
+           ('Organic compounds', 'Benzenoids', 'Benzene and substituted derivatives', 'Benzoic acids and derivatives'),
+           ('Organic compounds', 'Lipids and lipid-like molecules', 'Steroids and steroid derivatives', 'Estrane steroids'),
+           ('Organic compounds', 'Organoheterocyclic compounds', 'Pyridines and derivatives', 'Piperidines')]
+PATHWAY_CATEGORIES = ['drug_action', 'metabolic', 'signaling', 'disease', 'physiological']
+AMINO_ACIDS = 'ACDEFGHIKLMNPQRSTVWY'
+
+
+def drug_id(index):
+    return f'DB{index + 1:05d}'
+
+
+# Unique pronounceable names; about 5% are salts of an earlier name, so names
+# containing other names (the DRUG_A/DRUG_B overlap case) occur like in DrugBank
+def make_names(n_drugs, rng):
+    names, seen = [], set()
+    while len(names) < n_drugs:
+        if names and rng.random() < 0.05:
+            name = f'{rng.choice(names)} {rng.choice(SALTS)}'
+        else:
+            name = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 3))) + rng.choice(SUFFIXES)
+            name = name.capitalize()
+        if name not in seen:
+            seen.add(name)
+            names.append(name)
+    return names
+
+
+# Interaction partners of every drug as {drug: [(partner, template, side)]}.
+# Degrees are heavy tailed (a few drugs interact with thousands of others) and
+# 95% of the pairs are listed from both sides.
+def make_interactions(n_drugs, per_drug, rng):
+    weights = [rng.lognormvariate(0, 1.2) for _ in range(n_drugs)]
+    total = sum(weights)
+    cumulative, running = [], 0.0
+    for weight in weights:
+        running += weight
+        cumulative.append(running / total)
+
+    partners = [[] for _ in range(n_drugs)]
+    seen = set()
+    n_pairs = int(n_drugs * per_drug / 2)
+    for _ in range(n_pairs):
+        a = rng.randrange(n_drugs)
+        # Partners are drawn by weight, so popular drugs collect most interactions
+        b = min(_bisect(cumulative, rng.random()), n_drugs - 1)
+        key = (min(a, b), max(a, b))
+        if a == b or key in seen:
+            continue
+        seen.add(key)
+        template = rng.randrange(len(INTERACTION_TEMPLATES))
+        partners[a].append((b, template, 0))
+        if rng.random() < 0.95:
+            partners[b].append((a, template, 1))
+    return partners
+
+
+def _bisect(values, x):
+    low, high = 0, len(values)
+    while low < high:
+        middle = (low + high) // 2
+        if values[middle] < x:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def make_smiles(rng):
+    atoms = ['C', 'C', 'C', 'N', 'O', 'c1ccccc1', 'S', 'Cl', 'F', 'C(=O)O', 'C(C)C', 'n1cccc1']
+    parts, ring = [], 1
+    for _ in range(rng.randint(4, 30)):
+        atom = rng.choice(atoms)
+        if 'c1' in atom or 'n1' in atom:
+            atom = atom.replace('1', str(ring))
+            ring = ring % 9 + 1
+        parts.append(atom)
+    return ''.join(parts)
+
+
+def make_toxicity(name, rng):
+    if rng.random() < 0.3:
+        return None
+    sentences = []
+    for _ in range(max(1, int(rng.expovariate(1 / 8)))):
+        low = rng.choice([0.1, 1, 5, 10, 50])
+        sentences.append(rng.choice(TOXICITY_SENTENCES).format(
+            route=rng.choice(ROUTES), name=name, animal=rng.choice(ANIMALS), low=low, high=low * rng.choice([10, 100]),
+            dose=rng.choice([15, 50, 120, 300, 1000, 2500]), effect=rng.choice(EFFECTS), effect2=rng.choice(EFFECTS),
+            ref=rng.randint(1000, 50000), percent=rng.randint(1, 30), hours=rng.randint(2, 72),
+        ))
+    return ' '.join(sentences)
+
+
+def _property(kind, value, source):
+    return (f'<property><kind>{escape(kind)}</kind><value>{escape(str(value))}</value>'
+            f'<source>{escape(source)}</source></property>')
+
+
+def calculated_properties(rng):
+    weight = rng.uniform(100, 900)
+    values = [
+        ('logP', f'{rng.uniform(-3, 7):.2f}', 'ALOGPS'),
+        ('logS', f'{rng.uniform(-8, 1):.2f}', 'ALOGPS'),
+        ('Water Solubility', f'{10 ** rng.uniform(-4, 2):.3g} mg/mL', 'ALOGPS'),
+        ('logP', f'{rng.uniform(-3, 7):.2f}', 'Chemaxon'),
+        ('IUPAC Name', 'synthetic compound', 'Chemaxon'),
+        ('Molecular Weight', f'{weight:.3f}', 'Chemaxon'),
+        ('Monoisotopic Weight', f'{weight - rng.uniform(0, 1):.6f}', 'Chemaxon'),
+        ('SMILES', make_smiles(rng), 'Chemaxon'),
+        ('Molecular Formula', f'C{rng.randint(5, 40)}H{rng.randint(5, 60)}N{rng.randint(0, 6)}O{rng.randint(0, 9)}', 'Chemaxon'),
+        ('Polar Surface Area (PSA)', f'{rng.uniform(0, 250):.2f}', 'Chemaxon'),
+        ('Refractivity', f'{rng.uniform(10, 250):.4f}', 'Chemaxon'),
+        ('Polarizability', f'{rng.uniform(5, 100):.3f}', 'Chemaxon'),
+        ('Rotatable Bond Count', rng.randint(0, 20), 'Chemaxon'),
+        ('H Bond Acceptor Count', rng.randint(0, 15), 'Chemaxon'),
+        ('H Bond Donor Count', rng.randint(0, 8), 'Chemaxon'),
+        ('pKa (strongest acidic)', f'{rng.uniform(-2, 16):.2f}', 'Chemaxon'),
+        ('pKa (strongest basic)', f'{rng.uniform(-5, 12):.2f}', 'Chemaxon'),
+        ('Physiological Charge', rng.randint(-2, 2), 'Chemaxon'),
+        ('Number of Rings', rng.randint(0, 6), 'Chemaxon'),
+        ('Bioavailability', rng.randint(0, 1), 'Chemaxon'),
+        ('Rule of Five', rng.choice(['true', 'false']), 'Chemaxon'),
+    ]
+    return ''.join(_property(*value) for value in values)
+
+
+def experimental_properties(biotech, rng):
+    values = []
+    if rng.random() < 0.5:
+        low = rng.randint(40, 300)
+        values.append(('Melting Point', rng.choice([f'{low} °C', f'{low}-{low + rng.randint(1, 5)} °C', f'{low * 9 // 5 + 32} °F']), ''))
+    if biotech:
+        values.append(('Isoelectric Point', rng.choice([f'{rng.uniform(4, 10):.2f}', 'no distinct point']), ''))
+        values.append(('Hydrophobicity', f'{rng.uniform(-1, 1):.3f}', ''))
+        values.append(('Molecular Weight', rng.choice([f'{rng.uniform(5000, 150000):.1f}', '~150 kDa']), ''))
+    else:
+        if rng.random() < 0.4:
+            values.append(('Water Solubility', rng.choice([f'{rng.uniform(0.01, 500):.2g} mg/L', 'Insoluble', 'Soluble',
+                                                            f'{rng.uniform(0.1, 50):.1f} g/L at 25 °C']), ''))
+        if rng.random() < 0.3:
+            values.append(('logP', f'{rng.uniform(-3, 7):.2f}', ''))
+        if rng.random() < 0.2:
+            values.append(('pKa', rng.choice([f'{rng.uniform(1, 12):.1f}', f'{rng.uniform(1, 6):.1f}, {rng.uniform(6, 12):.1f}']), ''))
+        if rng.random() < 0.1:
+            values.append(('Boiling Point', f'{rng.randint(100, 600)} °C', ''))
+    return ''.join(_property(*value) for value in values)
+
+
+def pathways(index, names, pathway_pool, rng):
+    if rng.random() > 0.05:
+        return ''
+    parts = []
+    for smpdb_id, category, enzymes in rng.sample(pathway_pool, rng.randint(1, 3)):
+        references = {index} | {rng.randrange(len(names)) for _ in range(rng.randint(0, 5))}
+        drugs = ''.join(f'<drug><drugbank-id>{drug_id(i)}</drugbank-id><name>{escape(names[i])}</name></drug>'
+                        for i in sorted(references))
+        enzyme_ids = ''.join(f'<uniprot-id>{enzyme}</uniprot-id>' for enzyme in enzymes)
+        parts.append(f'<pathway><smpdb-id>{smpdb_id}</smpdb-id><name>{escape(names[index])} {category.replace("_", " ").title()} Pathway</name>'
+                     f'<category>{category}</category><drugs>{drugs}</drugs><enzymes>{enzyme_ids}</enzymes></pathway>')
+    return f'<pathways>{"".join(parts)}</pathways>'
+
+
+def drug_record(index, names, partners, pathway_pool, rng):
+    name = names[index]
+    biotech = rng.random() < 0.15
+    interactions = []
+    for partner, template, side in partners[index]:
+        description = INTERACTION_TEMPLATES[template][side].format(self=name, other=names[partner])
+        interactions.append(f'<drug-interaction><drugbank-id>{drug_id(partner)}</drugbank-id><name>{escape(names[partner])}</name>'
+                            f'<description>{escape(description)}</description></drug-interaction>')
+    kingdom, superclass, class_, subclass = rng.choice(CLASSES)
+    groups = ''.join(f'<group>{group}</group>' for group in rng.sample(GROUPS, rng.randint(1, 3)))
+    categories = ''.join(f'<category><category>{escape(category)}</category><mesh-id>D{rng.randint(1, 99999):06d}</mesh-id></category>'
+                         for category in rng.sample(CATEGORIES, rng.randint(0, 5)))
+    food = ''.join(f'<food-interaction>{escape(item)}</food-interaction>' for item in rng.sample(FOOD, rng.randint(0, 3)))
+    toxicity = make_toxicity(name, rng)
+    sequence = ''
+    if biotech:
+        residues = ''.join(rng.choice(AMINO_ACIDS) for _ in range(rng.randint(20, 400)))
+        sequence = f'<sequences><sequence format="FASTA">&gt;{drug_id(index)} {escape(name)}\n{residues}</sequence></sequences>'
+    properties = '' if biotech else f'<calculated-properties>{calculated_properties(rng)}</calculated-properties>'
+
+    return f'''<drug type="{'biotech' if biotech else 'small molecule'}" created="2005-06-13" updated="2024-01-02">
+  <drugbank-id primary="true">{drug_id(index)}</drugbank-id>
+  <drugbank-id>APRD{index:05d}</drugbank-id>
+  <name>{escape(name)}</name>
+  <description>{escape(name)} is a synthetic {'protein' if biotech else 'small molecule'} drug used for benchmarking.</description>
+  <cas-number>{rng.randint(10000, 999999)}-{rng.randint(10, 99)}-{rng.randint(0, 9)}</cas-number>
+  <unii>{''.join(rng.choice('ABCDEFGHJKLMNPQRSTUVWXYZ0123456789') for _ in range(10))}</unii>
+  <state>{rng.choice(['solid', 'liquid', 'gas']) if not biotech else 'liquid'}</state>
+  <groups>{groups}</groups>
+  <synthesis-reference/>
+  <indication>Used in the treatment of synthetic condition {rng.randint(1, 500)}.</indication>
+  <pharmacodynamics>{escape(name)} acts on target {rng.randint(1, 3000)}.</pharmacodynamics>
+  <mechanism-of-action>Binds to receptor {rng.randint(1, 3000)}.</mechanism-of-action>
+  <toxicity>{escape(toxicity) if toxicity else ''}</toxicity>
+  <metabolism>Hepatic.</metabolism>
+  <absorption>Rapidly absorbed.</absorption>
+  <half-life>{rng.uniform(0.5, 72):.1f} hours</half-life>
+  <protein-binding>{rng.randint(0, 99)}%</protein-binding>
+  <route-of-elimination>Renal.</route-of-elimination>
+  <volume-of-distribution>{rng.uniform(0.1, 20):.1f} L/kg</volume-of-distribution>
+  <clearance>{rng.randint(1, 900)} mL/min</clearance>
+  <classification>
+    <description>Synthetic class description.</description>
+    <direct-parent>{escape(subclass)}</direct-parent>
+    <kingdom>{escape(kingdom)}</kingdom>
+    <superclass>{escape(superclass)}</superclass>
+    <class>{escape(class_)}</class>
+    <subclass>{escape(subclass)}</subclass>
+  </classification>
+  <categories>{categories}</categories>
+  <affected-organisms><affected-organism>{escape(rng.choice(ORGANISMS))}</affected-organism></affected-organisms>
+  <food-interactions>{food}</food-interactions>
+  <drug-interactions>{''.join(interactions)}</drug-interactions>
+  {sequence}
+  {properties}
+  <experimental-properties>{experimental_properties(biotech, rng)}</experimental-properties>
+  {pathways(index, names, pathway_pool, rng)}
+  <targets><target><polypeptide><molecular-weight>{rng.randint(5000, 90000)}</molecular-weight></polypeptide></target></targets>
+</drug>
+'''
+
+
+# Write a DrugBank-shaped dump with `n_drugs` drugs and about
+# `interactions_per_drug` interaction rows per drug to `output`
+def generate(n_drugs, output, interactions_per_drug=30, seed=0):
+    rng = random.Random(seed)
+    names = make_names(n_drugs, rng)
+    partners = make_interactions(n_drugs, interactions_per_drug, rng)
+    enzyme_pool = [f'P{rng.randint(10000, 99999)}' for _ in range(max(50, n_drugs // 10))]
+    pathway_pool = [
+        (f'SMP{i:07d}', rng.choice(PATHWAY_CATEGORIES), rng.sample(enzyme_pool, rng.randint(0, 8)))
+        for i in range(max(10, int(math.sqrt(n_drugs) * 10)))
+    ]
+
+    folder = os.path.dirname(output)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write(ROOT_TAG + '\n')
+        for index in range(n_drugs):
+            f.write(drug_record(index, names, partners, pathway_pool, rng))
+        f.write('</drugbank>\n')
+    return output
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a synthetic DrugBank-shaped XML dump.')
+    parser.add_argument('--drugs', type=int, default=1000)
+    parser.add_argument('--interactions-per-drug', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='full database.xml')
+    args = parser.parse_args()
+
+    path = generate(args.drugs, args.output, args.interactions_per_drug, args.seed)
+    print(f'✅ {args.drugs} synthetic drugs written to {path} ({os.path.getsize(path) / 1e6:.1f} MB)')
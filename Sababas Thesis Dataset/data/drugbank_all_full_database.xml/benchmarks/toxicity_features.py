@@ -0,0 +1,157 @@
+import os
+import re
+import sys
+import time
+from typing import Dict, List, Union
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from drugbank_features import TOXICITY_COLUMNS, extract_toxicity_feature_columns
+from drugbank_storage import read_table
+
+# Compares the per-drug toxicity featurizer of stage 6 (dict per row expanded
+# with .apply(pd.Series)) with the single-pass column builder, whose outputs
+# must be identical; any mismatched column makes the run fail.
+# Run from the drugbank folder after stage 5:
+#   python benchmarks/toxicity_features.py
+
+
+# Original per-drug toxicity featurizer of stage 6, the reference for the single-pass one
+# Main feature extraction function for toxicity text
+def extract_toxicity_features(text: str) -> Dict[str, Union[bool, str, float, List, Dict]]:
+    if pd.isna(text) or not isinstance(text, str):
+        return {
+            "tox_tested_animals": [],
+            "tox_dose_by_route": {},
+            "observed_effects": [],
+            "tox_threshold_by_species": {},
+            "mutagenic_or_carcinogenic": None,
+            "ld50_values": [],
+            "human_toxicity_notes": [],
+            "overdose_treatment": False,
+            "adverse_effect_frequency": None,
+            "special_population_caution": [],
+            "tox_ref_ids": []
+        }
+
+    animals = re.findall(r"\b(mouse|mice|rat|rats|monkey|monkeys|dog|dogs|rabbit|rabbits|hamster|hamsters)\b", text, re.I)
+    tox_tested_animals = list(set([a.lower().rstrip('s') for a in animals]))
+
+    routes = ['intravenous', 'subcutaneous', 'oral', 'topical', 'intramuscular']
+    tox_dose_by_route = {}
+    for route in routes:
+        pattern = rf"{route}.*?\b(?:in|of)?\s?(mice|rats|monkeys|dogs|rabbits|hamsters)[^\.]*?\((?:[><]\s*)?(\d+\.?\d*)(?:\s*-\s*(\d+\.?\d*))?\s*mg/kg(?:\s*[><])?\)"
+        matches = re.findall(pattern, text, re.I)
+        for animal, low, high in matches:
+            animal = animal.lower().rstrip('s')
+            if high:
+                tox_dose_by_route.setdefault(route, []).append((animal, float(low), float(high)))
+            else:
+                tox_dose_by_route.setdefault(route, []).append((animal, float(low), "unspecified"))
+
+    observed_effects = re.findall(r"(hemorrhage|hematoma|nodule|fever|rash|dyspnea|chest pain|urticaria|conjunctivitis|voice alteration|pharyngitis|laryngitis|rhinitis)", text, re.I)
+    observed_effects = list(set([e.lower() for e in observed_effects]))
+
+    threshold_matches = re.findall(r"(\d+\.?\d*)\s*mg/kg.*?(mouse|mice|rat|rats|monkey|monkeys)", text, re.I)
+    tox_threshold_by_species = {}
+    for dose, species in threshold_matches:
+        species = species.lower().rstrip('s')
+        dose = float(dose)
+        tox_threshold_by_species[species] = min(dose, tox_threshold_by_species.get(species, float("inf")))
+
+    mutagenicity = None
+    if re.search(r"not.*mutagenic", text, re.I):
+        mutagenicity = "non-mutagenic"
+    elif re.search(r"mutagenic", text, re.I):
+        mutagenicity = "mutagenic"
+    if re.search(r"not.*carcinogenic", text, re.I):
+        mutagenicity = mutagenicity or "non-carcinogenic"
+    elif re.search(r"carcinogenic", text, re.I):
+        mutagenicity = mutagenicity or "carcinogenic"
+
+    ld50_matches = re.findall(r"(mouse|mice|rat|rats|monkey|monkeys).*?LD<sub>50</sub>.*?([><=])\s*(\d+\.?\d*)\s*mg/kg", text, re.I)
+    ld50_values = [(sp.lower().rstrip('s'), "unspecified", float(val), comp) for sp, comp, val in ld50_matches]
+
+    overdose_phrases = re.findall(r"(stop.*?lepirudin|transfusion|shock|aPTT|hemodialysis|hemofiltration)", text, re.I)
+    overdose_treatment = bool(overdose_phrases)
+
+    human_toxicity = []
+    for sentence in re.split(r"(?<=[.])\s+", text):
+        if any(word in sentence.lower() for word in ["renal impairment", "antidote", "bleeding", "transfusion", "aPTT"]):
+            human_toxicity.append(sentence.strip())
+
+    adverse_effect_freq = None
+    freq_match = re.search(r"frequency.*?(<\s*1/\d+|\d+\s*%)", text, re.I)
+    if freq_match:
+        adverse_effect_freq = freq_match.group(1)
+
+    special_population = []
+    for pop in ["pregnant women", "nursing women", "children", "elderly"]:
+        if pop in text.lower():
+            special_population.append(pop)
+
+    ref_ids = list(set(re.findall(r"\[L\d+\]", text)))
+
+    return {
+        "tox_tested_animals": tox_tested_animals,
+        "tox_dose_by_route": tox_dose_by_route,
+        "observed_effects": observed_effects,
+        "tox_threshold_by_species": tox_threshold_by_species,
+        "mutagenic_or_carcinogenic": mutagenicity,
+        "ld50_values": ld50_values,
+        "human_toxicity_notes": human_toxicity,
+        "overdose_treatment": overdose_treatment,
+        "adverse_effect_frequency": adverse_effect_freq,
+        "special_population_caution": special_population,
+        "tox_ref_ids": ref_ids
+    }
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def legacy(values):
+    return values.apply(extract_toxicity_features).apply(pd.Series)
+
+
+# Columns whose values differ between the two outputs. Sets print in hash order,
+# so tox_tested_animals is compared as sets.
+def mismatched_columns(expected, actual):
+    mismatched = []
+    for column in TOXICITY_COLUMNS:
+        left, right = expected[column], actual[column]
+        if column == "tox_tested_animals":
+            same = left.map(sorted).equals(right.map(sorted))
+        else:
+            same = left.map(repr).equals(right.map(repr))
+        if not same:
+            mismatched.append(column)
+    return mismatched
+
+
+def main(repeat=3):
+    values = read_table("main_database", "drug_data_cleaned", columns=["toxicity"])["toxicity"]
+    print(f"{len(values)} drugs, {int(values.notna().sum())} with toxicity text")
+
+    legacy_times, single_pass_times = [], []
+    for _ in range(repeat):
+        expected, seconds = timed(legacy, values)
+        legacy_times.append(seconds)
+        actual, seconds = timed(extract_toxicity_feature_columns, values)
+        single_pass_times.append(seconds)
+
+    old, new = min(legacy_times), min(single_pass_times)
+    print(f"per-row dicts: {old:.3f} s, single pass: {new:.3f} s, speedup {old / new:.1f}x")
+    mismatched = mismatched_columns(expected, actual)
+    print(f"mismatched columns: {mismatched or 'none'}")
+    if mismatched:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from drugbank_smiles import SMILES_COUNT_COLUMNS
+
+# Folder (inside the final folder) of the DDI training dataset written by stage 8
+DDI_DATASET_FOLDER = "ddi_dataset"
+DDI_DATASET_ARRAYS = ["features", "pairs", "labels", "has_features", "edge_keys"]
+
+# Label of sampled non-interacting pairs
+NO_INTERACTION = -1
+
+# Calculated/experimental property kinds that are numbers (or true/false flags)
+PROPERTY_FEATURE_COLUMNS = [
+    "Bioavailability", "Boiling Point", "caco2 Permeability", "Ghose Filter", "H Bond Acceptor Count",
+    "H Bond Donor Count", "Hydrophobicity", "Isoelectric Point", "MDDR-Like Rule", "Melting Point",
+    "Molecular Weight", "Monoisotopic Weight", "Number of Rings", "Physiological Charge",
+    "Polar Surface Area (PSA)", "Polarizability", "Refractivity", "Rotatable Bond Count", "Rule of Five",
+    "logP", "logS", "pKa", "pKa (strongest acidic)", "pKa (strongest basic)", "Water Solubility (g/L)",
+]
+
+# Columns of the stage 6 table packed as features, in matrix column order
+FEATURE_COLUMNS = PROPERTY_FEATURE_COLUMNS + [
+    "pathway_count", "unique_enzyme_count", "has_pathway_info", "overdose_treatment",
+] + SMILES_COUNT_COLUMNS
+
+BOOLEAN_TEXT = {"true": 1.0, "false": 0.0}
+
+
+# Numeric per-drug features of the stage 6 table as one contiguous float32
+# matrix with a row per entry of `drug_ids` (the drug index of the compact
+# interaction store). Drugs without a row in the table (interaction partners
+# with no drug record) get NaN rows and has_features False. Only FEATURE_COLUMNS
+# are packed, each parsed from its text form so every storage format gives the
+# same matrix; columns missing from the table or empty for every drug are left out.
+# Returns (features, columns, has_features).
+def pack_features(table, drug_ids):
+    numeric = pd.DataFrame(
+        {column: feature_values(table[column]) for column in FEATURE_COLUMNS if column in table.columns},
+        index=table.index
+    )
+    numeric = numeric.loc[:, numeric.notna().any()]
+    columns = list(numeric.columns)
+    values = numeric.to_numpy(dtype=np.float32, na_value=np.nan)
+
+    rows = pd.Index(table["primary_drugbank_id"].astype(str)).get_indexer(pd.Index(drug_ids).astype(str))
+    has_features = rows >= 0
+    features = np.full((len(drug_ids), len(columns)), np.nan, dtype=np.float32)
+    features[has_features] = values[rows[has_features]]
+    return features, columns, has_features
+
+
+# One feature column as floats: numbers as they are, true/false flags (bools or
+# their text in any case) as 1/0 and anything unparsable as NaN
+def feature_values(column):
+    text = column.astype(object).where(column.notna()).map(lambda value: str(value).strip().lower(), na_action="ignore")
+    return pd.to_numeric(text.replace(BOOLEAN_TEXT), errors="coerce").astype(np.float64)
+
+
+# Key of an unordered drug pair; equal for (a, b) and (b, a)
+def pair_keys(a, b, n_drugs):
+    a, b = np.asarray(a, dtype=np.int64), np.asarray(b, dtype=np.int64)
+    return np.minimum(a, b) * n_drugs + np.maximum(a, b)
+
+
+# Pair examples of the compact interaction store: (source, target) drug index
+# pairs, their interaction_type labels and the sorted keys of every
+# interacting pair (the edge set negative sampling checks against)
+def build_pairs(store):
+    pairs = np.stack([store["source"], store["target"]], axis=1).astype(np.int32)
+    labels = store["interaction_type"].astype(np.int32)
+    edge_keys = np.unique(pair_keys(pairs[:, 0], pairs[:, 1], len(store["drug_ids"])))
+    return pairs, labels, edge_keys
+
+
+def save_dataset(folder, drug_ids, columns, **arrays):
+    os.makedirs(folder, exist_ok=True)
+    for name in DDI_DATASET_ARRAYS:
+        np.save(os.path.join(folder, f"{name}.npy"), arrays[name])
+    for name, labels in (("drug_ids", drug_ids), ("feature_columns", columns)):
+        with open(os.path.join(folder, f"{name}.txt"), "w", encoding="utf-8") as f:
+            f.writelines(f"{label}\n" for label in labels)
+    return folder
+
+
+# Memory-mapped view of a dataset written by stage 8. Batches are gathered
+# from the feature matrix with fancy indexing, so only the rows of the drugs
+# in a batch are read.
+#   dataset = DDIDataset("Drugbank_final_database/ddi_dataset")
+#   for a, b, labels in dataset.batches(1024, negatives=1):
+#       ...
+class DDIDataset:
+    def __init__(self, folder, mmap=True):
+        mode = "r" if mmap else None
+        self.features, self.pairs, self.labels, self.has_features, self.edge_keys = (
+            np.load(os.path.join(folder, f"{name}.npy"), mmap_mode=mode) for name in DDI_DATASET_ARRAYS
+        )
+        with open(os.path.join(folder, "feature_columns.txt"), encoding="utf-8") as f:
+            self.columns = f.read().splitlines()
+        # Negatives are drawn among the drugs that have features
+        self._candidates = np.flatnonzero(self.has_features)
+
+    def __len__(self):
+        return len(self.pairs)
+
+    @property
+    def n_drugs(self):
+        return len(self.features)
+
+    # True for the pairs (arrays of drug indexes) that interact, in either direction
+    def interacts(self, a, b):
+        keys = pair_keys(a, b, self.n_drugs)
+        if len(self.edge_keys) == 0:
+            return np.zeros(len(keys), dtype=bool)
+        positions = np.minimum(np.searchsorted(self.edge_keys, keys), len(self.edge_keys) - 1)
+        return self.edge_keys[positions] == keys
+
+    # `n` random non-interacting pairs of distinct drugs with features. Drawn
+    # in vectorized rounds; candidates hitting an edge or a self-pair are redrawn.
+    def sample_negatives(self, n, rng):
+        if len(self._candidates) < 2:
+            raise ValueError("negative sampling needs at least two drugs with features")
+        found = []
+        missing = n
+        while missing > 0:
+            size = int(missing * 1.2) + 16
+            a = self._candidates[rng.integers(len(self._candidates), size=size)]
+            b = self._candidates[rng.integers(len(self._candidates), size=size)]
+            keep = (a != b) & ~self.interacts(a, b)
+            found.append(np.stack([a[keep], b[keep]], axis=1)[:missing])
+            missing -= len(found[-1])
+        return np.concatenate(found).astype(np.int32) if found else np.empty((0, 2), dtype=np.int32)
+
+    # Feature rows of both drugs of some pairs, NaN (missing properties)
+    # replaced by `fill_value`
+    def gather(self, pairs, fill_value=0.0):
+        a = np.nan_to_num(self.features[pairs[:, 0]], nan=fill_value)
+        b = np.nan_to_num(self.features[pairs[:, 1]], nan=fill_value)
+        return a, b
+
+    # Yield (features of drug A, features of drug B, labels) batches over all
+    # pairs, with `negatives` sampled non-interacting pairs (label
+    # NO_INTERACTION) per positive pair mixed into every batch
+    def batches(self, batch_size, shuffle=True, negatives=0, seed=0, fill_value=0.0):
+        rng = np.random.default_rng(seed)
+        order = rng.permutation(len(self.pairs)) if shuffle else np.arange(len(self.pairs))
+        for start in range(0, len(order), batch_size):
+            index = np.sort(order[start:start + batch_size])
+            pairs = np.asarray(self.pairs[index])
+            labels = np.asarray(self.labels[index])
+            if negatives:
+                sampled = self.sample_negatives(len(index) * negatives, rng)
+                pairs = np.concatenate([pairs, sampled])
+                labels = np.concatenate([labels, np.full(len(sampled), NO_INTERACTION, dtype=labels.dtype)])
+                if shuffle:
+                    mix = rng.permutation(len(pairs))
+                    pairs, labels = pairs[mix], labels[mix]
+            a, b = self.gather(pairs, fill_value)
+            yield a, b, labels
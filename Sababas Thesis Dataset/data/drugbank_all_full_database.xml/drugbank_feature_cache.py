@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+# Persistent cache of text-derived features (SQLite). Off unless a path is
+# given (stage 6 --feature-cache); this is the suggested file name.
+FEATURE_CACHE_FILE = '.feature_cache.sqlite'
+# Layout of the cache file; a file of another layout is emptied on open
+CACHE_FORMAT = 2
+# Size the cache is trimmed to after a run (least recently used entries go first)
+FEATURE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Keys per SELECT ... IN (...) statement, below SQLite's parameter limit
+LOOKUP_BATCH_SIZE = 500
+
+
+def text_key(text):
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+# Featurizer results keyed on (featurizer name, featurizer version, hash of the
+# input text). Values are stored as JSON, so tuples come back as lists; callers
+# that return tuples convert them back. Several processes can share one cache
+# file (WAL mode); writes of a batch go in one transaction.
+class FeatureCache:
+    def __init__(self, path=FEATURE_CACHE_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        if self.conn.execute('PRAGMA user_version').fetchone()[0] != CACHE_FORMAT:
+            self.conn.execute('DROP TABLE IF EXISTS features')
+            self.conn.execute(f'PRAGMA user_version = {CACHE_FORMAT}')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS features ('
+            ' featurizer TEXT NOT NULL, version TEXT NOT NULL, key BLOB NOT NULL,'
+            ' value TEXT NOT NULL, size INTEGER NOT NULL, last_used INTEGER NOT NULL,'
+            ' PRIMARY KEY (featurizer, version, key)) WITHOUT ROWID'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS features_last_used ON features (last_used)')
+        self.conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    # Cached values of some texts as {text: value}; texts not cached are left out
+    def get_many(self, featurizer, version, texts):
+        keys = {text_key(text): text for text in texts}
+        found = {}
+        key_list = list(keys)
+        for start in range(0, len(key_list), LOOKUP_BATCH_SIZE):
+            batch = key_list[start:start + LOOKUP_BATCH_SIZE]
+            rows = self.conn.execute(
+                f'SELECT key, value FROM features WHERE featurizer = ? AND version = ? AND key IN ({", ".join("?" * len(batch))})',
+                [featurizer, version] + batch
+            )
+            for key, value in rows:
+                found[keys[key]] = json.loads(value)
+
+        if found:
+            now = time.time_ns()
+            self.conn.executemany(
+                'UPDATE features SET last_used = ? WHERE featurizer = ? AND version = ? AND key = ?',
+                [(now, featurizer, version, text_key(text)) for text in found]
+            )
+            self.conn.commit()
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    # Store {text: value} results of one featurizer version
+    def put_many(self, featurizer, version, values):
+        now = time.time_ns()
+        rows = []
+        for text, value in values.items():
+            encoded = json.dumps(value, ensure_ascii=False)
+            rows.append((featurizer, version, text_key(text), encoded, len(encoded.encode('utf-8')), now))
+        self.conn.executemany('INSERT OR REPLACE INTO features VALUES (?, ?, ?, ?, ?, ?)', rows)
+        self.conn.commit()
+
+    # Drop the entries of other versions of the given featurizers ({name: version});
+    # they can never be hit again
+    def prune(self, versions):
+        for featurizer, version in versions.items():
+            self.conn.execute('DELETE FROM features WHERE featurizer = ? AND version != ?', (featurizer, version))
+        self.conn.commit()
+
+    # Delete the least recently used entries until the stored values fit in
+    # `max_bytes`; returns the number of entries deleted
+    def evict(self, max_bytes=FEATURE_CACHE_MAX_BYTES):
+        total = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM features').fetchone()[0]
+        if total <= max_bytes:
+            return 0
+        doomed = []
+        for featurizer, version, key, size in self.conn.execute(
+            'SELECT featurizer, version, key, size FROM features ORDER BY last_used'
+        ):
+            if total <= max_bytes:
+                break
+            doomed.append((featurizer, version, key))
+            total -= size
+        self.conn.executemany('DELETE FROM features WHERE featurizer = ? AND version = ? AND key = ?', doomed)
+        self.conn.commit()
+        return len(doomed)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Featurizer results known in advance, {(featurizer, version): {text: value}},
+# served like a FeatureCache (stage 6 --incremental: the results of the
+# previous run for the drugs that did not change). Texts not known are looked
+# up in `fallback` (a FeatureCache, or None to compute them); new results only
+# go to the fallback.
+class KnownFeatures:
+    def __init__(self, results, fallback=None):
+        self.results = results
+        self.fallback = fallback
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, featurizer, version, texts):
+        known = self.results.get((featurizer, version), {})
+        found = {text: known[text] for text in texts if text in known}
+        self.hits += len(found)
+        if self.fallback is not None:
+            found.update(self.fallback.get_many(featurizer, version, [text for text in texts if text not in found]))
+        self.misses += len(texts) - len(found)
+        return found
+
+    def put_many(self, featurizer, version, values):
+        if self.fallback is not None:
+            self.fallback.put_many(featurizer, version, values)
+
+    def close(self):
+        if self.fallback is not None:
+            self.fallback.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Open the cache at `path`, or None when caching is off (path is None). With
+# `known` results the cache is wrapped in a KnownFeatures serving them first.
+def open_feature_cache(path, known=None):
+    cache = None
+    if path is not None:
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        cache = FeatureCache(path)
+    if known:
+        return KnownFeatures(known, cache)
+    return cache
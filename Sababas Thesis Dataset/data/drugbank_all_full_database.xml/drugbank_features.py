@@ -0,0 +1,705 @@
+import pandas as pd
+import numpy as np
+import ast
+import hashlib
+import inspect
+import re
+import types
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from drugbank_feature_cache import open_feature_cache
+from drugbank_profiling import add_section, merge_sections, section, take_sections
+from drugbank_smiles import SMILES_COUNT_COLUMNS, smiles_feature_columns, smiles_hash_column
+
+# ---------------------------------------------------------------------------
+# Vectorized property cleaners
+#
+# Column-at-a-time versions of the original per-value cleaners (kept in
+# benchmarks/property_parsers.py, which checks they agree). Property columns
+# repeat the same few strings a lot ("Insoluble", "Soluble", "65 °C"), so each
+# column is factorized once, the precompiled number pattern runs once per
+# distinct string, and the keyword/unit rules are applied as boolean masks
+# over the distinct strings. Results are broadcast back with the factorize
+# codes and are identical to the per-value functions.
+# ---------------------------------------------------------------------------
+
+NUMBER_PATTERN = re.compile(r"[-+]?\d*\.\d+|\d+")
+
+
+# Run `parse` on the distinct strings of a column and broadcast the result back.
+# `parse` receives a Series of distinct (optionally lower-cased) strings and
+# returns one float per string.
+def _map_distinct(values, parse, lower=False):
+    text = pd.Series(values.to_numpy(dtype=object), dtype=object)
+    text = text.where(text.isna(), text.astype(str))
+    if lower:
+        text = text.str.lower()
+    codes, distinct = pd.factorize(text)
+
+    result = np.full(len(text), np.nan)
+    if len(distinct):
+        parsed = np.asarray(parse(pd.Series(distinct, dtype=object)), dtype=float)
+        found = codes >= 0
+        result[found] = parsed[codes[found]]
+    return pd.Series(result, index=values.index, name=values.name)
+
+
+# Numbers found in each distinct string
+def _numbers(distinct):
+    return [[float(x) for x in NUMBER_PATTERN.findall(text)] for text in distinct]
+
+
+# Same arithmetic as extract_float / extract_boiling_point
+def _python_means(distinct):
+    return np.array([sum(nums) / len(nums) if nums else np.nan for nums in _numbers(distinct)])
+
+
+# Same arithmetic as the np.mean based cleaners
+def _numpy_means(distinct):
+    return np.array([np.mean(nums) if nums else np.nan for nums in _numbers(distinct)])
+
+
+def _first_numbers(distinct):
+    return np.array([nums[0] if nums else np.nan for nums in _numbers(distinct)])
+
+
+def _contains_any(distinct, keywords):
+    mask = np.zeros(len(distinct), dtype=bool)
+    for keyword in keywords:
+        mask |= distinct.str.contains(keyword, regex=False).to_numpy(dtype=bool)
+    return mask
+
+
+# Column version of extract_float
+def clean_float(values):
+    return _map_distinct(values, lambda distinct: _python_means(distinct.str.replace("Â", "").str.replace("â", "")))
+
+
+# Column version of extract_boiling_point
+def clean_boiling_point(values):
+    return _map_distinct(values, _python_means)
+
+
+# Column version of extract_isoelectric_point
+def clean_isoelectric_point(values):
+    def parse(distinct):
+        result = _numpy_means(distinct)
+        result[_contains_any(distinct, ["no distinct", "does not"])] = np.nan
+        return result
+    return _map_distinct(values, parse, lower=True)
+
+
+# Column version of extract_melting_point
+def clean_melting_point(values):
+    def parse(distinct):
+        result = _numpy_means(distinct)
+        result[_contains_any(distinct, ["decompose"])] = np.nan
+        return result
+    return _map_distinct(values, parse, lower=True)
+
+
+# Column version of extract_water_solubility: unit rules applied as masks
+def clean_water_solubility(values):
+    def parse(distinct):
+        result = _numpy_means(distinct)
+        first = _first_numbers(distinct)
+        mg_per_ml = _contains_any(distinct, ["mg/ml"])
+        mg_per_l = ~mg_per_ml & _contains_any(distinct, ["mg/l"])
+        g_per_l = ~mg_per_ml & ~mg_per_l & _contains_any(distinct, ["g/l"])
+        result[mg_per_ml] = first[mg_per_ml]
+        result[mg_per_l] = first[mg_per_l] / 1000.0
+        result[g_per_l] = first[g_per_l]
+        result[_contains_any(distinct, ["insoluble"])] = 0.0
+        return result
+    return _map_distinct(values, parse, lower=True)
+
+
+# Water Solubility as computed in stage 6: extract_float of values mentioning mg or g
+def clean_water_solubility_g_per_l(values):
+    def parse(distinct):
+        result = _python_means(distinct.str.replace("Â", "").str.replace("â", ""))
+        result[~_contains_any(distinct, ["g"])] = np.nan
+        return result
+    return _map_distinct(values, parse)
+
+
+# Column version of extract_pka
+def clean_pka(values):
+    def parse(distinct):
+        result = _numpy_means(distinct)
+        result[_contains_any(distinct, ["strongest acidic", "strongest basic", "not available"])] = np.nan
+        return result
+    return _map_distinct(values, parse, lower=True)
+
+
+# ---------------------------------------------------------------------------
+# Single-pass toxicity featurizer
+#
+# Column version of the original per-row extract_toxicity_features (kept in
+# benchmarks/toxicity_features.py) with the same outputs. All
+# patterns are compiled once; animals, observed effects and reference IDs are
+# found in one combined scan (their vocabularies cannot overlap, so the matches
+# are the same as three separate scans); the text is lower-cased and split into
+# sentences once; and the dose patterns only run when the words they need are
+# present. Results go straight into one list per output column.
+#
+# The original patterns joined their parts with lazy gaps (.*?), which
+# backtrack quadratically (the LD50 one cubically) on long lines. Here each of
+# them is a scan over its parts with the same leftmost, shortest-gap pairing:
+# from every anchor (route, dose, species, "frequency") the next part is
+# searched for on the same line, and a line where that fails is skipped, since
+# a later anchor on it could only see fewer candidates. Every part is searched
+# for with _NextMatch, so no stretch of the text is read twice and the scans
+# are linear in the text length. The greedy "not.*mutagenic" checks are done
+# with plain string searches instead.
+# ---------------------------------------------------------------------------
+
+TOXICITY_ROUTES = ['intravenous', 'subcutaneous', 'oral', 'topical', 'intramuscular']
+TOXICITY_COLUMNS = [
+    "tox_tested_animals", "tox_dose_by_route", "observed_effects", "tox_threshold_by_species",
+    "mutagenic_or_carcinogenic", "ld50_values", "human_toxicity_notes", "overdose_treatment",
+    "adverse_effect_frequency", "special_population_caution", "tox_ref_ids"
+]
+
+TOXICITY_TERMS_PATTERN = re.compile(
+    r"(?P<animal>\b(?:mouse|mice|rat|rats|monkey|monkeys|dog|dogs|rabbit|rabbits|hamster|hamsters)\b)"
+    r"|(?P<effect>hemorrhage|hematoma|nodule|fever|rash|dyspnea|chest pain|urticaria|conjunctivitis|voice alteration|pharyngitis|laryngitis|rhinitis)"
+    r"|(?P<ref>(?-i:\[L\d+\]))",
+    re.I
+)
+
+# Parts of the original lazy-gap patterns, searched for one after the other:
+#   route:     {route}.*?\b(?:in|of)?\s?(species)[^\.]*?\((dose) mg/kg\)
+#   threshold: (dose)\s*mg/kg.*?(species)
+#   LD50:      (species).*?LD<sub>50</sub>.*?([><=])\s*(dose)\s*mg/kg
+#   overdose:  stop.*?lepirudin|transfusion|shock|aPTT|hemodialysis|hemofiltration
+#   frequency: frequency.*?(<\s*1/\d+|\d+\s*%)
+# A number starting right after a digit is never the leftmost match the
+# original pattern finds (the one starting a digit earlier is), so the
+# (?<!\d) lookbehinds keep digit runs from being rescanned at every position.
+TOXICITY_ROUTE_WORD_PATTERNS = [(route, re.compile(route, re.I)) for route in TOXICITY_ROUTES]
+ROUTE_SPECIES_PATTERN = re.compile(r"\b(?:in|of)?\s?(mice|rats|monkeys|dogs|rabbits|hamsters)", re.I)
+ROUTE_DOSE_PATTERN = re.compile(r"\((?:[><]\s*)?(\d+\.?\d*)(?:\s*-\s*(\d+\.?\d*))?\s*mg/kg(?:\s*[><])?\)", re.I)
+THRESHOLD_DOSE_PATTERN = re.compile(r"(?<!\d)(\d+\.?\d*)\s*mg/kg", re.I)
+SPECIES_PATTERN = re.compile(r"(mouse|mice|rat|rats|monkey|monkeys)", re.I)
+LD50_PATTERN = re.compile(r"LD<sub>50</sub>", re.I)
+LD50_DOSE_PATTERN = re.compile(r"([><=])\s*(\d+\.?\d*)\s*mg/kg", re.I)
+OVERDOSE_WORDS_PATTERN = re.compile(r"transfusion|shock|aPTT|hemodialysis|hemofiltration", re.I)
+STOP_PATTERN = re.compile(r"stop", re.I)
+LEPIRUDIN_PATTERN = re.compile(r"lepirudin", re.I)
+FREQUENCY_WORD_PATTERN = re.compile(r"frequency", re.I)
+FREQUENCY_VALUE_PATTERN = re.compile(r"<\s*1/\d+|(?<!\d)\d+\s*%")
+NEWLINE_PATTERN = re.compile(r"\n")
+DOT_PATTERN = re.compile(r"\.")
+SENTENCE_SPLIT_PATTERN = re.compile(r"(?<=[.])\s+")
+HUMAN_TOXICITY_WORDS = ["renal impairment", "antidote", "bleeding", "transfusion", "aPTT"]
+SPECIAL_POPULATIONS = ["pregnant women", "nursing women", "children", "elderly"]
+
+
+# First match of `pattern` in `text` at or after a position. The last search is
+# kept and answers every later position up to the match it found, so a scan
+# whose positions only move forward reads each stretch of the text once.
+class _NextMatch:
+    def __init__(self, pattern, text):
+        self.pattern = pattern
+        self.text = text
+        self.pos = None
+        self.match = None
+
+    def search(self, pos):
+        if self.pos is None or pos < self.pos or (self.match is not None and pos > self.match.start()):
+            self.pos = pos
+            self.match = self.pattern.search(self.text, pos)
+        return self.match
+
+
+# Position of the first newline at or after `pos` (the end of the text if none)
+def _line_end(newlines, pos):
+    match = newlines.search(pos)
+    return match.start() if match is not None else len(newlines.text)
+
+
+# (species, low, high) of the route pattern's findall. Species candidates on the
+# route's line are tried in order; each takes the first dose in parentheses
+# before the next period.
+def _route_doses(text, route_pattern):
+    routes = _NextMatch(route_pattern, text)
+    species = _NextMatch(ROUTE_SPECIES_PATTERN, text)
+    doses = _NextMatch(ROUTE_DOSE_PATTERN, text)
+    dots = _NextMatch(DOT_PATTERN, text)
+    newlines = _NextMatch(NEWLINE_PATTERN, text)
+
+    found = []
+    route = routes.search(0)
+    while route is not None:
+        line_end = _line_end(newlines, route.end())
+        candidate = species.search(route.end())
+        dose = None
+        while candidate is not None and candidate.start() <= line_end:
+            dot = dots.search(candidate.end())
+            dose = doses.search(candidate.end())
+            if dose is not None and (dot is None or dose.start() < dot.start()):
+                break
+            dose = None
+            candidate = species.search(candidate.start() + 1)
+        if dose is None:
+            route = routes.search(line_end + 1)
+            continue
+        found.append((candidate.group(1), dose.group(1), dose.group(2)))
+        route = routes.search(dose.end())
+    return found
+
+
+# (dose, species) of the threshold pattern's findall
+def _threshold_doses(text):
+    doses = _NextMatch(THRESHOLD_DOSE_PATTERN, text)
+    species = _NextMatch(SPECIES_PATTERN, text)
+    newlines = _NextMatch(NEWLINE_PATTERN, text)
+
+    found = []
+    dose = doses.search(0)
+    while dose is not None:
+        candidate = species.search(dose.end())
+        if candidate is not None and candidate.start() <= _line_end(newlines, dose.end()):
+            found.append((dose.group(1), candidate.group(1)))
+            dose = doses.search(candidate.end())
+        else:
+            dose = doses.search(dose.end())
+    return found
+
+
+# (species, comparison, value) of the LD50 pattern's findall
+def _ld50_doses(text):
+    species = _NextMatch(SPECIES_PATTERN, text)
+    markers = _NextMatch(LD50_PATTERN, text)
+    doses = _NextMatch(LD50_DOSE_PATTERN, text)
+    newlines = _NextMatch(NEWLINE_PATTERN, text)
+
+    found = []
+    candidate = species.search(0)
+    while candidate is not None:
+        line_end = _line_end(newlines, candidate.end())
+        marker = markers.search(candidate.end())
+        dose = None
+        if marker is not None and marker.start() <= line_end:
+            dose = doses.search(marker.end())
+        if dose is not None and dose.start() <= line_end:
+            found.append((candidate.group(1), dose.group(1), dose.group(2)))
+            candidate = species.search(dose.end())
+        else:
+            candidate = species.search(line_end + 1)
+    return found
+
+
+# Whether the overdose pattern matches anywhere
+def _has_overdose_treatment(text):
+    if OVERDOSE_WORDS_PATTERN.search(text) is not None:
+        return True
+    stops = _NextMatch(STOP_PATTERN, text)
+    names = _NextMatch(LEPIRUDIN_PATTERN, text)
+    newlines = _NextMatch(NEWLINE_PATTERN, text)
+    stop = stops.search(0)
+    while stop is not None:
+        line_end = _line_end(newlines, stop.end())
+        name = names.search(stop.end())
+        if name is not None and name.start() <= line_end:
+            return True
+        stop = stops.search(line_end + 1)
+    return False
+
+
+# Group of the frequency pattern's first match, or None
+def _adverse_effect_frequency(text):
+    words = _NextMatch(FREQUENCY_WORD_PATTERN, text)
+    values = _NextMatch(FREQUENCY_VALUE_PATTERN, text)
+    newlines = _NextMatch(NEWLINE_PATTERN, text)
+    word = words.search(0)
+    while word is not None:
+        line_end = _line_end(newlines, word.end())
+        value = values.search(word.end())
+        if value is not None and value.start() <= line_end:
+            return value.group()
+        word = words.search(line_end + 1)
+    return None
+
+
+# Whether re.search(rf"not.*{word}", text, re.I) matches, in linear time: some
+# line of the lower-cased text has a "not" before its last occurrence of `word`
+def _not_before(lowered, word):
+    for line in lowered.split("\n"):
+        start = line.find("not")
+        if start >= 0 and line.rfind(word) >= start + 3:
+            return True
+    return False
+
+
+# Features of one toxicity text, in TOXICITY_COLUMNS order
+def _toxicity_row(text):
+    lowered = text.lower()
+
+    animals, effects, refs = [], [], []
+    for match in TOXICITY_TERMS_PATTERN.finditer(text):
+        if match.lastgroup == "animal":
+            animals.append(match.group())
+        elif match.lastgroup == "effect":
+            effects.append(match.group())
+        else:
+            refs.append(match.group())
+    tox_tested_animals = list(set([a.lower().rstrip('s') for a in animals]))
+    observed_effects = list(set([e.lower() for e in effects]))
+    ref_ids = list(set(refs))
+
+    has_dose = "mg/kg" in lowered
+    tox_dose_by_route = {}
+    if has_dose and "(" in text:
+        for route, pattern in TOXICITY_ROUTE_WORD_PATTERNS:
+            if route not in lowered:
+                continue
+            for animal, low, high in _route_doses(text, pattern):
+                animal = animal.lower().rstrip('s')
+                if high:
+                    tox_dose_by_route.setdefault(route, []).append((animal, float(low), float(high)))
+                else:
+                    tox_dose_by_route.setdefault(route, []).append((animal, float(low), "unspecified"))
+
+    tox_threshold_by_species = {}
+    if has_dose:
+        for dose, species in _threshold_doses(text):
+            species = species.lower().rstrip('s')
+            dose = float(dose)
+            tox_threshold_by_species[species] = min(dose, tox_threshold_by_species.get(species, float("inf")))
+
+    mutagenicity = None
+    if "mutagenic" in lowered:
+        mutagenicity = "non-mutagenic" if _not_before(lowered, "mutagenic") else "mutagenic"
+    if "carcinogenic" in lowered:
+        mutagenicity = mutagenicity or ("non-carcinogenic" if _not_before(lowered, "carcinogenic") else "carcinogenic")
+
+    ld50_values = []
+    if has_dose and "ld<sub>50</sub>" in lowered:
+        ld50_values = [(sp.lower().rstrip('s'), "unspecified", float(val), comp)
+                       for sp, comp, val in _ld50_doses(text)]
+
+    overdose_treatment = _has_overdose_treatment(text)
+
+    human_toxicity = []
+    for sentence in SENTENCE_SPLIT_PATTERN.split(text):
+        sentence_lowered = sentence.lower()
+        if any(word in sentence_lowered for word in HUMAN_TOXICITY_WORDS):
+            human_toxicity.append(sentence.strip())
+
+    adverse_effect_freq = None
+    if "frequency" in lowered:
+        adverse_effect_freq = _adverse_effect_frequency(text)
+
+    special_population = [pop for pop in SPECIAL_POPULATIONS if pop in lowered]
+
+    return (tox_tested_animals, tox_dose_by_route, observed_effects, tox_threshold_by_species, mutagenicity,
+            ld50_values, human_toxicity, overdose_treatment, adverse_effect_freq, special_population, ref_ids)
+
+
+# A _toxicity_row read back from the cache (JSON): the row and the dose and
+# LD50 entries are tuples again
+def _toxicity_row_from_cache(row):
+    (tox_tested_animals, tox_dose_by_route, observed_effects, tox_threshold_by_species, mutagenicity,
+     ld50_values, human_toxicity, overdose_treatment, adverse_effect_freq, special_population, ref_ids) = row
+    tox_dose_by_route = {route: [tuple(dose) for dose in doses] for route, doses in tox_dose_by_route.items()}
+    ld50_values = [tuple(value) for value in ld50_values]
+    return (tox_tested_animals, tox_dose_by_route, observed_effects, tox_threshold_by_species, mutagenicity,
+            ld50_values, human_toxicity, overdose_treatment, adverse_effect_freq, special_population, ref_ids)
+
+
+# Toxicity features of a whole column as a DataFrame with one column per
+# feature, equal to values.apply(extract_toxicity_features).apply(pd.Series).
+# Each distinct text is featurized once (or served from `cache`).
+def extract_toxicity_feature_columns(values, cache=None):
+    text = pd.Series([value if isinstance(value, str) else None for value in values], dtype=object)
+    codes, rows = _cached_distinct(
+        text, "extract_toxicity_feature_columns", lambda missing: [_toxicity_row(value) for value in missing], cache,
+        restore=_toxicity_row_from_cache
+    )
+    columns = [[] for _ in TOXICITY_COLUMNS]
+    for code in codes:
+        row = rows[code] if code >= 0 else ([], {}, [], {}, None, [], [], False, None, [], [])
+        for column, value in zip(columns, row):
+            column.append(value)
+    return pd.DataFrame(dict(zip(TOXICITY_COLUMNS, columns)), index=values.index)
+
+
+# ---------------------------------------------------------------------------
+# Featurization cache
+#
+# Text featurizers are pure functions of their input string, so their results
+# are cached across runs per (featurizer, version, text hash) in
+# drugbank_feature_cache. A featurizer's version is a hash of its source and of
+# everything of this module (or of drugbank_smiles) it uses (helpers, patterns,
+# constants), so editing any of them recomputes only the entries of the
+# featurizers affected.
+# ---------------------------------------------------------------------------
+
+# Modules whose functions are followed into a featurizer's version
+FEATURIZER_MODULES = {__name__, "drugbank_smiles"}
+
+
+# Names used by a code object and the functions/lambdas nested in it
+def _code_names(code):
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= _code_names(const)
+    return names
+
+
+# Source text of `value` and of the module-level objects it depends on
+def _source_parts(value, seen):
+    if isinstance(value, types.FunctionType):
+        if value.__module__ not in FEATURIZER_MODULES or value in seen:
+            return []
+        seen.add(value)
+        parts = [inspect.getsource(value)]
+        for name in sorted(_code_names(value.__code__)):
+            if name in value.__globals__:
+                parts += _source_parts(value.__globals__[name], seen)
+        return parts
+    if isinstance(value, re.Pattern):
+        return [f"{value.pattern!r} {value.flags}"]
+    if isinstance(value, (list, tuple)):
+        return [part for item in value for part in _source_parts(item, seen)]
+    if isinstance(value, (str, int, float)):
+        return [repr(value)]
+    return []
+
+
+def featurizer_version(*functions):
+    seen = set()
+    source = "\n".join(part for function in functions for part in _source_parts(function, seen))
+    return hashlib.blake2b(source.encode("utf-8"), digest_size=8).hexdigest()
+
+
+# Results of featurizer `name` for the distinct strings of `text` (missing
+# values excluded): those in `cache` are read from it (and passed through
+# `restore`), the others computed with compute(list of strings) -> list of
+# results and written back. Returns (codes, results) with codes as
+# pd.factorize gives them.
+def _cached_distinct(text, name, compute, cache, restore=None):
+    codes, distinct = pd.factorize(text)
+    distinct = list(distinct)
+    found = {}
+    if cache is not None:
+        found = cache.get_many(name, FEATURIZER_VERSIONS[name], distinct)
+        if restore is not None:
+            found = {value: restore(result) for value, result in found.items()}
+        add_section("feature_cache_hits", 0.0, rows=len(found))
+    missing = [value for value in distinct if value not in found]
+    if missing:
+        computed = dict(zip(missing, compute(missing)))
+        if cache is not None:
+            cache.put_many(name, FEATURIZER_VERSIONS[name], computed)
+            add_section("feature_cache_misses", 0.0, rows=len(missing))
+        found.update(computed)
+    return codes, [found[value] for value in distinct]
+
+
+# cleaner(values) with the per-string results cached
+def _cached_cleaner(cleaner, values, cache):
+    if cache is None:
+        return cleaner(values)
+    text = pd.Series(values.to_numpy(dtype=object), dtype=object)
+    text = text.where(text.isna(), text.astype(str))
+    codes, results = _cached_distinct(
+        text, cleaner.__name__, lambda missing: cleaner(pd.Series(missing, dtype=object)).tolist(), cache
+    )
+    result = np.array(results + [np.nan], dtype=float)[codes]
+    return pd.Series(result, index=values.index, name=values.name)
+
+
+# smiles_feature_columns(values) with the per-string counts cached
+def _cached_smiles_feature_columns(values, cache):
+    if cache is None:
+        return smiles_feature_columns(values)
+    text = pd.Series([value if isinstance(value, str) else None for value in values], dtype=object)
+    codes, counts = _cached_distinct(
+        text, "smiles_feature_columns",
+        lambda missing: smiles_feature_columns(pd.Series(missing, dtype=object)).to_numpy().tolist(), cache
+    )
+    counts = np.array(counts + [[0] * len(SMILES_COUNT_COLUMNS)], dtype=np.int32).reshape(-1, len(SMILES_COUNT_COLUMNS))
+    return pd.DataFrame(counts[codes], columns=SMILES_COUNT_COLUMNS, index=values.index)
+
+
+# ---------------------------------------------------------------------------
+# Stage 6 featurization
+#
+# Every featurizer above works row by row, so the merged drug table can be cut
+# into row blocks that are featurized independently in a process pool and
+# concatenated back in their original order.
+# ---------------------------------------------------------------------------
+
+# Rows per block handed to a worker
+FEATURIZE_CHUNK_SIZE = 2000
+
+
+# (output column, featurizer, source column) of the property cleaners
+PROPERTY_CLEANERS = [
+    ("Boiling Point", clean_boiling_point, "Boiling Point"),
+    ("Melting Point", clean_melting_point, "Melting Point"),
+    ("Isoelectric Point", clean_isoelectric_point, "Isoelectric Point"),
+    ("Water Solubility (g/L)", clean_water_solubility_g_per_l, "Water Solubility"),
+    ("pKa", clean_pka, "pKa"),
+]
+
+# Cache version of every cached featurizer (see featurizer_version)
+FEATURIZER_VERSIONS = {
+    cleaner.__name__: featurizer_version(cleaner, _cached_cleaner) for _, cleaner, _ in PROPERTY_CLEANERS
+}
+FEATURIZER_VERSIONS["extract_toxicity_feature_columns"] = featurizer_version(extract_toxicity_feature_columns)
+FEATURIZER_VERSIONS["smiles_feature_columns"] = featurizer_version(smiles_feature_columns, _cached_smiles_feature_columns)
+
+
+# Apply all stage 6 featurizers to one block of the merged drug table, with the
+# text featurizers going through `cache` (a FeatureCache) when one is given.
+# Every featurizer is timed as a profiling section named after it.
+def featurize_frame(df, cache=None):
+    df = df.copy()
+    rows = len(df)
+    for column, cleaner, source in PROPERTY_CLEANERS:
+        with section(cleaner.__name__, rows=rows):
+            df[column] = _cached_cleaner(cleaner, df[source], cache)
+
+    # Toxicity text features, all patterns in one pass per drug
+    with section("extract_toxicity_feature_columns", rows=rows):
+        tox_features_df = extract_toxicity_feature_columns(df["toxicity"], cache)
+    df = pd.concat([df, tox_features_df], axis=1)
+
+    # SMILES encoding and structural feature extraction
+    with section("smiles_hash_column", rows=rows):
+        df["SMILES_hash"] = smiles_hash_column(df["SMILES"])
+    with section("smiles_feature_columns", rows=rows):
+        smiles_features = _cached_smiles_feature_columns(df["SMILES"], cache)
+    return pd.concat([df, smiles_features], axis=1)
+
+
+# Featurize one block with its own connection to the cache at `cache_path`
+# (None: no cache) and hand back the block's timings. Used by the workers of
+# the parallel mode, whose section times add up, so they read as per-worker
+# throughput.
+def _featurize_chunk(df, cache_path=None, known=None):
+    take_sections()
+    cache = open_feature_cache(cache_path, known)
+    try:
+        frame = featurize_frame(df, cache)
+    finally:
+        if cache is not None:
+            cache.close()
+    return frame, take_sections()
+
+
+# Featurize the table in row blocks of `chunk_size`, spread over `workers`
+# processes; the blocks are concatenated in their original order. With
+# `cache_path` the text featurizers share the feature cache at that path;
+# `known` results (see previous_feature_results) are served before it.
+def featurize_frame_parallel(df, workers=1, chunk_size=FEATURIZE_CHUNK_SIZE, cache_path=None, known=None):
+    if workers <= 1 or len(df) <= chunk_size:
+        cache = open_feature_cache(cache_path, known)
+        try:
+            return featurize_frame(df, cache)
+        finally:
+            if cache is not None:
+                cache.close()
+
+    chunks = [df.iloc[start:start + chunk_size] for start in range(0, len(df), chunk_size)]
+    frames = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for frame, sections in pool.map(_featurize_chunk, chunks, repeat(cache_path), repeat(known)):
+            frames.append(frame)
+            merge_sections(sections)
+    return pd.concat(frames)
+
+
+# ---------------------------------------------------------------------------
+# Incremental featurization
+#
+# Stage 6 --incremental keeps the cached featurizer results of the drugs that
+# did not change since the previous run. They are read back from the rows of
+# the previous stage 6 table and served as known results (KnownFeatures), so
+# the table still goes through featurize_frame as a whole and comes out
+# exactly as a full run would write it; only the inputs of added or changed
+# drugs are featurized.
+# ---------------------------------------------------------------------------
+
+# Columns of the merged drug table the featurizers read
+FEATURE_INPUT_COLUMNS = [source for _, _, source in PROPERTY_CLEANERS] + ["toxicity", "SMILES"]
+
+
+# Digest of the featurizer inputs of every drug as {primary_drugbank_id: digest}
+def feature_input_digests(df):
+    digests = {}
+    for drug_id, *values in df[["primary_drugbank_id"] + FEATURE_INPUT_COLUMNS].itertuples(index=False):
+        text = repr([None if pd.isna(value) else str(value) for value in values])
+        digests[drug_id] = hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+    return digests
+
+
+# Marks a stored toxicity value that does not parse back
+_UNPARSED = object()
+
+# Toxicity columns stored as plain text (None when missing); the others are
+# the repr of lists and dicts, and overdose_treatment a flag
+TOXICITY_TEXT_COLUMNS = ["mutagenic_or_carcinogenic", "adverse_effect_frequency"]
+
+
+# One toxicity column of the stage 6 table (read with dtype=str) as the values
+# _toxicity_row gives; each distinct text is parsed once
+def _stored_toxicity_column(column, values):
+    codes, distinct = pd.factorize(values)
+    if column == "overdose_treatment":
+        parsed = [text == "True" for text in distinct] + [_UNPARSED]
+    elif column in TOXICITY_TEXT_COLUMNS:
+        parsed = list(distinct) + [None]
+    else:
+        parsed = []
+        for text in distinct:
+            try:
+                parsed.append(ast.literal_eval(text))
+            except (ValueError, SyntaxError):
+                parsed.append(_UNPARSED)
+        parsed.append(_UNPARSED)
+    return [parsed[code] for code in codes]
+
+
+# Results of the cached featurizers for the drugs `reuse`, read back from their
+# rows of the previous stage 6 table `previous` (loaded with dtype=str) as
+# {(featurizer, version): {input text: result}} for open_feature_cache. The
+# input texts are taken from the new merged table `df`; the drugs must have
+# the same inputs as in the previous run. Only featurizers whose version is
+# unchanged since then (`versions`, as FEATURIZER_VERSIONS) are included, and
+# toxicity rows that do not parse back are left to be featurized again.
+def previous_feature_results(df, previous, reuse, versions):
+    inputs = df[df["primary_drugbank_id"].isin(reuse)]
+    previous = previous.drop_duplicates("primary_drugbank_id").set_index("primary_drugbank_id")
+    previous = previous.reindex(inputs["primary_drugbank_id"])
+    known = {}
+    for column, cleaner, source in PROPERTY_CLEANERS:
+        name = cleaner.__name__
+        if versions.get(name) != FEATURIZER_VERSIONS[name]:
+            continue
+        known[name, FEATURIZER_VERSIONS[name]] = {
+            str(text): float(value) if isinstance(value, str) else np.nan
+            for text, value in zip(inputs[source], previous[column]) if not pd.isna(text)
+        }
+
+    name = "extract_toxicity_feature_columns"
+    if versions.get(name) == FEATURIZER_VERSIONS[name]:
+        columns = [_stored_toxicity_column(column, previous[column]) for column in TOXICITY_COLUMNS]
+        known[name, FEATURIZER_VERSIONS[name]] = {
+            text: row for text, *row in zip(inputs["toxicity"], *columns)
+            if isinstance(text, str) and _UNPARSED not in row
+        }
+
+    name = "smiles_feature_columns"
+    if versions.get(name) == FEATURIZER_VERSIONS[name]:
+        counts = previous[SMILES_COUNT_COLUMNS].astype(np.int64).to_numpy().tolist()
+        known[name, FEATURIZER_VERSIONS[name]] = {
+            text: row for text, row in zip(inputs["SMILES"], counts) if isinstance(text, str)
+        }
+    return known
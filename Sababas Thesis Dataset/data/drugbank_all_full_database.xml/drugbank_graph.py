@@ -0,0 +1,116 @@
+import os
+import sys
+
+import numpy as np
+
+# Folder of the interaction graph written by stage 4 (one .npy file per array)
+GRAPH_FOLDER = "drug_interaction_graph"
+GRAPH_ARRAYS = ["indptr", "indices", "edge_type", "drug_ids"]
+
+
+# Build the CSR adjacency of the interaction graph from the compact store.
+# Every interaction is an undirected edge, stored in both rows. The B->A copy
+# carries the template listed from B's side when there is one.
+# Neighbors of each drug are sorted by index.
+def build_graph(store):
+    source, target = store["source"], store["target"]
+    forward_type = store["interaction_type"]
+    backward_type = np.where(store["reverse_type"] >= 0, store["reverse_type"], forward_type)
+
+    # Self-interactions are stored once
+    loop = source == target
+    rows = np.concatenate([source, target[~loop]])
+    columns = np.concatenate([target, source[~loop]])
+    edge_type = np.concatenate([forward_type, backward_type[~loop]])
+
+    order = np.lexsort((columns, rows))
+    n_drugs = len(store["drug_ids"])
+    indptr = np.zeros(n_drugs + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n_drugs), out=indptr[1:])
+    return {
+        "indptr": indptr,
+        "indices": columns[order].astype(np.int32),
+        "edge_type": edge_type[order],
+        "drug_ids": store["drug_ids"],
+    }
+
+
+def save_graph(graph, folder):
+    os.makedirs(folder, exist_ok=True)
+    for name in GRAPH_ARRAYS:
+        np.save(os.path.join(folder, f"{name}.npy"), graph[name])
+    return folder
+
+
+# Read-only view of the saved graph. Arrays are memory mapped, so opening is
+# close to instant and neighbor queries only touch the slice of one drug.
+class DrugGraph:
+    def __init__(self, folder, mmap=True):
+        mode = "r" if mmap else None
+        self.indptr, self.indices, self.edge_type, self.drug_ids = (
+            np.load(os.path.join(folder, f"{name}.npy"), mmap_mode=mode) for name in GRAPH_ARRAYS
+        )
+        self._index = None
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    # Drug index of a DrugBank ID (the row of drugbank_ids_and_names.csv)
+    def index_of(self, drug_id):
+        if self._index is None:
+            self._index = {str(value): i for i, value in enumerate(self.drug_ids)}
+        return self._index[drug_id]
+
+    def id_of(self, index):
+        return str(self.drug_ids[index])
+
+    def neighbors(self, index):
+        return self.indices[self.indptr[index]:self.indptr[index + 1]]
+
+    # Interaction types of the edges returned by neighbors()
+    def neighbor_types(self, index):
+        return self.edge_type[self.indptr[index]:self.indptr[index + 1]]
+
+    # Number of interaction partners of one drug, or of every drug
+    def degree(self, index=None):
+        if index is None:
+            return np.diff(self.indptr)
+        return int(self.indptr[index + 1] - self.indptr[index])
+
+    # Neighbors connected through one of the given interaction types
+    def typed_neighbors(self, index, edge_types):
+        mask = np.isin(self.neighbor_types(index), edge_types)
+        return self.neighbors(index)[mask]
+
+    # Drugs reachable in at most k steps (the start drug excluded), optionally
+    # following only edges of the given interaction types
+    def k_hop(self, index, k, edge_types=None):
+        visited = np.zeros(len(self), dtype=bool)
+        visited[index] = True
+        frontier = np.array([index])
+        for _ in range(k):
+            if edge_types is None:
+                reached = [self.neighbors(i) for i in frontier]
+            else:
+                reached = [self.typed_neighbors(i, edge_types) for i in frontier]
+            if not reached:
+                break
+            frontier = np.unique(np.concatenate(reached))
+            frontier = frontier[~visited[frontier]]
+            if len(frontier) == 0:
+                break
+            visited[frontier] = True
+        visited[index] = False
+        return np.flatnonzero(visited)
+
+
+if __name__ == "__main__":
+    # Example usage
+    folder = sys.argv[1] if len(sys.argv) > 1 else os.path.join("Drugbank_final_database", GRAPH_FOLDER)
+    graph = DrugGraph(folder)
+    degrees = graph.degree()
+    busiest = int(np.argmax(degrees)) if len(graph) else None
+    print(f"{len(graph)} drugs, {len(graph.indices)} directed edges")
+    if busiest is not None:
+        print(f"Most connected: {graph.id_of(busiest)} with {degrees[busiest]} partners, "
+              f"{len(graph.k_hop(busiest, 2))} drugs within 2 hops")
@@ -0,0 +1,215 @@
+import csv
+import os
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Placeholders written into interaction templates
+DRUG_A = "DRUG_A"
+DRUG_B = "DRUG_B"
+
+# Compact interaction store written by stage 4 next to drug_interactions_encoded
+INTERACTION_STORE_FILE = "drug_interactions_compact.npz"
+
+# Persistent template vocabulary (interaction_type -> template); kept in the
+# working folder so every release is encoded against the same IDs
+TEMPLATE_VOCABULARY_FILE = "interaction_template_vocabulary.csv"
+
+# Compiled case-insensitive pattern of every drug name seen so far. DrugBank has
+# a few thousand distinct names but millions of interaction rows, so each name
+# is compiled once instead of once per row.
+_NAME_PATTERNS = {}
+
+
+def name_pattern(name):
+    pattern = _NAME_PATTERNS.get(name)
+    if pattern is None:
+        pattern = _NAME_PATTERNS[name] = re.compile(re.escape(name), re.IGNORECASE)
+    return pattern
+
+
+# Replace both drug names of one interaction description in a single pass.
+# All occurrences of the two names are located in the original text and
+# overlapping matches are resolved leftmost-longest, so a name contained in the
+# other one (e.g. "Insulin" in "Insulin glargine") or a name matching inside a
+# placeholder already written never produces a broken template. On a tie
+# DRUG_A wins. Empty names are skipped instead of matching between every character.
+def normalize_description(description, drug_a_name, drug_b_name):
+    spans = []
+    for order, (name, placeholder) in enumerate(((drug_a_name, DRUG_A), (drug_b_name, DRUG_B))):
+        if name:
+            spans.extend((m.start(), -m.end(), order, placeholder) for m in name_pattern(name).finditer(description))
+    if not spans:
+        return description.strip()
+
+    spans.sort()
+    parts = []
+    position = 0
+    for start, negative_end, _, placeholder in spans:
+        if start < position:
+            # Overlaps a match already replaced
+            continue
+        parts.append(description[position:start])
+        parts.append(placeholder)
+        position = -negative_end
+    parts.append(description[position:])
+    return "".join(parts).strip()
+
+
+_PLACEHOLDER_PATTERN = re.compile(f"{DRUG_A}|{DRUG_B}")
+
+
+# The template as listed from the other drug's record: the same sentence with
+# the two drugs' roles, hence DRUG_A and DRUG_B, exchanged
+def swap_placeholders(template):
+    return _PLACEHOLDER_PATTERN.sub(lambda m: DRUG_B if m.group() == DRUG_A else DRUG_A, template)
+
+
+# Templates of a whole interaction table, given its descriptions and the names
+# of both drugs of every row (iterables of strings, missing values as "")
+def normalize_descriptions(descriptions, drug_a_names, drug_b_names):
+    return [
+        normalize_description(description, drug_a_name, drug_b_name)
+        for description, drug_a_name, drug_b_name in zip(descriptions, drug_a_names, drug_b_names)
+    ]
+
+
+# Stable integer IDs of interaction templates. IDs are never renumbered: a
+# new release only appends the templates it introduces (in sorted order, so a
+# vocabulary built from scratch gives the same codes as
+# astype("category").cat.codes). Templates are interned, so every row encoded
+# with the vocabulary shares one string object per template.
+class TemplateVocabulary:
+    def __init__(self, templates=()):
+        self.templates = []
+        self.ids = {}
+        for template in templates:
+            self.add(template)
+
+    @classmethod
+    def load(cls, path=TEMPLATE_VOCABULARY_FILE):
+        if not os.path.exists(path):
+            return cls()
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = sorted(csv.DictReader(f), key=lambda row: int(row["interaction_type"]))
+        return cls(row["interaction_template"] for row in rows)
+
+    def save(self, path=TEMPLATE_VOCABULARY_FILE):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["interaction_type", "interaction_template"])
+            writer.writerows(enumerate(self.templates))
+        return path
+
+    def __len__(self):
+        return len(self.templates)
+
+    # ID of a template, appending it when it is new
+    def add(self, template):
+        template_id = self.ids.get(template)
+        if template_id is None:
+            template = sys.intern(template)
+            template_id = self.ids[template] = len(self.templates)
+            self.templates.append(template)
+        return template_id
+
+    # IDs of a sequence of templates, as the smallest signed integer array that
+    # holds every ID of the vocabulary (like cat.codes). Each distinct template
+    # is looked up once; unknown templates are appended (sorted) when `extend`
+    # is set, otherwise they get -1.
+    def encode(self, templates, extend=True):
+        codes, distinct = pd.factorize(pd.Series(templates, dtype=object))
+        if extend:
+            for template in sorted(template for template in distinct if template not in self.ids):
+                self.add(template)
+        ids = np.array([self.ids.get(template, -1) for template in distinct] + [-1], dtype=np.int64)
+        return ids[codes].astype(_code_dtype(max(len(self.templates) - 1, 1)))
+
+    # Interned template of every ID
+    def decode(self, ids):
+        return [self.templates[template_id] if template_id >= 0 else None for template_id in ids]
+
+    # Online path: ID of one raw interaction description, -1 for a template
+    # the vocabulary does not know
+    def encode_description(self, description, drug_a_name, drug_b_name):
+        return self.ids.get(normalize_description(description, drug_a_name, drug_b_name), -1)
+
+
+# Drug-ID dictionary shared by the compact interaction store and the graph:
+# the primary IDs in table (= XML document) order, so index i is row i of
+# drugbank_ids_and_names.csv, followed by interaction partners that have no
+# drug record of their own, sorted
+def build_drug_index(primary_ids, partner_ids=()):
+    drug_ids = list(dict.fromkeys(primary_ids))
+    known = set(drug_ids)
+    drug_ids.extend(sorted(set(partner_ids) - known))
+    return drug_ids
+
+
+# Smallest signed integer type holding codes up to `max_value`
+def _code_dtype(max_value):
+    for dtype in (np.int8, np.int16, np.int32):
+        if max_value <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+# Save an interaction table as a compact edge list.
+# Rows are mapped to int32 indexes into `drug_ids` and A->B / B->A duplicates
+# are collapsed into one edge that keeps the direction and template of the
+# first listed row. `reverse_type` is the template listed from the other side
+# (-1 when the pair is listed one way only) and `differs` flags pairs whose two
+# sides describe the interaction with different sentences. The templates are
+# role-relative (DRUG_A is the drug whose record lists the row), so a sentence
+# repeated on both sides has its placeholders swapped on the reverse side and
+# is compared as such. Template text is stored once per interaction_type
+# instead of once per row.
+def write_interaction_store(path, drug_ids, source_ids, target_ids, interaction_types, templates):
+    index = {drug_id: i for i, drug_id in enumerate(drug_ids)}
+    source = np.fromiter((index[drug_id] for drug_id in source_ids), dtype=np.int32)
+    target = np.fromiter((index[drug_id] for drug_id in target_ids), dtype=np.int32)
+    return write_interaction_edges(path, drug_ids, source, target, interaction_types, templates)
+
+
+# write_interaction_store for rows already mapped to indexes into `drug_ids`
+def write_interaction_edges(path, drug_ids, source, target, interaction_types, templates):
+    source = np.asarray(source, dtype=np.int32)
+    target = np.asarray(target, dtype=np.int32)
+    types = np.asarray(interaction_types, dtype=np.int64)
+    type_dtype = _code_dtype(max(len(templates) - 1, 1))
+
+    # One key per unordered pair; the first row of each pair becomes the edge
+    key = np.minimum(source, target).astype(np.int64) * len(drug_ids) + np.maximum(source, target)
+    _, first, inverse = np.unique(key, return_index=True, return_inverse=True)
+    is_reverse = source != source[first][inverse]
+    reverse_type = np.full(len(first), -1, dtype=np.int64)
+    reverse_type[inverse[is_reverse]] = types[is_reverse]
+
+    order = np.argsort(first, kind="stable")
+    edges = first[order]
+    reverse_type = reverse_type[order]
+
+    # Template of each type with the roles exchanged, -1 when it is not in the vocabulary
+    template_ids = {template: i for i, template in enumerate(templates)}
+    swapped_type = np.array([template_ids.get(swap_placeholders(template), -1) for template in templates] + [-1],
+                            dtype=np.int64)
+    differs = (reverse_type >= 0) & (swapped_type[reverse_type] != types[edges])
+    np.savez_compressed(
+        path,
+        drug_ids=np.array(drug_ids, dtype=str),
+        templates=np.array(templates, dtype=str),
+        source=source[edges],
+        target=target[edges],
+        interaction_type=types[edges].astype(type_dtype),
+        reverse_type=reverse_type.astype(type_dtype),
+        differs=differs,
+    )
+    return path
+
+
+# Load the compact interaction store as a dict of NumPy arrays
+def load_interaction_store(path):
+    with np.load(path, allow_pickle=False) as store:
+        return {name: store[name] for name in store.files}
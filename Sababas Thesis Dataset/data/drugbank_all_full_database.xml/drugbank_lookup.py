@@ -0,0 +1,177 @@
+import argparse
+import csv
+import json
+import os
+import sys
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Tables written by XML_to_CSV_Conversion.py
+IDS_AND_NAMES_FILE = 'drugbank_ids_and_names.csv'
+SYNONYMS_FILE = 'drugbank_synonyms.csv'
+
+# Entries kept by the cached single-value lookups
+LOOKUP_CACHE_SIZE = 65536
+
+
+# In-memory DrugBank ID/name/synonym resolver. The table is held once as two
+# tuples (ids, names; position = drug index) plus hash indexes on ID, exact
+# name and casefolded name/synonym, so a lookup is a dict probe and needs no
+# pandas. Exact names win over case-insensitive matches, names over synonyms,
+# and the first drug listed wins when several share a name.
+#   lookup = DrugLookup.load()
+#   lookup.id_of('Lepirudin'), lookup.ids_of(column), lookup.name_of('DB00001')
+class DrugLookup:
+    def __init__(self, drug_ids, names, synonyms=()):
+        self.drug_ids = tuple(sys.intern(str(drug_id)) for drug_id in drug_ids)
+        self.names = tuple(sys.intern(name) if isinstance(name, str) else '' for name in names)
+        self._by_id = {}
+        self._by_name = {}
+        self._by_folded = {}
+        for i, (drug_id, name) in enumerate(zip(self.drug_ids, self.names)):
+            self._by_id.setdefault(drug_id, i)
+            if name:
+                self._by_name.setdefault(name, i)
+                self._by_folded.setdefault(name.casefold(), i)
+        self.synonyms = {}
+        for drug_id, synonym in synonyms:
+            i = self._by_id.get(drug_id)
+            if i is None or not synonym:
+                continue
+            self.synonyms.setdefault(drug_id, []).append(synonym)
+            self._by_folded.setdefault(synonym.casefold(), i)
+
+        # Cached paths for hot values; the batch methods go to the dicts directly
+        self.id_of = lru_cache(maxsize=LOOKUP_CACHE_SIZE)(self._id_of)
+        self.name_of = lru_cache(maxsize=LOOKUP_CACHE_SIZE)(self._name_of)
+
+    # Load the tables of XML_to_CSV_Conversion.py (the synonyms file is optional)
+    @classmethod
+    def load(cls, ids_file=IDS_AND_NAMES_FILE, synonyms_file=SYNONYMS_FILE):
+        with open(ids_file, newline='', encoding='utf-8') as f:
+            rows = list(csv.reader(f))[1:]
+        synonyms = []
+        if synonyms_file and os.path.exists(synonyms_file):
+            with open(synonyms_file, newline='', encoding='utf-8') as f:
+                synonyms = [tuple(row) for row in csv.reader(f)][1:]
+        return cls([row[0] for row in rows], [row[1] for row in rows], synonyms)
+
+    def __len__(self):
+        return len(self.drug_ids)
+
+    def __contains__(self, drug_id):
+        return drug_id in self._by_id
+
+    # Drug index (position in the ID/name table) of a name or synonym, or None
+    def index_of_name(self, name, ignore_case=True):
+        i = self._by_name.get(name)
+        if i is None and ignore_case and isinstance(name, str):
+            i = self._by_folded.get(name.strip().casefold())
+        return i
+
+    def _id_of(self, name, ignore_case=True):
+        i = self.index_of_name(name, ignore_case)
+        return None if i is None else self.drug_ids[i]
+
+    def _name_of(self, drug_id):
+        i = self._by_id.get(drug_id)
+        return None if i is None else self.names[i]
+
+    # DrugBank IDs of a whole column of names (None where unknown). Every
+    # distinct value is resolved once.
+    def ids_of(self, names, ignore_case=True, default=None):
+        resolved = {}
+        for name in dict.fromkeys(names):
+            i = self.index_of_name(name, ignore_case)
+            resolved[name] = default if i is None else self.drug_ids[i]
+        return [resolved[name] for name in names]
+
+    # Names of a whole column of DrugBank IDs (`default` where unknown)
+    def names_of(self, drug_ids, default=None):
+        by_id, all_names = self._by_id, self.names
+        result = []
+        for drug_id in drug_ids:
+            i = by_id.get(drug_id)
+            result.append(default if i is None else all_names[i])
+        return result
+
+    # Everything known about one drug, or None
+    def record(self, drug_id):
+        i = self._by_id.get(drug_id)
+        if i is None:
+            return None
+        return {'id': drug_id, 'name': self.names[i], 'synonyms': self.synonyms.get(drug_id, [])}
+
+
+# HTTP endpoint on top of a DrugLookup (one thread per connection):
+#   GET  /resolve?name=Lepirudin&name=aspirin   -> {"Lepirudin": "DB00001", "aspirin": ...}
+#   POST /resolve  ["Lepirudin", "aspirin"]     -> ["DB00001", ...]  (batch, same order)
+#   GET  /drug?id=DB00001                       -> {"id": ..., "name": ..., "synonyms": [...]}
+# Unknown names resolve to null, unknown IDs give 404.
+def make_handler(lookup):
+    class LookupHandler(BaseHTTPRequestHandler):
+        def _reply(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            if url.path == '/resolve':
+                self._reply(200, {name: lookup.id_of(name) for name in query.get('name', [])})
+            elif url.path == '/drug':
+                record = lookup.record(query.get('id', [''])[0])
+                self._reply(200 if record else 404, record or {'error': 'unknown DrugBank ID'})
+            else:
+                self._reply(404, {'error': 'unknown path'})
+
+        def do_POST(self):
+            if urlparse(self.path).path != '/resolve':
+                self._reply(404, {'error': 'unknown path'})
+                return
+            try:
+                names = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            except ValueError:
+                self._reply(400, {'error': 'expected a JSON list of names'})
+                return
+            if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+                self._reply(400, {'error': 'expected a JSON list of names'})
+                return
+            self._reply(200, lookup.ids_of(names))
+
+        # Requests are not logged line by line
+        def log_message(self, format, *args):
+            pass
+
+    return LookupHandler
+
+
+def serve(lookup, host='127.0.0.1', port=8765):
+    server = ThreadingHTTPServer((host, port), make_handler(lookup))
+    print(f'✅ Resolving {len(lookup)} drugs on http://{host}:{server.server_port}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Resolve drug names to DrugBank IDs, or serve the lookup over HTTP.')
+    parser.add_argument('names', nargs='*', help='names to resolve (default: start the HTTP endpoint)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    drug_lookup = DrugLookup.load()
+    if args.names:
+        for drug_name, resolved_id in zip(args.names, drug_lookup.ids_of(args.names)):
+            print(f'{drug_name}\t{resolved_id or "-"}')
+    else:
+        serve(drug_lookup, args.host, args.port)
@@ -0,0 +1,71 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Folder (inside the table folder) holding the sparse multi-hot feature matrices
+MULTI_HOT_FOLDER = "multi_hot"
+
+
+# Sparse multi-hot matrix of a many-to-many attribute given as (drug, label) pairs.
+# Row i is drug `rows[i]`, column j is label `columns[j]` (sorted). Empty labels
+# and drugs missing from `rows` are ignored; repeated pairs count once.
+# Returns (scipy CSR matrix of uint8, columns).
+def multi_hot(row_keys, labels, rows):
+    import scipy.sparse as sp
+
+    pairs = pd.DataFrame({"row": np.asarray(row_keys, dtype=object), "label": np.asarray(labels, dtype=object)})
+    pairs = pairs[pairs["label"].notna() & (pairs["label"] != "")].drop_duplicates()
+
+    columns = sorted(pairs["label"].unique())
+    row_codes = pd.Categorical(pairs["row"], categories=pd.Index(rows)).codes
+    column_codes = pd.Categorical(pairs["label"], categories=columns).codes
+    known = row_codes >= 0
+
+    matrix = sp.csr_matrix(
+        (np.ones(int(known.sum()), dtype=np.uint8), (row_codes[known], column_codes[known])),
+        shape=(len(rows), len(columns))
+    )
+    return matrix, columns
+
+
+# (row key, label) pairs of a column of joined multi-valued strings such as
+# groups ("approved,investigational"). Each distinct string is split once
+# (`separator` is a regular expression) and the pieces are stripped; missing
+# values give no pairs. Returns (keys, labels) ready for multi_hot().
+def split_labels(row_keys, values, separator=","):
+    codes, distinct = pd.factorize(pd.Series(values, dtype=object))
+    pieces = pd.DataFrame({
+        "code": range(len(distinct)),
+        "label": pd.Series(distinct, dtype=object).str.split(separator, regex=True),
+    }).explode("label")
+    pieces["label"] = pieces["label"].str.strip()
+
+    rows = pd.DataFrame({"key": np.asarray(row_keys, dtype=object), "code": codes})
+    pairs = rows[rows["code"] >= 0].merge(pieces, on="code")
+    return pairs["key"].to_numpy(), pairs["label"].to_numpy()
+
+
+# Write <name>.npz plus the row and column labels (<name>_rows.txt, <name>_columns.txt)
+def save_multi_hot(name, matrix, rows, columns, folder):
+    import scipy.sparse as sp
+
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"{name}.npz")
+    sp.save_npz(path, matrix)
+    for suffix, labels in (("rows", rows), ("columns", columns)):
+        with open(os.path.join(folder, f"{name}_{suffix}.txt"), "w", encoding="utf-8") as f:
+            f.writelines(f"{label}\n" for label in labels)
+    return path
+
+
+# Load a matrix written by save_multi_hot as (matrix, rows, columns)
+def load_multi_hot(name, folder):
+    import scipy.sparse as sp
+
+    matrix = sp.load_npz(os.path.join(folder, f"{name}.npz"))
+    labels = []
+    for suffix in ("rows", "columns"):
+        with open(os.path.join(folder, f"{name}_{suffix}.txt"), encoding="utf-8") as f:
+            labels.append(f.read().splitlines())
+    return matrix, labels[0], labels[1]
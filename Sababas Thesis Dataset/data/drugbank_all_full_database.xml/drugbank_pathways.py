@@ -0,0 +1,65 @@
+import pandas as pd
+
+from drugbank_multihot import multi_hot
+
+# Keyed per-drug pathway summary written by stage 5 (one row per drug of the main table)
+PATHWAY_SUMMARY_TABLE = "pathway_summary"
+
+# Columns of the pathway summary
+PATHWAY_SUMMARY_COLUMNS = ["pathway_count", "unique_pathway_categories", "unique_enzyme_count", "has_pathway_info"]
+
+
+# Distinct (drug, enzyme) pairs of the pathway table. The comma separated enzyme
+# lists repeat across drugs sharing a pathway, so each distinct list is split
+# once (spaces removed) and joined back to the drugs listing it. Empty pieces
+# (empty lists, doubled or trailing commas) are kept as "".
+def explode_enzymes(pathways_df):
+    codes, lists = pd.factorize(pathways_df["pathway_enzymes"])
+    pieces = pd.DataFrame({
+        "code": range(len(lists)),
+        "enzyme": [value.replace(" ", "").split(",") for value in lists],
+    }).explode("enzyme")
+
+    drug_lists = pd.DataFrame({"primary_drugbank_id": pathways_df["primary_drugbank_id"].to_numpy(), "code": codes})
+    exploded = drug_lists.drop_duplicates().merge(pieces, on="code")[["primary_drugbank_id", "enzyme"]]
+    return exploded.drop_duplicates().reset_index(drop=True)
+
+
+# Per-drug pathway summary of the pathway table (missing values as ""):
+#  - pathway_count: pathway rows of the drug
+#  - unique_pathway_categories: distinct categories of the non-empty cells, stripped,
+#    sorted and joined with ","
+#  - unique_enzyme_count: distinct enzyme pieces, "" included, or 0 when every
+#    enzyme list of the drug is empty
+#  - has_pathway_info: 1
+# One row per drug, sorted by primary_drugbank_id.
+def summarize_pathways(pathways_df):
+    by_drug = pathways_df.groupby("primary_drugbank_id", sort=True)
+    summary = pd.DataFrame({"pathway_count": by_drug.size()})
+
+    listed = pathways_df[pathways_df["pathway_category"] != ""]
+    categories = pd.DataFrame({
+        "primary_drugbank_id": listed["primary_drugbank_id"],
+        "category": listed["pathway_category"].str.strip(),
+    })
+    categories = categories.drop_duplicates().sort_values(["primary_drugbank_id", "category"])
+    summary["unique_pathway_categories"] = categories.groupby("primary_drugbank_id")["category"].agg(",".join)
+    summary["unique_pathway_categories"] = summary["unique_pathway_categories"].fillna("")
+
+    enzyme_count = explode_enzymes(pathways_df).groupby("primary_drugbank_id").size()
+    has_enzymes = (pathways_df["pathway_enzymes"] != "").groupby(pathways_df["primary_drugbank_id"]).any()
+    summary["unique_enzyme_count"] = enzyme_count.where(has_enzymes, 0)
+
+    summary["has_pathway_info"] = 1
+    return summary.reset_index()
+
+
+# Sparse drug x pathway (SMPDB ID) and drug x enzyme (UniProt ID) multi-hot
+# matrices, rows in the order of `drug_ids`.
+# Returns {name: (matrix, columns)}.
+def pathway_multi_hot(pathways_df, drug_ids):
+    enzymes = explode_enzymes(pathways_df)
+    return {
+        "pathway_multihot": multi_hot(pathways_df["primary_drugbank_id"], pathways_df["pathway_smpdb_id"], drug_ids),
+        "enzyme_multihot": multi_hot(enzymes["primary_drugbank_id"], enzymes["enzyme"], drug_ids),
+    }
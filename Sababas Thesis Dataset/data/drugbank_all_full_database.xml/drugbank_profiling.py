@@ -0,0 +1,149 @@
+import atexit
+import cProfile
+import json
+import os
+import platform
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Folder the per-stage JSON reports are written to (<stage>.json); reports are
+# only written when it is set. run_pipeline.py --profile sets it for every stage.
+PROFILE_FOLDER = os.environ.get('DRUGBANK_PROFILE_DIR')
+# Set to 'cprofile' to also dump <stage>.prof (pstats format) next to the report
+PROFILER = os.environ.get('DRUGBANK_PROFILER', '')
+
+# Timed sections of this process: name -> {'seconds', 'calls', 'rows', 'bytes'}.
+# Always collected (the bookkeeping is a few dict updates per section), so
+# worker processes can hand their timings back to the stage that started them.
+_sections = {}
+_stage = None
+_profiler = None
+
+
+def add_section(name, seconds, rows=None, nbytes=None, calls=1):
+    entry = _sections.setdefault(name, {'seconds': 0.0, 'calls': 0, 'rows': 0, 'bytes': 0})
+    entry['seconds'] += seconds
+    entry['calls'] += calls
+    entry['rows'] += rows or 0
+    entry['bytes'] += nbytes or 0
+
+
+# Time a block of code; rows/nbytes are the amount of data it processed
+@contextmanager
+def section(name, rows=None, nbytes=None):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_section(name, time.perf_counter() - start, rows, nbytes)
+
+
+# Return and reset the sections timed so far (used by worker processes)
+def take_sections():
+    global _sections
+    sections, _sections = _sections, {}
+    return sections
+
+
+# Add sections returned by take_sections() in another process
+def merge_sections(sections):
+    for name, entry in sections.items():
+        add_section(name, entry['seconds'], entry['rows'], entry['bytes'], entry['calls'])
+
+
+# Peak resident set size in MB of this process and of its finished children
+# (pool workers); None where the resource module is not available
+def peak_rss_mb():
+    if resource is None:
+        return None, None
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return tuple(
+        round(resource.getrusage(who).ru_maxrss * scale / 1e6, 1)
+        for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)
+    )
+
+
+# Mark the start of a pipeline stage. When profiling is enabled the stage's
+# report is written when the process exits.
+def start_stage(name):
+    global _stage, _profiler
+    if not PROFILE_FOLDER:
+        return
+    _stage = {'name': name, 'started': datetime.now(timezone.utc).isoformat(timespec='seconds'), 'start': time.perf_counter()}
+    if PROFILER == 'cprofile':
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    atexit.register(finish_stage)
+
+
+def build_report():
+    peak_self, peak_children = peak_rss_mb()
+    sections = {}
+    for name, entry in sorted(_sections.items()):
+        seconds = entry['seconds']
+        sections[name] = dict(entry, seconds=round(seconds, 4))
+        if entry['rows']:
+            sections[name]['rows_per_second'] = round(entry['rows'] / seconds, 1) if seconds else None
+        if entry['bytes']:
+            sections[name]['bytes_per_second'] = round(entry['bytes'] / seconds, 1) if seconds else None
+    return {
+        'stage': _stage['name'],
+        'started': _stage['started'],
+        'wall_seconds': round(time.perf_counter() - _stage['start'], 4),
+        'peak_rss_mb': peak_self,
+        'peak_rss_children_mb': peak_children,
+        'argv': sys.argv[1:],
+        'storage_format': os.environ.get('DRUGBANK_STORAGE_FORMAT', 'csv'),
+        'python': platform.python_version(),
+        'sections': sections,
+    }
+
+
+def finish_stage():
+    global _stage, _profiler
+    if _stage is None:
+        return
+    os.makedirs(PROFILE_FOLDER, exist_ok=True)
+    if _profiler is not None:
+        _profiler.disable()
+        _profiler.dump_stats(os.path.join(PROFILE_FOLDER, f"{_stage['name']}.prof"))
+        _profiler = None
+    with open(os.path.join(PROFILE_FOLDER, f"{_stage['name']}.json"), 'w', encoding='utf-8') as f:
+        json.dump(build_report(), f, indent=2, sort_keys=True)
+    _stage = None
+
+
+# Sections whose time grew by more than `threshold` (relative) between two
+# reports, as (name, old seconds, new seconds)
+def compare_reports(old, new, threshold=0.2):
+    slower = []
+    entries = [('wall_seconds', old.get('wall_seconds'), new.get('wall_seconds'))]
+    for name, entry in new.get('sections', {}).items():
+        if name in old.get('sections', {}):
+            entries.append((name, old['sections'][name]['seconds'], entry['seconds']))
+    for name, before, after in entries:
+        if before and after and after > before * (1 + threshold):
+            slower.append((name, before, after))
+    return slower
+
+
+if __name__ == '__main__':
+    # Compare two reports of the same stage: python drugbank_profiling.py old.json new.json
+    with open(sys.argv[1], encoding='utf-8') as f:
+        old_report = json.load(f)
+    with open(sys.argv[2], encoding='utf-8') as f:
+        new_report = json.load(f)
+    regressions = compare_reports(old_report, new_report)
+    for name, before, after in regressions:
+        print(f'⚠️  {name}: {before:.3f} s -> {after:.3f} s ({after / before - 1:+.0%})')
+    if not regressions:
+        print('✅ No section got more than 20% slower')
+    sys.exit(1 if regressions else 0)
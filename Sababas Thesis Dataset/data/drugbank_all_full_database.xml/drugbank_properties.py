@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+from drugbank_pathways import PATHWAY_SUMMARY_TABLE
+from drugbank_storage import read_table
+
+# Keyed property table written by stage 3: one row per drug with at least one
+# property value, one column per property kind
+PROPERTY_TABLE = "drug_properties"
+
+# float64 version of a property column, or None when some value is not a
+# number (e.g. an experimental "Molecular Weight" given as "~150 kDa"); such
+# kinds stay text so nothing is lost. Every kind is tried, so a kind is typed
+# the same way whatever the storage format, as pandas would type it re-reading
+# a CSV. float64 keeps every digit of values like "670.382447".
+def _typed_values(values):
+    numbers = pd.to_numeric(values, errors='coerce')
+    if not numbers.isna().equals(values.isna()):
+        return None
+    return numbers.astype(np.float64)
+
+
+# Pivot the long property table (primary_drugbank_id, kind, value) into one
+# column per kind, indexed by primary_drugbank_id. Like
+# pivot_table(aggfunc='first'), each cell holds the first non-empty value
+# listed for the drug (calculated properties come before experimental ones in
+# the XML) and kinds are sorted. `kind` is kept categorical so the unstack
+# works on integer codes, and numeric kinds come out as float64.
+def pivot_properties(exp_props):
+    values = exp_props.loc[exp_props['value'].notna() & exp_props['kind'].notna(), ['primary_drugbank_id', 'kind', 'value']]
+    values = values.drop_duplicates(['primary_drugbank_id', 'kind'], keep='first')
+    kind = values['kind'].astype(str).astype('category').cat.remove_unused_categories()
+
+    index = pd.MultiIndex.from_arrays([values['primary_drugbank_id'].astype(str).to_numpy(), kind], names=['primary_drugbank_id', 'kind'])
+    wide = pd.Series(values['value'].to_numpy(dtype=object), index=index).unstack('kind')
+    wide.columns = pd.Index(wide.columns.astype(str), name=None)
+
+    for column in wide.columns:
+        typed = _typed_values(wide[column])
+        if typed is not None:
+            wide[column] = typed
+    return wide
+
+
+# Main table with the keyed property and pathway tables joined on, i.e. the
+# merged table stage 6 featurizes (main columns, property kinds, pathway summary)
+def read_merged_drug_table(folder):
+    main_df = read_table("main_database", folder)
+    # Drop molecular_weight column
+    if 'molecular_weight' in main_df.columns:
+        main_df = main_df.drop(columns=['molecular_weight'])
+
+    properties = read_table(PROPERTY_TABLE, folder)
+    merged = main_df.merge(properties, how="left", on="primary_drugbank_id")
+    return merged.merge(read_table(PATHWAY_SUMMARY_TABLE, folder), how="left", on="primary_drugbank_id")
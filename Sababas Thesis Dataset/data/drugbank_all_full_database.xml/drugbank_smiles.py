@@ -0,0 +1,147 @@
+import hashlib
+import os
+import re
+import zlib
+
+import numpy as np
+import pandas as pd
+
+# File (inside the table folder) holding the packed SMILES fingerprints of stage 6
+SMILES_FINGERPRINT_FILE = "smiles_fingerprints.npz"
+
+# Bits per fingerprint and token n-gram sizes hashed into it
+FINGERPRINT_BITS = 1024
+FINGERPRINT_NGRAMS = (1, 2, 3)
+
+# One SMILES token per match, in a single left to right pass: bracket atoms
+# ([nH], [Na+], [C@@H]), two-letter organic atoms (Cl, Br) before one-letter
+# ones, aromatic atoms, ring closures (%12 or one digit), branches, bonds and
+# dots. Anything else (e.g. stray spaces) is a one character token of its own.
+SMILES_TOKEN_PATTERN = re.compile(r"(\[[^\]]*\])|(Cl|Br|[BCNOPSFI])|([bcnops])|(%\d\d|\d)|([()])|([-=#$:/\\.~])|(.)")
+BRACKET, ALIPHATIC, AROMATIC, RING, BRANCH, BOND, OTHER = range(1, 8)
+
+# Element symbol of a bracket atom: optional isotope, then the symbol; aromatic
+# symbols are lowercase (c, n, se, as)
+BRACKET_ELEMENT_PATTERN = re.compile(r"\[\d*([A-Z][a-z]?|[a-z][a-z]?|\*)")
+AROMATIC_BRACKET_SYMBOLS = {"b", "c", "n", "o", "p", "s", "se", "as", "te"}
+
+# Count columns of smiles_feature_columns
+SMILES_COUNT_COLUMNS = [
+    "smiles_length", "smiles_num_atoms", "smiles_num_heavy_atoms", "smiles_num_branches",
+    "smiles_num_rings", "smiles_num_aromatic",
+]
+
+
+def tokenize_smiles(smiles):
+    return [match.group() for match in SMILES_TOKEN_PATTERN.finditer(smiles)]
+
+
+# Structural counts of one SMILES string:
+#  - atoms: organic subset, aromatic and bracket atoms (explicit hydrogens in
+#    brackets, [H] or [2H], are atoms but not heavy atoms)
+#  - branches: opened branches "("
+#  - rings: ring closure bonds, i.e. pairs of matching ring closure labels
+#  - aromatic: aromatic atoms (c, n, [nH], [se], ...); the c of Cl or the n of
+#    [Na+] are not
+def smiles_counts(smiles):
+    atoms = heavy = branches = ring_labels = aromatic = 0
+    for match in SMILES_TOKEN_PATTERN.finditer(smiles):
+        kind = match.lastindex
+        if kind == ALIPHATIC:
+            atoms += 1
+            heavy += 1
+        elif kind == AROMATIC:
+            atoms += 1
+            heavy += 1
+            aromatic += 1
+        elif kind == BRACKET:
+            atoms += 1
+            element = BRACKET_ELEMENT_PATTERN.match(match.group())
+            symbol = element.group(1) if element else ""
+            if symbol != "H":
+                heavy += 1
+            if symbol in AROMATIC_BRACKET_SYMBOLS:
+                aromatic += 1
+        elif kind == RING:
+            ring_labels += 1
+        elif kind == BRANCH and match.group() == "(":
+            branches += 1
+    return len(smiles), atoms, heavy, branches, ring_labels // 2, aromatic
+
+
+# Counts of a whole column as a DataFrame (one column per SMILES_COUNT_COLUMNS,
+# zeros for missing values); every distinct string is tokenized once
+def smiles_feature_columns(values):
+    codes, distinct = pd.factorize(values)
+    counts = np.array([smiles_counts(smiles) if isinstance(smiles, str) else (0,) * 6 for smiles in distinct],
+                      dtype=np.int32).reshape(-1, len(SMILES_COUNT_COLUMNS))
+    counts = np.vstack([counts, np.zeros((1, len(SMILES_COUNT_COLUMNS)), dtype=np.int32)])
+    # codes of missing values are -1, i.e. the row of zeros added last
+    return pd.DataFrame(counts[codes], columns=SMILES_COUNT_COLUMNS, index=values.index)
+
+
+# Stable 64-bit id of a SMILES string (first 8 bytes of its SHA-256, as a
+# signed int64); collisions need about 4 billion distinct strings
+def smiles_hash(smiles):
+    if pd.isna(smiles):
+        return None
+    return int.from_bytes(hashlib.sha256(smiles.encode()).digest()[:8], "big", signed=True)
+
+
+# smiles_hash of a whole column, nullable Int64; each distinct string is hashed once
+def smiles_hash_column(values):
+    codes, distinct = pd.factorize(values)
+    hashes = pd.array([smiles_hash(smiles) for smiles in distinct] + [None], dtype="Int64")
+    return pd.Series(hashes[codes], index=values.index)
+
+
+# Bit positions set by the token n-grams of one SMILES string
+def _fingerprint_bits(smiles, n_bits, ngrams, cache):
+    tokens = tokenize_smiles(smiles)
+    bits = set()
+    for n in ngrams:
+        for start in range(len(tokens) - n + 1):
+            gram = " ".join(tokens[start:start + n])
+            bit = cache.get(gram)
+            if bit is None:
+                bit = cache[gram] = zlib.crc32(gram.encode()) % n_bits
+            bits.add(bit)
+    return bits
+
+
+# Hashed token n-gram fingerprints of a SMILES column in one batched call:
+# every n-gram of 1 to 3 tokens ("c", "c c", "C ( =") sets bit crc32(n-gram) %
+# n_bits. Returns a (rows, n_bits / 8) uint8 matrix packed like
+# numpy.packbits(axis=1), all zero for missing values; np.unpackbits(matrix,
+# axis=1) gives the 0/1 features. Distinct strings are fingerprinted once.
+def smiles_fingerprints(values, n_bits=FINGERPRINT_BITS, ngrams=FINGERPRINT_NGRAMS):
+    if n_bits % 8:
+        raise ValueError("n_bits must be a multiple of 8")
+    codes, distinct = pd.factorize(values)
+    cache = {}
+    rows, bits = [], []
+    for row, smiles in enumerate(distinct):
+        if isinstance(smiles, str):
+            positions = _fingerprint_bits(smiles, n_bits, ngrams, cache)
+            rows.extend([row] * len(positions))
+            bits.extend(positions)
+
+    # Bits are OR-ed straight into the packed bytes, no dense 0/1 matrix
+    packed = np.zeros((len(distinct) + 1, n_bits // 8), dtype=np.uint8)
+    rows, bits = np.asarray(rows, dtype=np.intp), np.asarray(bits, dtype=np.intp)
+    np.bitwise_or.at(packed, (rows, bits >> 3), (0x80 >> (bits & 7)).astype(np.uint8))
+    return packed[codes]
+
+
+# Write the packed fingerprints with their row ids and bit count
+def save_fingerprints(packed, drug_ids, folder, n_bits=FINGERPRINT_BITS):
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, SMILES_FINGERPRINT_FILE)
+    np.savez_compressed(path, fingerprints=packed, drug_ids=np.asarray(drug_ids, dtype=str), n_bits=n_bits)
+    return path
+
+
+# Load fingerprints written by save_fingerprints as (packed matrix, drug ids)
+def load_fingerprints(folder):
+    with np.load(os.path.join(folder, SMILES_FINGERPRINT_FILE)) as store:
+        return store["fingerprints"], store["drug_ids"]
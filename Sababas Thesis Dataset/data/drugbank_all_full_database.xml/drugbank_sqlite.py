@@ -0,0 +1,284 @@
+import csv
+import math
+import os
+import sqlite3
+import sys
+
+from drugbank_profiling import section, start_stage
+from drugbank_storage import STORAGE_FORMAT, read_table, table_path
+
+# File name of the store (in the cleaned folder)
+SQLITE_FILE = 'drugbank.sqlite'
+
+# Normalized schema. Every drug, with its own record or only known as an
+# interaction partner (has_record = 0), has one row in drugs and the other
+# tables refer to it by its integer drug_id. Property kinds, categories and
+# pathways are stored once and linked to the drugs through join tables. The
+# drugs table gets the columns of main_database (see _create_drugs).
+SCHEMA = [
+    'CREATE TABLE interactions ('
+    ' drug_id INTEGER NOT NULL REFERENCES drugs (drug_id),'
+    ' partner_id INTEGER NOT NULL REFERENCES drugs (drug_id),'
+    ' description TEXT)',
+    'CREATE TABLE property_kinds (kind_id INTEGER PRIMARY KEY, kind TEXT UNIQUE)',
+    'CREATE TABLE properties ('
+    ' drug_id INTEGER NOT NULL REFERENCES drugs (drug_id),'
+    ' kind_id INTEGER REFERENCES property_kinds (kind_id),'
+    ' value TEXT, value_number REAL, source TEXT)',
+    'CREATE TABLE categories (category_id INTEGER PRIMARY KEY, category TEXT, mesh_id TEXT)',
+    'CREATE TABLE drug_categories ('
+    ' drug_id INTEGER NOT NULL REFERENCES drugs (drug_id),'
+    ' category_id INTEGER NOT NULL REFERENCES categories (category_id),'
+    ' PRIMARY KEY (drug_id, category_id)) WITHOUT ROWID',
+    'CREATE TABLE pathways (pathway_id INTEGER PRIMARY KEY, smpdb_id TEXT, name TEXT, category TEXT, enzymes TEXT)',
+    'CREATE TABLE drug_pathways ('
+    ' drug_id INTEGER NOT NULL REFERENCES drugs (drug_id),'
+    ' pathway_id INTEGER NOT NULL REFERENCES pathways (pathway_id),'
+    ' PRIMARY KEY (drug_id, pathway_id)) WITHOUT ROWID',
+]
+
+# Point lookups go through these indexes (drugs.primary_drugbank_id is UNIQUE,
+# so it has one already)
+SQL_INDEXES = [
+    ('interactions', ['drug_id', 'partner_id']),
+    ('interactions', ['partner_id']),
+    ('properties', ['drug_id']),
+    ('properties', ['kind_id']),
+    ('drug_categories', ['category_id']),
+    ('drug_pathways', ['pathway_id']),
+    ('pathways', ['smpdb_id']),
+]
+
+# Columns of main_database stored as numbers
+REAL_DRUG_COLUMNS = ['molecular_weight']
+
+# Rows handed to executemany at a time
+INSERT_BATCH_SIZE = 50000
+
+
+# Column names like 'half-life' are stored as 'half_life'
+def sql_column(column):
+    return column.replace('-', '_')
+
+
+# Value of a cell as a finite float, or None when it is not a number
+def _number(value):
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+# Yield the header and then the rows of a pipeline table, empty cells as NULL
+def _iter_table_rows(table_name, folder):
+    if STORAGE_FORMAT == 'csv':
+        with open(table_path(table_name, folder), newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            yield next(reader)
+            for row in reader:
+                yield [value if value != '' else None for value in row]
+        return
+
+    df = read_table(table_name, folder, dtype=str)
+    yield list(df.columns)
+    for row in df.itertuples(index=False, name=None):
+        yield [value if isinstance(value, str) else None for value in row]
+
+
+# Rows of a pipeline table as dicts
+def _iter_table_records(table_name, folder):
+    rows = _iter_table_rows(table_name, folder)
+    columns = next(rows)
+    for row in rows:
+        yield dict(zip(columns, row))
+
+
+def _insert_rows(conn, statement, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= INSERT_BATCH_SIZE:
+            conn.executemany(statement, batch)
+            batch = []
+    if batch:
+        conn.executemany(statement, batch)
+
+
+# Integer ids of the values of a lookup table (drugs, property kinds,
+# categories, pathways): known values map to their id, new ones get the next
+# id and are queued for insertion with `insert`
+class _IdTable:
+    def __init__(self, conn, statement):
+        self.conn = conn
+        self.statement = statement
+        self.ids = {}
+        self._pending = []
+
+    def id_of(self, key, row=None):
+        row_id = self.ids.get(key)
+        if row_id is None:
+            row_id = self.ids[key] = len(self.ids) + 1
+            self._pending.append((row_id,) + (row if row is not None else key))
+        return row_id
+
+    def flush(self):
+        if self._pending:
+            self.conn.executemany(self.statement, self._pending)
+            self._pending = []
+
+
+# drugs table with one column per main_database column (typed), loaded from it
+def _create_drugs(conn, folder):
+    rows = _iter_table_rows('main_database', folder)
+    columns = next(rows)
+    other_columns = [column for column in columns if column != 'primary_drugbank_id']
+    definitions = [
+        'drug_id INTEGER PRIMARY KEY', 'primary_drugbank_id TEXT NOT NULL UNIQUE', 'has_record INTEGER NOT NULL'
+    ] + [f'"{sql_column(column)}" {"REAL" if column in REAL_DRUG_COLUMNS else "TEXT"}' for column in other_columns]
+    conn.execute(f'CREATE TABLE drugs ({", ".join(definitions)})')
+
+    id_position = columns.index('primary_drugbank_id')
+    positions = [columns.index(column) for column in other_columns]
+    real = [column in REAL_DRUG_COLUMNS for column in other_columns]
+    drug_ids = {}
+
+    def records():
+        for row in rows:
+            drug_ids[row[id_position]] = drug_id = len(drug_ids) + 1
+            values = [_number(row[i]) if is_real else row[i] for i, is_real in zip(positions, real)]
+            yield [drug_id, row[id_position], 1] + values
+
+    placeholders = ', '.join('?' for _ in range(len(other_columns) + 3))
+    _insert_rows(conn, f'INSERT INTO drugs VALUES ({placeholders})', records())
+
+    # Drugs met later without a record of their own (interaction partners)
+    drugs = _IdTable(conn, 'INSERT INTO drugs (drug_id, primary_drugbank_id, name, has_record) VALUES (?, ?, ?, 0)')
+    drugs.ids = drug_ids
+    return drugs
+
+
+# Build the SQLite store from the tables of `folder`, bulk loaded in a single
+# transaction, indexes created afterwards. Raises ValueError if the loaded
+# rows break a foreign key.
+def build_database(db_path, folder='drug_data_cleaned'):
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute('PRAGMA journal_mode = OFF')
+        conn.execute('PRAGMA synchronous = OFF')
+        with conn:
+            drugs = _create_drugs(conn, folder)
+            for statement in SCHEMA:
+                conn.execute(statement)
+            kinds = _IdTable(conn, 'INSERT INTO property_kinds VALUES (?, ?)')
+            categories = _IdTable(conn, 'INSERT INTO categories VALUES (?, ?, ?)')
+            pathways = _IdTable(conn, 'INSERT INTO pathways VALUES (?, ?, ?, ?, ?)')
+
+            def drug_id(drugbank_id, name=None):
+                return drugs.id_of(drugbank_id, (drugbank_id, name))
+
+            _insert_rows(conn, 'INSERT INTO interactions VALUES (?, ?, ?)', (
+                (drug_id(row['primary_drugbank_id']), drug_id(row['drugbank_id'], row['name']), row['description'])
+                for row in _iter_table_records('drug_interactions', folder)
+            ))
+            _insert_rows(conn, 'INSERT INTO properties VALUES (?, ?, ?, ?, ?)', (
+                (drug_id(row['primary_drugbank_id']), None if row['kind'] is None else kinds.id_of((row['kind'],)),
+                 row['value'], _number(row['value']), row['source'])
+                for row in _iter_table_records('experimental_properties', folder)
+            ))
+            _insert_rows(conn, 'INSERT OR IGNORE INTO drug_categories VALUES (?, ?)', (
+                (drug_id(row['primary_drugbank_id']), categories.id_of((row['category'], row['mesh_id'])))
+                for row in _iter_table_records('drug_categories', folder)
+            ))
+            _insert_rows(conn, 'INSERT OR IGNORE INTO drug_pathways VALUES (?, ?)', (
+                (drug_id(row['primary_drugbank_id']), pathways.id_of((
+                    row['pathway_smpdb_id'], row['pathway_name'], row['pathway_category'], row['pathway_enzymes']
+                )))
+                for row in _iter_table_records('pathways', folder)
+            ))
+            for table in (drugs, kinds, categories, pathways):
+                table.flush()
+
+            for sql_table, columns in SQL_INDEXES:
+                conn.execute(f'CREATE INDEX idx_{sql_table}_{"_".join(columns)} ON {sql_table} ({", ".join(columns)})')
+
+            violations = conn.execute('PRAGMA foreign_key_check').fetchall()
+            if violations:
+                raise ValueError(f'{len(violations)} rows break a foreign key, first: {violations[0]}')
+        conn.execute('ANALYZE')
+    finally:
+        conn.close()
+    return db_path
+
+
+# Open the store for lookups; rows come back as sqlite3.Row (dict-like)
+def connect(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA foreign_keys = ON')
+    return conn
+
+
+def get_drug(conn, drugbank_id):
+    return conn.execute('SELECT * FROM drugs WHERE primary_drugbank_id = ?', (drugbank_id,)).fetchone()
+
+
+INTERACTION_COLUMNS = (
+    'SELECT drug.primary_drugbank_id, partner.primary_drugbank_id AS drugbank_id, partner.name, i.description '
+    'FROM interactions i JOIN drugs drug ON drug.drug_id = i.drug_id JOIN drugs partner ON partner.drug_id = i.partner_id '
+)
+
+
+# All interactions listed under a drug's own record
+def get_interactions(conn, drugbank_id):
+    return conn.execute(INTERACTION_COLUMNS + 'WHERE drug.primary_drugbank_id = ?', (drugbank_id,)).fetchall()
+
+
+# Interaction between two drugs, looked up from either side
+def get_interaction(conn, drugbank_id, other_drugbank_id):
+    return conn.execute(
+        INTERACTION_COLUMNS + 'WHERE drug.primary_drugbank_id = ? AND partner.primary_drugbank_id = ? '
+        'UNION ALL ' +
+        INTERACTION_COLUMNS + 'WHERE drug.primary_drugbank_id = ? AND partner.primary_drugbank_id = ?',
+        (drugbank_id, other_drugbank_id, other_drugbank_id, drugbank_id)
+    ).fetchall()
+
+
+def get_categories(conn, drugbank_id):
+    return conn.execute(
+        'SELECT c.category, c.mesh_id FROM drugs d JOIN drug_categories dc ON dc.drug_id = d.drug_id '
+        'JOIN categories c ON c.category_id = dc.category_id WHERE d.primary_drugbank_id = ?', (drugbank_id,)
+    ).fetchall()
+
+
+# Properties of a drug; value_number is the value as a number where it is one
+def get_properties(conn, drugbank_id):
+    return conn.execute(
+        'SELECT k.kind, p.value, p.value_number, p.source FROM drugs d JOIN properties p ON p.drug_id = d.drug_id '
+        'LEFT JOIN property_kinds k ON k.kind_id = p.kind_id WHERE d.primary_drugbank_id = ?', (drugbank_id,)
+    ).fetchall()
+
+
+def get_pathways(conn, drugbank_id):
+    return conn.execute(
+        'SELECT p.smpdb_id AS pathway_smpdb_id, p.name AS pathway_name, p.category AS pathway_category, '
+        'p.enzymes AS pathway_enzymes FROM drugs d JOIN drug_pathways dp ON dp.drug_id = d.drug_id '
+        'JOIN pathways p ON p.pathway_id = dp.pathway_id WHERE d.primary_drugbank_id = ?', (drugbank_id,)
+    ).fetchall()
+
+
+if __name__ == '__main__':
+    db_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join('drug_data_cleaned', SQLITE_FILE)
+    start_stage('sqlite')
+    with section('build_database'):
+        build_database(db_path)
+    print(f'✅ SQLite store written to {db_path}')
+
+    conn = connect(db_path)
+    example = conn.execute('SELECT primary_drugbank_id FROM drugs WHERE has_record = 1 LIMIT 1').fetchone()
+    if example is not None:
+        interactions = get_interactions(conn, example['primary_drugbank_id'])
+        print(f"{example['primary_drugbank_id']} has {len(interactions)} listed interactions")
+    conn.close()
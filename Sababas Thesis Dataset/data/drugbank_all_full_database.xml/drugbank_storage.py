@@ -0,0 +1,419 @@
+import csv
+import os
+import shutil
+
+import pandas as pd
+
+# Storage format of the pipeline tables: 'csv', 'parquet' or 'arrow' (Arrow IPC, read memory mapped).
+# Set DRUGBANK_STORAGE_FORMAT before running the stages to switch every stage at once.
+STORAGE_FORMAT = os.environ.get('DRUGBANK_STORAGE_FORMAT', 'csv')
+EXTENSIONS = {'csv': '.csv', 'parquet': '.parquet', 'arrow': '.arrow'}
+
+# Column roles shared by all tables of the pipeline:
+#  - 'id': DrugBank IDs, stored dictionary encoded and loaded as pandas categoricals
+#  - 'category': short repeated labels, same treatment as IDs
+#  - 'text': long free text, dictionary encoded in Parquet, loaded as plain strings
+# Columns without a role keep the type pandas/Arrow gives them.
+COLUMN_ROLES = {
+    'primary_drugbank_id': 'id',
+    'drugbank_id': 'id',
+
+    'type': 'category',
+    'state': 'category',
+    'groups': 'category',
+    'classification_direct-parent': 'category',
+    'classification_kingdom': 'category',
+    'classification_superclass': 'category',
+    'classification_class': 'category',
+    'classification_subclass': 'category',
+    'affected_organisms': 'category',
+    'kind': 'category',
+    'source': 'category',
+    'category': 'category',
+    'mesh_id': 'category',
+    'pathway_smpdb_id': 'category',
+    'pathway_name': 'category',
+    'pathway_category': 'category',
+    'interaction_template': 'category',
+
+    'name': 'text',
+    'description': 'text',
+    'synthesis-reference': 'text',
+    'indication': 'text',
+    'pharmacodynamics': 'text',
+    'mechanism-of-action': 'text',
+    'toxicity': 'text',
+    'metabolism': 'text',
+    'absorption': 'text',
+    'half-life': 'text',
+    'protein-binding': 'text',
+    'route-of-elimination': 'text',
+    'volume-of-distribution': 'text',
+    'clearance': 'text',
+    'classification_description': 'text',
+    'food_interactions': 'text',
+    'sequence': 'text',
+    'value': 'text',
+    'pathway_enzymes': 'text',
+}
+
+# Rows buffered by TableWriter before a record batch is written
+WRITE_BATCH_SIZE = 10000
+
+
+def _check_format(fmt):
+    fmt = fmt or STORAGE_FORMAT
+    if fmt not in EXTENSIONS:
+        raise ValueError(f"Unknown storage format '{fmt}', expected one of {sorted(EXTENSIONS)}")
+    return fmt
+
+
+# Path of a table in the given folder and storage format
+def table_path(name, folder, fmt=None):
+    return os.path.join(folder, name + EXTENSIONS[_check_format(fmt)])
+
+
+def table_exists(name, folder, fmt=None):
+    return os.path.exists(table_path(name, folder, fmt))
+
+
+# Arrow type of a column given its role; columns of unknown role are strings
+def _arrow_type(column, fmt):
+    import pyarrow as pa
+
+    role = COLUMN_ROLES.get(column)
+    if role in ('id', 'category'):
+        return pa.dictionary(pa.int32(), pa.string())
+    if role == 'text' and fmt == 'arrow':
+        return pa.large_string()
+    return pa.string()
+
+
+# Explicit Arrow schema of a table written row by row (all values are strings)
+def arrow_schema(fieldnames, fmt=None):
+    import pyarrow as pa
+
+    fmt = _check_format(fmt)
+    return pa.schema([(column, _arrow_type(column, fmt)) for column in fieldnames])
+
+
+# Columns Parquet should dictionary encode
+def _dictionary_columns(columns):
+    return [column for column in columns if column in COLUMN_ROLES]
+
+
+# Convert mixed object columns (e.g. property values that pandas read partly as
+# floats) to strings so Arrow gets a single type per column
+def _prepare_frame(df):
+    df = df.copy()
+    for column in df.columns:
+        role = COLUMN_ROLES.get(column)
+        if role in ('id', 'category'):
+            df[column] = df[column].astype('category')
+        elif df[column].dtype == object:
+            values = df[column]
+            df[column] = values.where(values.isna(), values.astype(str))
+    return df
+
+
+# Write a DataFrame as a table in the configured storage format
+def write_table(df, name, folder, fmt=None):
+    fmt = _check_format(fmt)
+    path = table_path(name, folder, fmt)
+    if fmt == 'csv':
+        df.to_csv(path, index=False)
+        return path
+
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(_prepare_frame(df), preserve_index=False)
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+
+        pq.write_table(table, path, use_dictionary=_dictionary_columns(table.column_names), compression='zstd')
+    else:
+        table = table.cast(pa.schema([
+            field.with_type(pa.large_string()) if COLUMN_ROLES.get(field.name) == 'text' else field
+            for field in table.schema
+        ]))
+        with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    return path
+
+
+# Load a table in the configured storage format.
+# dtype=str loads every column as plain strings, like pd.read_csv(dtype=str).
+def read_table(name, folder, columns=None, dtype=None, fmt=None):
+    fmt = _check_format(fmt)
+    path = table_path(name, folder, fmt)
+    if fmt == 'csv':
+        return pd.read_csv(path, usecols=columns, dtype=dtype, low_memory=False)
+
+    import pyarrow as pa
+
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(path, columns=columns)
+    else:
+        with pa.memory_map(path) as source:
+            table = pa.ipc.open_file(source).read_all()
+        if columns is not None:
+            table = table.select(columns)
+
+    return _to_frame(table, dtype)
+
+
+# pandas version of an Arrow table read from Parquet/Arrow storage, typed like read_table
+def _to_frame(table, dtype=None):
+    df = table.to_pandas()
+    for column in df.columns:
+        is_categorical = isinstance(df[column].dtype, pd.CategoricalDtype)
+        if dtype is str or COLUMN_ROLES.get(column) == 'text':
+            if is_categorical:
+                df[column] = df[column].astype(object)
+            if dtype is str:
+                values = df[column]
+                df[column] = values.where(values.isna(), values.astype(str)).astype(object)
+        elif is_categorical:
+            # Arrow dictionaries keep first-seen order; sort them so groupby/pivot
+            # results come out in the same order as with plain string columns
+            df[column] = df[column].cat.reorder_categories(sorted(df[column].cat.categories))
+    return df
+
+
+# Yield a table as DataFrames of at most `chunk_size` rows, typed like
+# read_table, so tables larger than memory can be processed chunk by chunk.
+# CSV is read with pandas' chunksize, Parquet batch by batch and Arrow from
+# the memory map, record batch slice by slice.
+def iter_table_chunks(name, folder, chunk_size, columns=None, dtype=None, fmt=None):
+    fmt = _check_format(fmt)
+    path = table_path(name, folder, fmt)
+    if fmt == 'csv':
+        with pd.read_csv(path, usecols=columns, dtype=dtype, chunksize=chunk_size, low_memory=False) as reader:
+            yield from reader
+        return
+
+    import pyarrow as pa
+
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+            yield _to_frame(pa.Table.from_batches([batch]), dtype)
+        return
+
+    with pa.memory_map(path) as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            if columns is not None:
+                batch = batch.select(columns)
+            for start in range(0, batch.num_rows, chunk_size):
+                yield _to_frame(pa.Table.from_batches([batch.slice(start, chunk_size)]), dtype)
+
+
+# Copy a table between folders without parsing it
+def copy_table(name, source_folder, destination_folder, fmt=None):
+    destination = table_path(name, destination_folder, fmt)
+    shutil.copyfile(table_path(name, source_folder, fmt), destination)
+    return destination
+
+
+# Cell value as written by csv.DictWriter, with empty cells stored as nulls
+def _text_or_none(value):
+    if value is None or value == '' or (isinstance(value, float) and value != value):
+        return None
+    return str(value)
+
+
+# Growing dictionary of one dictionary encoded column. Values keep their index
+# once assigned (Arrow IPC files only accept dictionary deltas); only the values
+# new to a batch are converted and appended to the Arrow dictionary array.
+class _ColumnDictionary:
+    def __init__(self):
+        import pyarrow as pa
+
+        self.index = {}
+        self.values = pa.array([], type=pa.string())
+
+    # Dictionary array of some values (None for nulls) against the dictionary
+    def encode(self, values):
+        import pyarrow as pa
+
+        index = self.index
+        new_values = []
+        indices = []
+        for value in values:
+            if value is not None:
+                i = index.get(value)
+                if i is None:
+                    i = index[value] = len(index)
+                    new_values.append(value)
+                value = i
+            indices.append(value)
+        if new_values:
+            self.values = pa.concat_arrays([self.values, pa.array(new_values, type=pa.string())])
+        return pa.DictionaryArray.from_arrays(pa.array(indices, type=pa.int32()), self.values)
+
+
+# Row-by-row writer for tables produced as dicts (the XML extraction).
+# CSV output goes through csv.DictWriter; Parquet and Arrow output is buffered
+# into record batches following the explicit schema of the columns.
+class TableWriter:
+    def __init__(self, name, folder, fieldnames, fmt=None, write_header=True):
+        self.fmt = _check_format(fmt)
+        self.path = table_path(name, folder, self.fmt)
+        self.fieldnames = list(fieldnames)
+        self._rows = []
+
+        if self.fmt == 'csv':
+            self._file = open(self.path, 'w', newline='', encoding='utf-8')
+            self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames)
+            if write_header:
+                self._writer.writeheader()
+            return
+
+        import pyarrow as pa
+
+        self.schema = arrow_schema(self.fieldnames, self.fmt)
+        # Growing dictionaries of the dictionary encoded columns
+        self._dictionaries = {
+            field.name: _ColumnDictionary() for field in self.schema if pa.types.is_dictionary(field.type)
+        }
+        if self.fmt == 'parquet':
+            import pyarrow.parquet as pq
+
+            self._writer = pq.ParquetWriter(self.path, self.schema, compression='zstd',
+                                            use_dictionary=_dictionary_columns(self.fieldnames))
+        else:
+            self._file = pa.OSFile(self.path, 'wb')
+            self._writer = pa.ipc.new_file(self._file, self.schema,
+                                           options=pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True))
+
+    def writerows(self, rows):
+        if self.fmt == 'csv':
+            self._writer.writerows(rows)
+            return
+        self._rows.extend(rows)
+        if len(self._rows) >= WRITE_BATCH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        import pyarrow as pa
+
+        if not self._rows:
+            return
+        arrays = []
+        for field in self.schema:
+            values = [_text_or_none(row.get(field.name)) for row in self._rows]
+            dictionary = self._dictionaries.get(field.name)
+            if dictionary is None:
+                arrays.append(pa.array(values, type=field.type))
+            else:
+                arrays.append(dictionary.encode(values))
+        self._writer.write_batch(pa.record_batch(arrays, schema=self.schema))
+        self._rows = []
+
+    def close(self):
+        if self.fmt != 'csv':
+            self._flush()
+            self._writer.close()
+        if self.fmt != 'parquet':
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Concatenate tables written by TableWriter (e.g. the shards of a parallel run)
+# into one table, keeping the order of `parts`
+def concat_tables(parts, name, folder, fieldnames, fmt=None):
+    fmt = _check_format(fmt)
+    if fmt == 'csv':
+        # Parts are headerless CSV files
+        with open(table_path(name, folder, fmt), 'w', newline='', encoding='utf-8') as out:
+            csv.DictWriter(out, fieldnames=fieldnames).writeheader()
+            out.flush()
+            for part in parts:
+                with open(table_path(name, part, fmt), 'rb') as f:
+                    shutil.copyfileobj(f, out.buffer)
+        return
+
+    with TableWriter(name, folder, fieldnames, fmt) as writer:
+        for part in parts:
+            writer.writerows(read_table(name, part, dtype=str, fmt=fmt).to_dict('records'))
+
+
+# Chunk-by-chunk writer for DataFrames (the out-of-core counterpart of
+# write_table). CSV chunks are appended with a single header. For Parquet and
+# Arrow the schema is fixed by the first chunk; ID/category columns keep one
+# growing dictionary per column, so the dictionaries of later chunks are
+# deltas of the earlier ones as Arrow IPC files require.
+class TableAppender:
+    def __init__(self, name, folder, fmt=None):
+        self.fmt = _check_format(fmt)
+        self.path = table_path(name, folder, self.fmt)
+        self.schema = None
+        self._writer = None
+        self._file = None
+        self._dictionaries = {}
+
+    def append(self, df):
+        if self.fmt == 'csv':
+            header = self._file is None
+            if header:
+                self._file = open(self.path, 'w', newline='', encoding='utf-8')
+            df.to_csv(self._file, header=header, index=False)
+            return
+
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(_prepare_frame(df), preserve_index=False)
+        if self.schema is None:
+            self._open(table)
+        arrays = []
+        for field in self.schema:
+            column = table[field.name]
+            if field.name in self._dictionaries:
+                arrays.append(self._dictionaries[field.name].encode(column.to_pylist()))
+            else:
+                arrays.append(column.cast(field.type))
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def _open(self, table):
+        import pyarrow as pa
+
+        fields = []
+        for field in table.schema:
+            if pa.types.is_dictionary(field.type):
+                field = field.with_type(pa.dictionary(pa.int32(), pa.string()))
+                self._dictionaries[field.name] = _ColumnDictionary()
+            elif COLUMN_ROLES.get(field.name) == 'text' and self.fmt == 'arrow':
+                field = field.with_type(pa.large_string())
+            fields.append(field)
+        self.schema = pa.schema(fields)
+        if self.fmt == 'parquet':
+            import pyarrow.parquet as pq
+
+            self._writer = pq.ParquetWriter(self.path, self.schema, compression='zstd',
+                                            use_dictionary=_dictionary_columns(self.schema.names))
+        else:
+            self._file = pa.OSFile(self.path, 'wb')
+            self._writer = pa.ipc.new_file(self._file, self.schema,
+                                           options=pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._file is not None:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
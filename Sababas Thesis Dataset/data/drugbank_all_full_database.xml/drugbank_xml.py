@@ -0,0 +1,270 @@
+import csv
+import hashlib
+import html
+import io
+import mmap
+import os
+import re
+import xml.etree.ElementTree as ET
+
+# DrugBank XML namespace and the tag of a drug record
+DRUGBANK_NS = '{http://www.drugbank.ca}'
+DRUG_TAG = f'{DRUGBANK_NS}drug'
+
+# Raw opening/closing <drug> tags; <drugbank>, <drugs>, <drug-interaction> etc. do not match.
+# Group 1 is set for self-closing tags.
+DRUG_TAG_PATTERN = re.compile(rb'<drug(?=[\s>/])[^>]*?(/?)>|</drug\s*>')
+
+# Primary DrugBank ID of a raw drug record; nested pathway references carry no primary flag
+PRIMARY_ID_PATTERN = re.compile(rb'<drugbank-id\s+primary=["\']true["\']\s*>\s*([^<\s]+)\s*</drugbank-id>')
+
+
+# Yield the direct <drug> children of the root element parsed from a binary stream
+def _iter_top_level_drugs(source):
+    root = None
+    depth = 0
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = elem
+            depth += 1
+            continue
+
+        depth -= 1
+        # Only direct children of <drugbank> are real drug records
+        if depth == 1:
+            if elem.tag == DRUG_TAG:
+                yield elem
+            # Drop the finished record (and anything before it) from the tree
+            root.clear()
+
+
+# Stream the top-level <drug> elements of a DrugBank dump one at a time.
+# Each drug is handed out as soon as its closing tag is parsed and is cleared
+# afterwards, so memory stays flat no matter how large the dump is.
+def iter_drugs(xml_file):
+    with open(xml_file, 'rb') as f:
+        yield from _iter_top_level_drugs(f)
+
+
+# Scan the raw dump once and return the (offset, length) in bytes of every
+# top-level <drug> element, in document order. Nested <drug> references under
+# pathways are part of their parent's byte range.
+def scan_drug_offsets(xml_file):
+    offsets = []
+    with open(xml_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        depth = 0
+        start = None
+        for match in DRUG_TAG_PATTERN.finditer(mm):
+            if match.group().startswith(b'</'):
+                depth -= 1
+                if depth == 0:
+                    offsets.append((start, match.end() - start))
+            elif not match.group(1):
+                # A self-closing <drug/> never opens a record
+                if depth == 0:
+                    start = match.start()
+                depth += 1
+    return offsets
+
+
+# Yield (primary_drugbank_id, sha256, offset, length) for every top-level drug.
+# The hash is taken over the raw serialized <drug> subtree, so any change to a
+# record - including its interactions, pathways or properties - changes its hash.
+def hash_drug_records(xml_file, offsets=None):
+    if offsets is None:
+        offsets = scan_drug_offsets(xml_file)
+    with open(xml_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for offset, length in offsets:
+            record = mm[offset:offset + length]
+            match = PRIMARY_ID_PATTERN.search(record)
+            drug_id = match.group(1).decode('utf-8') if match else None
+            yield drug_id, hashlib.sha256(record).hexdigest(), offset, length
+
+
+# Drugs added, changed or removed by the last incremental extraction (stage 1
+# --incremental), one row per drug in the extraction folder
+CHANGES_FILE = 'drug_changes.csv'
+
+
+# The change list of the last incremental extraction as {primary_drugbank_id:
+# 'added' | 'changed' | 'removed'}, or None when the last extraction was a full
+# one (full runs delete the list)
+def read_drug_changes(folder):
+    path = os.path.join(folder, CHANGES_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, newline='', encoding='utf-8') as f:
+        return {row['primary_drugbank_id']: row['change'] for row in csv.DictReader(f)}
+
+
+# Return the opening <drugbank ...> tag of the dump, namespace declarations included
+def read_root_tag(xml_file):
+    with open(xml_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = mm.find(b'<drugbank')
+        end = mm.find(b'>', start)
+        return mm[start:end + 1]
+
+
+# Group consecutive drugs into `n_shards` contiguous byte ranges of similar size.
+# Returns a list of (offset, length) ranges that keep the original drug order.
+def plan_shards(offsets, n_shards):
+    if not offsets:
+        return []
+    total = sum(length for _, length in offsets)
+    target = total / max(n_shards, 1)
+
+    shards = []
+    shard_start, shard_bytes = offsets[0][0], 0
+    for offset, length in offsets:
+        if shard_bytes >= target:
+            shards.append((shard_start, offset - shard_start))
+            shard_start, shard_bytes = offset, 0
+        shard_bytes += length
+    last_offset, last_length = offsets[-1]
+    shards.append((shard_start, last_offset + last_length - shard_start))
+    return shards
+
+
+# Stream the top-level drugs contained in one byte range of the dump.
+# The range is wrapped in the original root tag so namespaces resolve as usual.
+def iter_drug_range(xml_file, offset, length, root_tag=None):
+    if root_tag is None:
+        root_tag = read_root_tag(xml_file)
+    with open(xml_file, 'rb') as f:
+        f.seek(offset)
+        chunk = f.read(length)
+    source = io.BytesIO(root_tag + chunk + b'</drugbank>')
+    yield from _iter_top_level_drugs(source)
+
+
+# ---------------------------------------------------------------------------
+# Per-drug random access
+#
+# A sidecar CSV next to the dump lists the byte range of every top-level drug
+# with its primary ID and name, so single records can be read and parsed
+# without going through the whole file.
+# ---------------------------------------------------------------------------
+
+# Sidecar index of `full database.xml` is `full database.xml.drug_index.csv`
+DRUG_INDEX_SUFFIX = '.drug_index.csv'
+DRUG_INDEX_FIELDNAMES = ['primary_drugbank_id', 'offset', 'length', 'name']
+
+# First <name> of a raw drug record, i.e. the drug's own name (it comes right
+# after the drugbank-id elements, before any nested reference)
+NAME_PATTERN = re.compile(rb'<name\s*>(.*?)</name\s*>|<name\s*/>', re.DOTALL)
+
+
+# Direct <synonyms> block of a raw drug record and the synonyms in it
+SYNONYMS_PATTERN = re.compile(rb'<synonyms\s*>(.*?)</synonyms\s*>', re.DOTALL)
+SYNONYM_PATTERN = re.compile(rb'<synonym\b[^>]*>(.*?)</synonym\s*>', re.DOTALL)
+
+
+def drug_index_path(xml_file):
+    return xml_file + DRUG_INDEX_SUFFIX
+
+
+# Scan the dump once and write its sidecar index; returns the index rows
+def build_drug_index(xml_file, index_file=None):
+    rows = []
+    offsets = scan_drug_offsets(xml_file)
+    with open(xml_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for offset, length in offsets:
+            record = mm[offset:offset + length]
+            drug_id = PRIMARY_ID_PATTERN.search(record)
+            name = NAME_PATTERN.search(record)
+            rows.append({
+                'primary_drugbank_id': drug_id.group(1).decode('utf-8') if drug_id else '',
+                'offset': offset,
+                'length': length,
+                'name': html.unescape(name.group(1).decode('utf-8')) if name and name.group(1) else '',
+            })
+
+    with open(index_file or drug_index_path(xml_file), 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=DRUG_INDEX_FIELDNAMES)
+        writer.writeheader()
+        writer.writerows(rows)
+    return rows
+
+
+# Index rows of the dump, from the sidecar file when it is newer than the dump,
+# otherwise rebuilt (and rewritten) first
+def load_drug_index(xml_file):
+    index_file = drug_index_path(xml_file)
+    if not os.path.exists(index_file) or os.path.getmtime(index_file) < os.path.getmtime(xml_file):
+        return build_drug_index(xml_file, index_file)
+    with open(index_file, newline='', encoding='utf-8') as f:
+        return [dict(row, offset=int(row['offset']), length=int(row['length'])) for row in csv.DictReader(f)]
+
+
+# Yield (primary_drugbank_id, synonym) for every synonym listed by the drugs
+# of the index (rows of build_drug_index/load_drug_index)
+def iter_drug_synonyms(xml_file, index_rows=None):
+    if index_rows is None:
+        index_rows = load_drug_index(xml_file)
+    with open(xml_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for row in index_rows:
+            block = SYNONYMS_PATTERN.search(mm, row['offset'], row['offset'] + row['length'])
+            if block is None:
+                continue
+            for synonym in SYNONYM_PATTERN.findall(block.group(1)):
+                yield row['primary_drugbank_id'], html.unescape(synonym.decode('utf-8')).strip()
+
+
+# Read-only per-drug access to the dump through its sidecar index. The file is
+# memory mapped and a lookup parses only the requested drug's bytes.
+#   with DrugRecords('full database.xml') as records:
+#       drug = records['DB00001']          # ElementTree <drug> element
+#       print(records.raw('DB00001').decode())
+class DrugRecords:
+    def __init__(self, xml_file):
+        self.xml_file = xml_file
+        self.index = {row['primary_drugbank_id']: row for row in load_drug_index(xml_file)}
+        self._file = open(xml_file, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._root_tag = read_root_tag(xml_file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, drug_id):
+        return drug_id in self.index
+
+    def ids(self):
+        return list(self.index)
+
+    def name(self, drug_id):
+        return self.index[drug_id]['name']
+
+    # Raw bytes of one <drug> record as they appear in the dump
+    def raw(self, drug_id):
+        row = self.index[drug_id]
+        return self._mm[row['offset']:row['offset'] + row['length']]
+
+    # Parsed <drug> element; the record is wrapped in the root tag so the
+    # DrugBank namespace resolves like in the full parse
+    def __getitem__(self, drug_id):
+        root = ET.fromstring(self._root_tag + self.raw(drug_id) + b'</drugbank>')
+        return root[0]
+
+
+if __name__ == '__main__':
+    # Print the raw records of some drugs: python drugbank_xml.py DB00001 [DB00002 ...]
+    import sys
+
+    with DrugRecords('full database.xml') as records:
+        for drug_id in sys.argv[1:]:
+            if drug_id in records:
+                print(records.raw(drug_id).decode('utf-8'))
+            else:
+                print(f'❌ {drug_id} is not a top-level drug of the dump')
@@ -0,0 +1,321 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+from drugbank_dataset import DDI_DATASET_FOLDER
+from drugbank_graph import GRAPH_FOLDER
+from drugbank_interactions import INTERACTION_STORE_FILE, TEMPLATE_VOCABULARY_FILE
+from drugbank_multihot import MULTI_HOT_FOLDER
+from drugbank_pathways import PATHWAY_SUMMARY_TABLE
+from drugbank_properties import PROPERTY_TABLE
+from drugbank_smiles import SMILES_FINGERPRINT_FILE
+from drugbank_sqlite import SQLITE_FILE
+from drugbank_storage import STORAGE_FORMAT, table_path
+from drugbank_xml import drug_index_path
+
+XML_FILE = 'full database.xml'
+EXTRACTED_FOLDER = 'drug_data'
+CLEANED_FOLDER = 'drug_data_cleaned'
+FINAL_FOLDER = 'Drugbank_final_database'
+
+# Fingerprints of the last successful run of every stage, and the file hash cache
+STATE_FILE = '.pipeline_state.json'
+# Output of every stage run goes to <LOG_FOLDER>/<stage>.log
+LOG_FOLDER = 'pipeline_logs'
+
+EXTRACTED_TABLES = ['main_database', 'drug_categories', 'drug_interactions', 'experimental_properties', 'pathways']
+
+
+def _tables(names, folder):
+    return [table_path(name, folder) for name in names]
+
+
+# Stages of the pipeline in a valid running order.
+#  - script: run with the current Python from this folder
+#  - inputs: files/folders the stage reads; their contents are part of its fingerprint
+#  - outputs: where the stage's results live once the whole pipeline has run
+#    (stage 4 results are moved to the final folder by stage 6, so running
+#    'interactions' on its own leaves it looking out of date until 'final' ran)
+#  - after: stages that must finish first; a stage re-runs whenever one of them ran
+STAGES = {
+    'extract': {
+        'script': '1_Drugbank_data_parcing.py',
+        'inputs': [XML_FILE],
+        'outputs': _tables(EXTRACTED_TABLES, EXTRACTED_FOLDER),
+        'after': [],
+    },
+    'ids_and_names': {
+        'script': 'XML_to_CSV_Conversion.py',
+        'inputs': [XML_FILE],
+        'outputs': ['drugbank_ids_and_names.csv', 'drugbank_synonyms.csv', drug_index_path(XML_FILE)],
+        'after': [],
+    },
+    'clean': {
+        'script': '2_Drugbank_files_cleaning.py',
+        'inputs': _tables(EXTRACTED_TABLES, EXTRACTED_FOLDER),
+        'outputs': _tables(EXTRACTED_TABLES, CLEANED_FOLDER),
+        'after': ['extract'],
+    },
+    'sqlite': {
+        'script': 'drugbank_sqlite.py',
+        'inputs': _tables(EXTRACTED_TABLES, CLEANED_FOLDER),
+        'outputs': [os.path.join(CLEANED_FOLDER, SQLITE_FILE)],
+        'after': ['clean'],
+    },
+    'properties': {
+        'script': '3_Drugbank_experimental_properties_merge_with_main.py',
+        'inputs': _tables(['experimental_properties', 'main_database'], CLEANED_FOLDER),
+        'outputs': _tables([PROPERTY_TABLE], CLEANED_FOLDER),
+        'after': ['clean'],
+    },
+    'interactions': {
+        'script': '4_Drugbank_feature_extraction_from_drug_interaction_description.py',
+        'inputs': _tables(['drug_interactions', 'main_database'], CLEANED_FOLDER),
+        'outputs': _tables(['drug_interactions_encoded'], FINAL_FOLDER) + [
+            os.path.join(FINAL_FOLDER, INTERACTION_STORE_FILE), os.path.join(FINAL_FOLDER, GRAPH_FOLDER), TEMPLATE_VOCABULARY_FILE
+        ],
+        'after': ['clean'],
+    },
+    'pathways': {
+        'script': '5_Drugbank_pathway_merge_with_main.py',
+        'inputs': _tables(['main_database', 'pathways'], CLEANED_FOLDER),
+        'outputs': _tables([PATHWAY_SUMMARY_TABLE], CLEANED_FOLDER),
+        'after': ['clean'],
+    },
+    'final': {
+        'script': '6_Drugbank_custome_cleaning_and_decoding_with_main_and_move_to_Final.py',
+        'inputs': _tables(['main_database', PROPERTY_TABLE, PATHWAY_SUMMARY_TABLE], CLEANED_FOLDER),
+        'outputs': _tables(['main_database_cleaned_and_encoded'], FINAL_FOLDER) + [os.path.join(FINAL_FOLDER, SMILES_FINGERPRINT_FILE)],
+        'after': ['properties', 'interactions', 'pathways'],
+    },
+    'multi_hot': {
+        'script': '7_Drugbank_multi_hot_features.py',
+        'inputs': _tables(['main_database', 'drug_categories', PATHWAY_SUMMARY_TABLE], CLEANED_FOLDER),
+        'outputs': [os.path.join(FINAL_FOLDER, MULTI_HOT_FOLDER)],
+        'after': ['clean', 'pathways'],
+    },
+    'ddi_dataset': {
+        'script': '8_Drugbank_ddi_dataset.py',
+        'inputs': _tables(['main_database_cleaned_and_encoded'], FINAL_FOLDER) + [os.path.join(FINAL_FOLDER, INTERACTION_STORE_FILE)],
+        'outputs': [os.path.join(FINAL_FOLDER, DDI_DATASET_FOLDER)],
+        'after': ['final'],
+    },
+}
+
+# Stages that take --workers
+PARALLEL_STAGES = ['extract', 'final']
+# Stages that can process their input in --chunk-size row chunks
+CHUNKED_STAGES = ['interactions']
+
+LOCAL_IMPORT_PATTERN = re.compile(r'^\s*(?:from|import)\s+(drugbank_\w+)', re.MULTILINE)
+
+
+def load_state():
+    if not os.path.exists(STATE_FILE):
+        return {'stages': {}, 'files': {}}
+    with open(STATE_FILE, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_state(state):
+    with open(STATE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+
+
+# sha256 of a file, cached on (size, mtime) so unchanged inputs are not re-read
+def file_hash(path, cache):
+    stat = os.stat(path)
+    key = f'{stat.st_size}:{stat.st_mtime_ns}'
+    cached = cache.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    cache[path] = [key, digest.hexdigest()]
+    return cache[path][1]
+
+
+# Hash of a file or of every file below a folder; None when it does not exist
+def path_hash(path, cache):
+    if os.path.isfile(path):
+        return file_hash(path, cache)
+    if not os.path.isdir(path):
+        return None
+    digest = hashlib.sha256()
+    for folder, _, files in sorted(os.walk(path)):
+        for name in sorted(files):
+            file_path = os.path.join(folder, name)
+            digest.update(os.path.relpath(file_path, path).encode('utf-8'))
+            digest.update(file_hash(file_path, cache).encode('ascii'))
+    return digest.hexdigest()
+
+
+# The stage script and the drugbank_* modules it imports, recursively
+def code_files(script):
+    files, pending = [], [script]
+    while pending:
+        path = pending.pop()
+        if path in files or not os.path.exists(path):
+            continue
+        files.append(path)
+        with open(path, encoding='utf-8') as f:
+            pending.extend(f'{module}.py' for module in LOCAL_IMPORT_PATTERN.findall(f.read()))
+    return sorted(files)
+
+
+# Fingerprint of a stage: its code, arguments, storage format and input contents
+def stage_fingerprint(name, args, cache):
+    stage = STAGES[name]
+    parts = {
+        'args': args,
+        'storage_format': STORAGE_FORMAT,
+        'code': {path: file_hash(path, cache) for path in code_files(stage['script'])},
+        'inputs': {path: path_hash(path, cache) for path in stage['inputs']},
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+# Requested stages plus every stage they run after
+def with_dependencies(targets):
+    selected = set()
+    pending = list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in selected:
+            selected.add(name)
+            pending.extend(STAGES[name]['after'])
+    return [name for name in STAGES if name in selected]
+
+
+def stage_args(name, workers, chunk_size=None):
+    args = ['--workers', str(workers)] if name in PARALLEL_STAGES and workers > 1 else []
+    if name in CHUNKED_STAGES and chunk_size:
+        args += ['--chunk-size', str(chunk_size)]
+    return args
+
+
+def start_stage(name, args, env=None):
+    os.makedirs(LOG_FOLDER, exist_ok=True)
+    log = open(os.path.join(LOG_FOLDER, f'{name}.log'), 'w', encoding='utf-8')
+    process = subprocess.Popen([sys.executable, STAGES[name]['script']] + args, stdout=log, stderr=subprocess.STDOUT, env=env)
+    log.close()
+    return process
+
+
+# Wait for any running stage. Returns (name, exit code, peak RSS in MB or None).
+# os.wait4 reports the peak RSS of the finished process itself; where it is not
+# available (Windows) the stages are polled and memory is not reported.
+def wait_any(running):
+    if hasattr(os, 'wait4'):
+        while True:
+            pid, status, usage = os.wait4(-1, 0)
+            for name, (process, _, _) in running.items():
+                if process.pid == pid:
+                    process.returncode = os.waitstatus_to_exitcode(status)
+                    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+                    scale = 1 if sys.platform == 'darwin' else 1024
+                    return name, process.returncode, usage.ru_maxrss * scale / 1e6
+    while True:
+        for name, (process, _, _) in running.items():
+            if process.poll() is not None:
+                return name, process.returncode, None
+        time.sleep(0.2)
+
+
+# Run the selected stages: up to `jobs` at a time, each as soon as the stages
+# it runs after have finished. A stage is skipped when its fingerprint matches
+# the last successful run, its outputs exist and none of its upstream stages ran.
+# With `profile_folder` every stage that runs writes its JSON profiling report
+# there (see drugbank_profiling) and the runner adds pipeline.json.
+def run_pipeline(targets=None, jobs=2, workers=1, force=False, dry_run=False, profile_folder=None, profiler='',
+                 chunk_size=None):
+    env = None
+    if profile_folder:
+        env = dict(os.environ, DRUGBANK_PROFILE_DIR=os.path.abspath(profile_folder), DRUGBANK_PROFILER=profiler)
+    state = load_state()
+    selected = with_dependencies(targets or list(STAGES))
+    pending = list(selected)
+    running = {}
+    finished, ran = set(), set()
+    report = []
+
+    while pending or running:
+        for name in list(pending):
+            stage = STAGES[name]
+            if len(running) >= jobs or not all(dep in finished or dep not in selected for dep in stage['after']):
+                continue
+            pending.remove(name)
+            args = stage_args(name, workers, chunk_size)
+            fingerprint = stage_fingerprint(name, args, state['files'])
+            up_to_date = (
+                not force
+                and state['stages'].get(name) == fingerprint
+                and all(os.path.exists(path) for path in stage['outputs'])
+                and not any(dep in ran for dep in stage['after'])
+            )
+            if up_to_date:
+                print(f'⏭️  {name}: up to date')
+                finished.add(name)
+                report.append({'stage': name, 'status': 'skipped'})
+                continue
+            if dry_run:
+                print(f'▶️  {name}: would run {stage["script"]} {" ".join(args)}'.rstrip())
+                finished.add(name)
+                ran.add(name)
+                continue
+            print(f'▶️  {name}: running {stage["script"]} {" ".join(args)}'.rstrip())
+            running[name] = (start_stage(name, args, env), time.perf_counter(), fingerprint)
+
+        if not running:
+            continue
+        name, code, peak_mb = wait_any(running)
+        process, started, fingerprint = running.pop(name)
+        seconds = time.perf_counter() - started
+        memory = f', peak RSS {peak_mb:.0f} MB' if peak_mb is not None else ''
+        if code != 0:
+            save_state(state)
+            print(f'❌ {name} failed with exit code {code} after {seconds:.1f} s, see {LOG_FOLDER}/{name}.log')
+            for other_process, _, _ in running.values():
+                other_process.wait()
+            sys.exit(code)
+
+        print(f'✅ {name}: {seconds:.1f} s{memory}')
+        state['stages'][name] = fingerprint
+        save_state(state)
+        finished.add(name)
+        ran.add(name)
+        report.append({'stage': name, 'status': 'ran', 'seconds': round(seconds, 3), 'peak_rss_mb': peak_mb})
+
+    if profile_folder and not dry_run:
+        os.makedirs(profile_folder, exist_ok=True)
+        with open(os.path.join(profile_folder, 'pipeline.json'), 'w', encoding='utf-8') as f:
+            json.dump({'jobs': jobs, 'workers': workers, 'storage_format': STORAGE_FORMAT, 'stages': report}, f, indent=2)
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the DrugBank pipeline, skipping stages whose outputs are up to date.')
+    parser.add_argument('stages', nargs='*', metavar='stage',
+                        help=f'stages to bring up to date, with their dependencies (default: all of {", ".join(STAGES)})')
+    parser.add_argument('--jobs', type=int, default=2, help='stages run at the same time (default: 2)')
+    parser.add_argument('--workers', type=int, default=1, help=f'--workers passed to {", ".join(PARALLEL_STAGES)}')
+    parser.add_argument('--chunk-size', type=int, help=f'--chunk-size passed to {", ".join(CHUNKED_STAGES)} (bounded memory)')
+    parser.add_argument('--force', action='store_true', help='run the selected stages even if they are up to date')
+    parser.add_argument('--dry-run', action='store_true', help='only print what would run')
+    parser.add_argument('--profile', metavar='FOLDER',
+                        help='write a JSON profiling report per stage to FOLDER (combine with --force to profile every stage)')
+    parser.add_argument('--cprofile', action='store_true', help='with --profile, also dump a cProfile .prof file per stage')
+    args = parser.parse_args()
+    unknown = [name for name in args.stages if name not in STAGES]
+    if unknown:
+        parser.error(f'unknown stage(s): {", ".join(unknown)}')
+
+    run_pipeline(args.stages, jobs=args.jobs, workers=args.workers, force=args.force, dry_run=args.dry_run,
+                 profile_folder=args.profile, profiler='cprofile' if args.cprofile else '', chunk_size=args.chunk_size)